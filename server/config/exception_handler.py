@@ -10,8 +10,12 @@ def custom_exception_handler(exc, context):
     # to get the standard error response.
     response = exception_handler(exc, context)
 
-    # Log the exception
-    logger.error(f"Exception caught: {exc}", exc_info=True, extra={'request': context['request']})
+    # Log the exception. Client errors DRF answers itself (validation errors,
+    # 404s, a taken appointment slot's 409) are expected: no traceback.
+    if response is not None and response.status_code < 500:
+        logger.warning(f"Client error {response.status_code}: {exc}", extra={'request': context['request']})
+    else:
+        logger.error(f"Exception caught: {exc}", exc_info=True, extra={'request': context['request']})
 
     # Now add the HTTP status code to the response.
     if response is not None:
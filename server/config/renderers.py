@@ -0,0 +1,48 @@
+import logging
+
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed, falling back
+    to DRF's stdlib encoder otherwise.
+
+    The output decodes to what JSONRenderer produces with the default
+    settings: datetimes, dates and times are handed to DRF's JSONEncoder
+    (millisecond precision, ``Z`` for UTC), Decimals become floats, and
+    U+2028/U+2029 are escaped. It is byte-for-byte the same except for
+    floats written in exponent form (orjson writes ``1.5e-7`` where the stdlib
+    writes ``1.5e-07``) and for NaN and the infinities: the strict stdlib
+    encoder refuses them with a ValueError, orjson writes ``null``. Indented
+    output (the browsable API, or an ``indent=`` media type parameter) and
+    non-default JSON settings always go through the stdlib encoder.
+    """
+    # Everything orjson can't encode natively, datetimes included
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError as e:
+            # e.g. integers wider than 64 bits, which the stdlib encoder handles
+            logger.warning(f"orjson could not encode the response, using the stdlib encoder: {e}")
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
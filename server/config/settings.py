@@ -11,9 +11,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+from datetime import time
+from decimal import Decimal
 from pathlib import Path
 
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 from django.templatetags.static import static
 
 # Load environment variables from .env file
@@ -60,7 +63,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'salon.middleware.AsyncWhiteNoiseMiddleware',
+    'salon.middleware.QueryMetricsMiddleware',
+    'salon.middleware.ReplicaReadMiddleware',
+    'salon.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -104,10 +110,66 @@ DATABASES = {
     }
 }
 
+# Optional read replica. GET requests to the public read endpoints read from it
+# (salon.db_routers); the rest of the connection settings default to the primary's.
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # Tests read their own writes through the replica alias
+        'TEST': {'MIRROR': 'default'},
+    }
+
 # Fallback to SQLite if DB_ENGINE is set to sqlite3
 if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
     DATABASES['default']['NAME'] = BASE_DIR / 'db.sqlite3'
-    
+    # Threaded tests need a file database; the in-memory one locks whole tables
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
+    # A second file stands in for the replica. It is only read from when
+    # DB_REPLICA_NAME is set; the test suite checks the routing against it.
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / os.getenv('DB_REPLICA_NAME', 'db_replica.sqlite3'),
+        'TEST': {'NAME': BASE_DIR / 'test_replica.sqlite3'},
+    }
+
+DATABASE_ROUTERS = ['salon.db_routers.ReplicaRouter']
+# Alias the read endpoints read from; None reads everything from the primary
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES and (os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME')) else None
+# After a client writes to a salon table, its reads stay on the primary this long (should exceed the replication lag)
+REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# The salon.cache version tokens are only bumped in the process that makes
+# the change, so outside DEBUG every worker (and the management commands)
+# must share the cache: the database by default (python manage.py
+# createcachetable), or e.g. Redis.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', (
+            'django.core.cache.backends.locmem.LocMemCache' if DEBUG else 'django.core.cache.backends.db.DatabaseCache'
+        )),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'samana-cache' if DEBUG else 'salon_cache'),
+    }
+}
+if not DEBUG and CACHES['default']['BACKEND'] in (
+    'django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache',
+):
+    raise ImproperlyConfigured(
+        f"CACHE_BACKEND {CACHES['default']['BACKEND']} is not shared between processes; "
+        "other workers would never see the salon cache invalidations."
+    )
+
+# How long (in seconds) resolved API responses stay cached. Entries are also
+# invalidated by signals whenever the underlying content changes.
+SALON_CACHE_TIMEOUT = int(os.getenv('SALON_CACHE_TIMEOUT', 60 * 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -173,6 +235,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson when installed, DRF's stdlib JSON otherwise; same output either way
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'config.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'EXCEPTION_HANDLER': 'config.exception_handler.custom_exception_handler',
@@ -262,6 +334,61 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
 ADMIN_EMAILS_STR = os.getenv('ADMIN_EMAILS', '')
 ADMIN_EMAILS = [email.strip() for email in ADMIN_EMAILS_STR.split(',') if email.strip()]
 
+# Appointment availability
+SALON_OPENING_TIME = time.fromisoformat(os.getenv('SALON_OPENING_TIME', '10:00'))
+SALON_CLOSING_TIME = time.fromisoformat(os.getenv('SALON_CLOSING_TIME', '19:00'))
+APPOINTMENT_SLOT_INTERVAL = int(os.getenv('APPOINTMENT_SLOT_INTERVAL', 30))  # minutes between slot starts
+APPOINTMENT_DEFAULT_DURATION = int(os.getenv('APPOINTMENT_DEFAULT_DURATION', 60))  # for services without a duration
+APPOINTMENT_CAPACITY = int(os.getenv('APPOINTMENT_CAPACITY', 1))  # bookings that may overlap
+
+# How admins hear about new appointments: 'immediate' sends one email per
+# booking, 'digest' sends one summary per ADMIN_DIGEST_WINDOW minutes.
+# Customer confirmations are always sent immediately.
+ADMIN_NOTIFICATION_MODE = os.getenv('ADMIN_NOTIFICATION_MODE', 'immediate')
+ADMIN_DIGEST_WINDOW = int(os.getenv('ADMIN_DIGEST_WINDOW', 15))
+
+# Email outbox (drained by `python manage.py send_outbox_emails`)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', 5))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_BACKOFF = int(os.getenv('EMAIL_OUTBOX_RETRY_BACKOFF', 30))  # seconds, doubled per attempt
+EMAIL_OUTBOX_MAX_RETRY_DELAY = int(os.getenv('EMAIL_OUTBOX_MAX_RETRY_DELAY', 60 * 60))
+# Seconds a worker may spend on a claimed batch before other workers take it over
+EMAIL_OUTBOX_CLAIM_TIMEOUT = int(os.getenv('EMAIL_OUTBOX_CLAIM_TIMEOUT', 10 * 60))
+
+# Orphaned Cloudinary assets (purged by `python manage.py purge_deleted_assets`)
+ASSET_PURGE_BATCH_SIZE = int(os.getenv('ASSET_PURGE_BATCH_SIZE', 100))  # Cloudinary allows 100 per call
+ASSET_PURGE_POLL_INTERVAL = float(os.getenv('ASSET_PURGE_POLL_INTERVAL', 30))
+ASSET_PURGE_MAX_ATTEMPTS = int(os.getenv('ASSET_PURGE_MAX_ATTEMPTS', 5))
+ASSET_PURGE_RETRY_BACKOFF = int(os.getenv('ASSET_PURGE_RETRY_BACKOFF', 60))  # seconds, doubled per attempt
+ASSET_PURGE_MAX_RETRY_DELAY = int(os.getenv('ASSET_PURGE_MAX_RETRY_DELAY', 6 * 60 * 60))
+# Seconds a worker may spend on a claimed batch before other workers take it over
+ASSET_PURGE_CLAIM_TIMEOUT = int(os.getenv('ASSET_PURGE_CLAIM_TIMEOUT', 10 * 60))
+
+# Process-wide LRU of storage URLs (salon.media); 0 disables it
+MEDIA_URL_CACHE_SIZE = int(os.getenv('MEDIA_URL_CACHE_SIZE', 10000))
+
+# Responsive image presets emitted as `image_variants` (name:max_width, comma
+# separated). Cloudinary picks format and quality per browser; other storages
+# get WebP copies generated with Pillow at IMAGE_VARIANT_LOCAL_QUALITY.
+IMAGE_VARIANTS = {
+    name: {'width': int(width), 'crop': 'limit', 'fetch_format': 'auto', 'quality': 'auto'}
+    for name, width in (preset.split(':') for preset in os.getenv('IMAGE_VARIANTS', 'thumb:320,card:768,hero:1600').split(',') if preset)
+}
+IMAGE_VARIANT_LOCAL_QUALITY = int(os.getenv('IMAGE_VARIANT_LOCAL_QUALITY', 80))
+
+# API response compression (salon.middleware.CompressionMiddleware)
+COMPRESSION_MIN_LENGTH = int(os.getenv('COMPRESSION_MIN_LENGTH', 200))  # bytes
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+
+# Route the read endpoints (banners, services, product list, dashboard content,
+# health) to the async views in salon.async_views. Only useful under config/asgi.py.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False').lower() == 'true'
+
+# Upper bounds of the product price facet buckets; the last bucket is open-ended
+PRODUCT_PRICE_BUCKETS = [Decimal(edge) for edge in os.getenv('PRODUCT_PRICE_BUCKETS', '500,1000,2000,5000').split(',')]
+
 UNFOLD = {
     "SITE_TITLE": "Samana Administration",
     "SITE_HEADER": "Samana Beauty Admin",
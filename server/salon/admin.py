@@ -3,7 +3,7 @@ from unfold.admin import ModelAdmin
 from django.contrib import admin
 from django.db.models import JSONField
 from django_json_widget.widgets import JSONEditorWidget
-from .models import DashboardContent, DashboardImage, Product, Appointment, Banner, ServiceCategory, Service
+from .models import DashboardContent, DashboardImage, OutboxEmail, PendingAssetDeletion, Product, Appointment, Banner, ServiceCategory, Service
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.admin import GroupAdmin as BaseGroupAdmin
 from django.contrib.auth.models import User, Group
@@ -92,3 +92,19 @@ class DashboardImageAdmin(ModelAdmin):
         return None
     file_preview.short_description = "File Preview"
     file_preview.allow_tags = True
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(ModelAdmin):
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "last_error")
+    readonly_fields = ("appointment", "created_at", "sent_at")
+
+
+@admin.register(PendingAssetDeletion)
+class PendingAssetDeletionAdmin(ModelAdmin):
+    list_display = ("name", "status", "attempts", "next_attempt_at", "created_at", "deleted_at")
+    list_filter = ("status",)
+    search_fields = ("name", "last_error")
+    readonly_fields = ("created_at", "deleted_at")
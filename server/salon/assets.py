@@ -0,0 +1,130 @@
+import logging
+from datetime import timedelta
+
+import cloudinary.api
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from . import media
+from .models import PendingAssetDeletion
+
+logger = logging.getLogger(__name__)
+
+# Cloudinary's delete_resources accepts at most this many public ids per call
+MAX_BATCH_SIZE = 100
+
+
+def schedule_deletion(*names):
+    """
+    Record assets to destroy. The rows are written in the caller's
+    transaction, so they only become visible (and deletable) once the change
+    that orphaned the assets has committed.
+    """
+    names = [name for name in names if name]
+    if names:
+        PendingAssetDeletion.objects.bulk_create([PendingAssetDeletion(name=name) for name in names])
+
+
+def release_files(*names):
+    """
+    Let go of files no longer referenced: schedule their deletion, drop their
+    cached URLs and, once the transaction commits, delete their local image
+    variants. Used by the file-owner signals and by the catalog import, which
+    skips them.
+    """
+    names = [name for name in names if name]
+    if names:
+        schedule_deletion(*names)
+        media.forget(*names)
+        transaction.on_commit(lambda: media.delete_variants(default_storage, *names))
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base * 2^(attempts - 1), capped."""
+    delay = settings.ASSET_PURGE_RETRY_BACKOFF * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.ASSET_PURGE_MAX_RETRY_DELAY))
+
+
+def pending_count():
+    return PendingAssetDeletion.objects.filter(status='pending').count()
+
+
+def claim_due_assets(batch_size):
+    """
+    Claim up to ``batch_size`` due assets for this worker and commit.
+
+    Rows are locked with ``SKIP LOCKED`` (where supported) only while they are
+    marked ``purging``, so several workers can purge concurrently and no lock
+    is held during the Cloudinary call. A claim lapses after
+    ``ASSET_PURGE_CLAIM_TIMEOUT`` seconds, after which the rows of a worker
+    that died mid-batch are picked up again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            PendingAssetDeletion.objects.select_for_update(skip_locked=True)
+            .filter(status__in=('pending', 'purging'), next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:min(batch_size, MAX_BATCH_SIZE)]
+        )
+        for asset in batch:
+            asset.status = 'purging'
+            asset.attempts += 1
+            asset.next_attempt_at = now + timedelta(seconds=settings.ASSET_PURGE_CLAIM_TIMEOUT)
+        PendingAssetDeletion.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at'])
+    return batch
+
+
+def record_result(asset, fields):
+    """Save the outcome of a purge, unless the claim lapsed and another worker took the row over."""
+    values = {field: getattr(asset, field) for field in fields}
+    return PendingAssetDeletion.objects.filter(pk=asset.pk, status='purging', attempts=asset.attempts).update(**values)
+
+
+def purge_due_assets(batch_size):
+    """
+    Destroy up to ``batch_size`` due assets with one Cloudinary API call.
+
+    The batch is claimed and committed first, the API is called outside any
+    transaction, and the results are recorded in a second, short one.
+    Returns a dict of batch statistics.
+    """
+    stats = {'deleted': 0, 'retried': 0, 'failed': 0}
+
+    batch = claim_due_assets(batch_size)
+    if not batch:
+        return stats
+
+    names = list(dict.fromkeys(asset.name for asset in batch))
+    try:
+        results = cloudinary.api.delete_resources(names).get('deleted', {})
+    except Exception as e:
+        logger.error(f"Could not delete {len(names)} Cloudinary assets: {e}", exc_info=True)
+        results, error = {}, str(e)
+    else:
+        error = 'Not deleted by Cloudinary.'
+
+    now = timezone.now()
+    with transaction.atomic():
+        for asset in batch:
+            # An asset that is already gone needs no further attempts
+            if results.get(asset.name) in ('deleted', 'not_found'):
+                asset.status = 'deleted'
+                asset.deleted_at = now
+                asset.last_error = ''
+                stats['deleted'] += 1
+            elif asset.attempts >= settings.ASSET_PURGE_MAX_ATTEMPTS:
+                asset.status = 'failed'
+                asset.last_error = results.get(asset.name) or error
+                stats['failed'] += 1
+                logger.error(f"Giving up on deleting asset {asset.name} after {asset.attempts} attempts: {asset.last_error}")
+            else:
+                asset.status = 'pending'
+                asset.last_error = results.get(asset.name) or error
+                asset.next_attempt_at = now + retry_delay(asset.attempts)
+                stats['retried'] += 1
+                logger.warning(f"Asset {asset.name} not deleted (attempt {asset.attempts}), retrying at {asset.next_attempt_at}")
+            record_result(asset, ['status', 'next_attempt_at', 'last_error', 'deleted_at'])
+
+    return stats
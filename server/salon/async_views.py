@@ -0,0 +1,176 @@
+"""
+Async twins of the read endpoints, routed instead of the DRF views when
+``ASYNC_READ_VIEWS`` is on.
+
+Each view answers exactly like its DRF counterpart, with the same values
+serializers, paginators and validators, but reads through the async ORM and
+renders straight into an HttpResponse. Under an ASGI server a request waiting
+on the database then no longer ties up a worker thread.
+
+Serializing runs through ``sync_to_async``: building media URLs may hit the
+storage, and local image variants are made with Pillow on first use, neither
+of which may block the event loop.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.request import Request
+
+from config.exception_handler import custom_exception_handler
+from config.renderers import FastJSONRenderer
+
+from . import cache
+from .conditional import AsyncCacheVersionConditionalGetMixin, AsyncConditionalGetMixin
+from .filters import aproduct_facets, filter_products
+from .models import DashboardContent
+from .pagination import AsyncPageNumberPagination
+from .serializers import (
+    BannerValuesSerializer, DashboardContentSerializer, ProductFilterSerializer, ProductValuesSerializer,
+    ServiceValuesSerializer,
+)
+from .views import BannerListAPIView, DashboardContentView, ProductViewSet, ServiceListAPIView
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncReadView(View):
+    """
+    Base of the async views. Handlers get a DRF ``Request`` (for
+    ``query_params``) and return data for ``render()``; exceptions go through
+    the project's DRF exception handler, as they would in an APIView.
+    ``initial()`` and ``finalize_response()`` are the same hooks as APIView's.
+    """
+    http_method_names = ['get', 'head', 'options']
+    renderer_class = FastJSONRenderer
+    queryset = None
+    read_from_replica = True
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'view': self}
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = Request(request)
+        try:
+            await self.initial(self.request, *args, **kwargs)
+            response = await super().dispatch(self.request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return self.finalize_response(self.request, response, *args, **kwargs)
+
+    async def initial(self, request, *args, **kwargs):
+        pass
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        return response
+
+    def handle_exception(self, exc):
+        response = custom_exception_handler(exc, {'request': self.request, 'view': self})
+        headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+        return self.render(response.data, status=response.status_code, headers=headers)
+
+    def render(self, data, status=200, headers=None):
+        renderer = self.renderer_class()
+        return HttpResponse(renderer.render(data), content_type=renderer.media_type, status=status, headers=headers)
+
+
+class AsyncValuesListView(AsyncConditionalGetMixin, AsyncReadView):
+    """Async ``ValuesListMixin``: a paginated list rendered by ``values_serializer_class``."""
+    values_serializer_class = None
+    pagination_class = AsyncPageNumberPagination
+
+    def filter_queryset(self, queryset):
+        return queryset
+
+    async def list(self, request):
+        serializer = self.values_serializer_class(context=self.get_serializer_context())
+        queryset = serializer.select(self.filter_queryset(self.get_queryset()))
+
+        self.paginator = self.pagination_class()
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        if page is not None:
+            return self.paginator.get_paginated_response(await sync_to_async(serializer.serialize)(page)).data
+        return await sync_to_async(serializer.serialize)([row async for row in queryset])
+
+
+class AsyncBannerListView(AsyncValuesListView):
+    queryset = BannerListAPIView.queryset
+    values_serializer_class = BannerValuesSerializer
+
+    async def get(self, request, *args, **kwargs):
+        data = await self.list(request)
+        logger.info("Banner list retrieved successfully.")
+        return self.render(data)
+
+
+class AsyncServiceListView(AsyncValuesListView):
+    queryset = ServiceListAPIView.queryset
+    values_serializer_class = ServiceValuesSerializer
+    pagination_class = ServiceListAPIView.pagination_class
+    last_modified_fields = ServiceListAPIView.last_modified_fields
+
+    async def get(self, request, *args, **kwargs):
+        data = await self.list(request)
+        logger.info("Service list retrieved successfully.")
+        return self.render(data)
+
+
+class AsyncProductListView(AsyncValuesListView):
+    """The product list of ProductViewSet, with its filters and facet counts"""
+    queryset = ProductViewSet.queryset
+    values_serializer_class = ProductValuesSerializer
+    pagination_class = ProductViewSet.pagination_class
+    product_filters = {}
+
+    def filter_queryset(self, queryset):
+        return filter_products(queryset, self.product_filters)
+
+    async def get(self, request, *args, **kwargs):
+        query = ProductFilterSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        self.product_filters = query.validated_data
+
+        data = await self.list(request)
+        # Later cursor pages reuse the facets of the first page
+        if self.paginator.cursor_query_param not in request.query_params:
+            data['facets'] = await aproduct_facets(self.get_queryset(), self.product_filters)
+        return self.render(data)
+
+
+class AsyncDashboardContentView(AsyncCacheVersionConditionalGetMixin, AsyncReadView):
+    queryset = DashboardContentView.queryset
+    cache_namespace = cache.DASHBOARD_CONTENT
+
+    async def get(self, request, *args, **kwargs):
+        response_data = await cache.aget_or_build(cache.DASHBOARD_CONTENT, self.build_response_data, "all")
+        logger.info("Dashboard content retrieved successfully.")
+        return self.render(response_data)
+
+    async def build_response_data(self):
+        contents = [content async for content in self.get_queryset()]
+        return await sync_to_async(DashboardContentView.serialize_contents)(contents)
+
+
+class AsyncDashboardContentDetail(AsyncCacheVersionConditionalGetMixin, AsyncReadView):
+    queryset = DashboardContentView.queryset
+    cache_namespace = cache.DASHBOARD_CONTENT
+
+    async def get(self, request, slug, *args, **kwargs):
+        try:
+            content = await self.get_queryset().aget(slug=slug)
+        except DashboardContent.DoesNotExist:
+            raise Http404("No DashboardContent matches the given query.")
+        serializer = DashboardContentSerializer(content, context=self.get_serializer_context())
+        data = await sync_to_async(lambda: serializer.data)()
+        logger.info(f"Dashboard content detail for slug '{slug}' retrieved successfully.")
+        return self.render(data)
+
+
+class AsyncHealthCheckView(AsyncReadView):
+    async def get(self, request, *args, **kwargs):
+        logger.info("Health check performed.")
+        return self.render({"status": "ok"})
@@ -0,0 +1,192 @@
+from datetime import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import Appointment, AppointmentSlot, Service
+
+
+class SlotUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This time slot is no longer available.'
+    default_code = 'slot_unavailable'
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def from_minutes(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def service_durations(titles):
+    """Map service titles (what ``Appointment.service_type`` holds) to their duration."""
+    return dict(
+        Service.objects.filter(title__in=titles, duration_minutes__isnull=False)
+        .values_list('title', 'duration_minutes')
+    )
+
+
+def appointment_duration(service_type):
+    return service_durations({service_type}).get(service_type) or settings.APPOINTMENT_DEFAULT_DURATION
+
+
+def slot_cells(start_time, duration):
+    """
+    Return the start times of the ``APPOINTMENT_SLOT_INTERVAL`` cells covered
+    by a ``duration`` minute appointment starting at ``start_time``.
+    """
+    step = settings.APPOINTMENT_SLOT_INTERVAL
+    start = to_minutes(start_time)
+    end = min(start + duration, 24 * 60)
+    return [from_minutes(minutes) for minutes in range(start // step * step, end, step)]
+
+
+def taken_cells(date, exclude=None):
+    """Return ``{seat: {start_time, ...}}``, the slot cells booked on ``date``, leaving out appointment ``exclude``."""
+    slots = AppointmentSlot.objects.filter(date=date)
+    if exclude is not None:
+        slots = slots.exclude(appointment=exclude)
+    taken = {}
+    for start_time, seat in slots.values_list('start_time', 'seat'):
+        taken.setdefault(seat, set()).add(start_time)
+    return taken
+
+
+def free_seat(taken, cells):
+    """Return the first seat with all of ``cells`` free in ``taken_cells()``, or None."""
+    for seat in range(settings.APPOINTMENT_CAPACITY):
+        if taken.get(seat, set()).isdisjoint(cells):
+            return seat
+    return None
+
+
+def free_slots(date, duration):
+    """
+    Return the ``(start, end)`` times on ``date`` at which a ``duration``
+    minute appointment fits within opening hours and on a seat whose slot
+    cells are all free.
+
+    Read from the same ``AppointmentSlot`` cells ``reserve_slots()`` claims,
+    so a slot offered here can be booked unless it is taken in the meantime.
+    """
+    taken = taken_cells(date)
+    opening = to_minutes(settings.SALON_OPENING_TIME)
+    closing = to_minutes(settings.SALON_CLOSING_TIME)
+    step = settings.APPOINTMENT_SLOT_INTERVAL
+
+    earliest = opening
+    now = timezone.localtime()
+    if date == now.date():
+        earliest = max(opening, to_minutes(now) + 1)
+
+    slots = []
+    for start in range(opening, closing - duration + 1, step):
+        if start < earliest:
+            continue
+        if free_seat(taken, slot_cells(from_minutes(start), duration)) is not None:
+            slots.append((from_minutes(start), from_minutes(start + duration)))
+    return slots
+
+
+def appointment_cells(appointment):
+    return slot_cells(appointment.appointment_time, appointment_duration(appointment.service_type))
+
+
+def is_bookable(appointment):
+    """Whether ``appointment`` fits on some seat next to every other booking (itself excluded)."""
+    taken = taken_cells(appointment.appointment_date, exclude=appointment.pk)
+    return free_seat(taken, appointment_cells(appointment)) is not None
+
+
+def reserve_slots(appointment, cells=None):
+    """
+    Claim the slot cells of ``appointment`` on the first seat that has all of
+    them free, or raise ``SlotUnavailable``.
+
+    Must run inside the transaction that saves the appointment. Only the
+    contested cells conflict, so bookings for other slots never wait on each
+    other.
+    """
+    if cells is None:
+        cells = appointment_cells(appointment)
+    for seat in range(settings.APPOINTMENT_CAPACITY):
+        try:
+            with transaction.atomic():
+                AppointmentSlot.objects.bulk_create([
+                    AppointmentSlot(appointment=appointment, date=appointment.appointment_date, start_time=cell, seat=seat)
+                    for cell in cells
+                ])
+            return seat
+        except IntegrityError:
+            continue
+    raise SlotUnavailable()
+
+
+def sync_slots(appointment, created=False):
+    """
+    Bring the slot cells of ``appointment`` in line with its status, date,
+    time and service, as the Appointment post_save signal does on every
+    save: cancelling frees them, and a new, retimed or re-opened booking
+    claims them (raising ``SlotUnavailable`` when they are taken).
+
+    Past appointments keep whatever cells they have; they no longer affect
+    availability. ``QuerySet.update()`` bypasses this, like any signal.
+    """
+    slots = AppointmentSlot.objects.filter(appointment=appointment)
+    if appointment.status == 'cancelled':
+        slots.delete()
+        return
+    if appointment.appointment_date < timezone.localdate():
+        return
+
+    cells = appointment_cells(appointment)
+    if not created:
+        wanted = {(appointment.appointment_date, cell) for cell in cells}
+        if set(slots.values_list('date', 'start_time')) == wanted:
+            return
+        slots.delete()
+    reserve_slots(appointment, cells)
+
+
+def rebuild_slots(batch_size=2000):
+    """
+    Drop the slot cells of every upcoming appointment and claim them again
+    under the current slot settings, in booking order, one day at a time.
+    Bookings that no longer fit anywhere get no cells. Returns
+    ``(claimed, unplaced)`` appointment counts.
+
+    For rows written without signals (seed_perf_data) and after changing
+    ``APPOINTMENT_SLOT_INTERVAL`` or ``APPOINTMENT_CAPACITY``.
+    """
+    today = timezone.localdate()
+    durations = dict(Service.objects.filter(duration_minutes__isnull=False).values_list('title', 'duration_minutes'))
+    AppointmentSlot.objects.filter(date__gte=today).delete()
+
+    upcoming = (
+        Appointment.objects.filter(appointment_date__gte=today).exclude(status='cancelled')
+        .order_by('appointment_date', 'created_at', 'pk')
+        .values_list('pk', 'appointment_date', 'appointment_time', 'service_type')
+    )
+    claimed = unplaced = 0
+    day, taken, slots = None, {}, []
+    for pk, date, start_time, service_type in upcoming.iterator(chunk_size=batch_size):
+        if date != day:
+            day, taken = date, {}
+        cells = slot_cells(start_time, durations.get(service_type) or settings.APPOINTMENT_DEFAULT_DURATION)
+        seat = free_seat(taken, cells)
+        if seat is None:
+            unplaced += 1
+            continue
+        taken.setdefault(seat, set()).update(cells)
+        slots.extend(AppointmentSlot(appointment_id=pk, date=date, start_time=cell, seat=seat) for cell in cells)
+        claimed += 1
+        if len(slots) >= batch_size:
+            AppointmentSlot.objects.bulk_create(slots)
+            slots = []
+    AppointmentSlot.objects.bulk_create(slots)
+    return claimed, unplaced
@@ -0,0 +1,24 @@
+"""Synthetic data shared by seed_perf_data and the benchmark commands."""
+
+
+def build_blob(sections, cards, image_every):
+    """Dashboard JSON of ``sections`` sections of ``cards`` cards, every ``image_every``th one an image slot."""
+    data = {}
+    for s in range(sections):
+        section_cards = []
+        for c in range(cards):
+            is_image = c % image_every == 0
+            section_cards.append({
+                'emoji': '✨',
+                'title': f'Card {s}-{c}',
+                'icon_type': 'image' if is_image else 'emoji',
+                'image_key': f'image-{s}-{c}' if is_image else None,
+                'description': 'Lorem ipsum dolor sit amet ' * 4,
+                'meta': {'tags': ['a', 'b', 'c'], 'order': c},
+            })
+        data[f'section-{s}'] = {
+            'heading': f'Section {s}',
+            'body': 'Lorem ipsum dolor sit amet ' * 20,
+            'cards': section_cards,
+        }
+    return data
@@ -0,0 +1,104 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .db_routers import reading_from_replica, replica_reads
+
+logger = logging.getLogger(__name__)
+
+# Cache namespaces. Each one has its own version token, so a change to one
+# kind of content never throws away the cached data of another.
+DASHBOARD_CONTENT = "dashboard-content"
+# Banners, products, services and service categories, as shown on the homepage
+HOMEPAGE = "homepage"
+
+
+def _version_key(namespace):
+    return f"salon:{namespace}:version"
+
+
+def get_version(namespace):
+    """Return the current version token for ``namespace``."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # A time based token (rather than a counter starting at 1) means an
+        # evicted version key can never resurrect entries of an old version.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(namespace):
+    """Async ``get_version()``, through the cache backend's async API."""
+    key = _version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate every entry cached under ``namespace``."""
+    cache.set(_version_key(namespace), time.time_ns(), timeout=None)
+    logger.info(f"Cache version bumped for '{namespace}'.")
+
+
+def bump_version_on_commit(namespace):
+    """
+    Bump the version once the current transaction commits.
+
+    Bumping before the commit would let a concurrent request re-cache the old
+    rows under the new version.
+    """
+    transaction.on_commit(lambda: bump_version(namespace))
+
+
+def _key(namespace, version, parts):
+    return ":".join(["salon", namespace, str(version), *map(str, parts)])
+
+
+def make_key(namespace, *parts):
+    return _key(namespace, get_version(namespace), parts)
+
+
+def replica_may_lag(version):
+    """
+    Whether the replica may still miss the change behind ``version``, a
+    ``time_ns()`` token bumped on commit.
+    """
+    return time.time_ns() - version < settings.REPLICA_STICKY_SECONDS * 1_000_000_000
+
+
+def get_or_build(namespace, build, *parts, timeout=None):
+    """
+    Return the value cached under ``namespace``/``parts``, calling ``build``
+    and caching its result on a miss.
+
+    A request reading from the replica builds a version bumped moments ago
+    from the primary, or old rows would be cached as the new version.
+    """
+    version = get_version(namespace)
+    key = _key(namespace, version, parts)
+    data = cache.get(key)
+    if data is None:
+        with replica_reads(reading_from_replica() and not replica_may_lag(version)):
+            data = build()
+        cache.set(key, data, timeout if timeout is not None else settings.SALON_CACHE_TIMEOUT)
+    return data
+
+
+async def aget_or_build(namespace, build, *parts, timeout=None):
+    """Async ``get_or_build()``; ``build`` is a coroutine function."""
+    version = await aget_version(namespace)
+    key = _key(namespace, version, parts)
+    data = await cache.aget(key)
+    if data is None:
+        with replica_reads(reading_from_replica() and not replica_may_lag(version)):
+            data = await build()
+        await cache.aset(key, data, timeout if timeout is not None else settings.SALON_CACHE_TIMEOUT)
+    return data
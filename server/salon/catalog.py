@@ -0,0 +1,313 @@
+"""
+Bulk catalog import and export (``import_catalog`` / ``export_catalog``).
+
+Rows are streamed from and to CSV or JSON Lines files, so memory stays flat
+whatever the file size. Imports are validated and written a chunk at a time:
+each chunk costs one query for the rows it updates, a ``bulk_create`` and an
+``executemany`` UPDATE in its own transaction, instead of a ``save()`` (with its
+validation queries and signals) per row. The work the skipped ``save()``s and
+signals would do (slugs, featured slots, search index, replaced images) is
+done here per chunk.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import assets, cache, search
+from .models import MAX_FEATURED_PRODUCTS, Product, Service, ServiceCategory
+
+FORMATS = ('csv', 'jsonl')
+
+
+class CatalogError(Exception):
+    """A chunk had invalid rows; ``errors`` is a list of ``(row number, message)``."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f'{len(errors)} invalid rows')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def format_for(path, format=None):
+    if format:
+        return format
+    suffix = str(path).rsplit('.', 1)[-1].lower()
+    if suffix not in FORMATS:
+        raise ValueError(f'Cannot tell the format of {path}, pass csv or jsonl.')
+    return suffix
+
+
+def read_rows(file, format):
+    """Yield the rows of an open CSV or JSON Lines file as dicts."""
+    if format == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+class RowWriter:
+    """Write dict rows to an open file as CSV or JSON Lines."""
+
+    def __init__(self, file, format, columns):
+        self.format = format
+        if format == 'csv':
+            self.writer = csv.DictWriter(file, columns)
+            self.writer.writeheader()
+        else:
+            self.file = file
+
+    def write(self, row):
+        if self.format == 'csv':
+            self.writer.writerow({column: '' if value is None else value for column, value in row.items()})
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False, default=str))
+            self.file.write('\n')
+
+
+def update_rows(model, instances, field_names):
+    """
+    Write ``field_names`` of ``instances`` with one parameterized UPDATE sent
+    through ``executemany``. Same effect as ``bulk_update()``, which builds a
+    CASE WHEN expression per column and row in Python and spends far longer
+    on that than the database spends on the writes.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in field_names]
+    sql = (
+        f'UPDATE {quote(model._meta.db_table)} SET {", ".join(f"{quote(field.column)} = %s" for field in fields)} '
+        f'WHERE {quote(model._meta.pk.column)} = %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [field.get_db_prep_save(getattr(instance, field.attname), connection) for field in fields] + [instance.pk]
+            for instance in instances
+        ])
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    normalized = str(value).strip().lower()
+    if normalized in ('1', 't', 'true', 'y', 'yes'):
+        return True
+    if normalized in ('0', 'f', 'false', 'n', 'no'):
+        return False
+    raise ValidationError(f'"{value}" is not a boolean.')
+
+
+class CatalogImporter:
+    """
+    Upserts the rows of one model. ``key`` is the column that identifies an
+    existing row; rows without a match are created. Columns missing from a
+    row keep their current (or default) values.
+    """
+    model = None
+    key = None
+    columns = ()
+    # Columns clean_fields() leaves out, because they are checked otherwise
+    unchecked_fields = ()
+
+    def __init__(self):
+        self.fields = {column: self.model._meta.get_field(column) for column in self.columns}
+
+    def convert(self, column, value):
+        field = self.fields[column]
+        if value in ('', None):
+            # CSV has no null: an empty cell is null wherever the column allows it
+            return None if field.null or not field.empty_strings_allowed else ''
+        if field.get_internal_type() == 'BooleanField':
+            return parse_bool(value)
+        return field.to_python(value)
+
+    def parse(self, row):
+        unknown = [column for column in row if column not in self.fields]
+        if unknown:
+            raise ValidationError(f'Unknown columns: {", ".join(map(str, unknown))}.')
+        values = {}
+        errors = []
+        for column, value in row.items():
+            try:
+                values[column] = self.convert(column, value)
+            except ValidationError as e:
+                errors.append(f'{column}: {" ".join(e.messages)}')
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+    def existing(self, keys):
+        return self.model.objects.in_bulk(keys, field_name=self.key)
+
+    def prepare_key(self, values):
+        return values.get(self.key)
+
+    def import_chunk(self, numbered_rows, skip_invalid=False):
+        """
+        Validate and write one chunk of ``(row number, row)`` pairs. Raises
+        CatalogError before writing anything if a row is invalid, unless
+        ``skip_invalid``. Returns ``(created, updated, errors)``.
+        """
+        parsed, errors = [], []
+        for number, row in numbered_rows:
+            try:
+                values = self.parse(row)
+                parsed.append((number, self.prepare_key(values), values))
+            except ValidationError as e:
+                errors.append((number, ' '.join(e.messages)))
+
+        existing = self.existing([key for _, key, _ in parsed if key is not None])
+        now = timezone.now()
+        creates, updates, update_fields, seen = [], [], set(), set()
+        for number, key, values in parsed:
+            try:
+                if key is not None and key in seen:
+                    raise ValidationError(f'Duplicate {self.key} "{key}" in this chunk.')
+                instance = existing.get(key)
+                if instance is None:
+                    instance = self.new_instance(key)
+                else:
+                    instance.updated_at = now
+                    update_fields.update(values)
+                for column, value in values.items():
+                    setattr(instance, self.fields[column].attname, value)
+                instance.clean_fields(exclude=self.unchecked_fields)
+                self.clean(instance, values)
+            except ValidationError as e:
+                errors.append((number, ' '.join(e.messages)))
+                continue
+            if key is not None:
+                seen.add(key)
+            (creates if instance.pk is None else updates).append(instance)
+
+        if errors and not skip_invalid:
+            raise CatalogError(sorted(errors))
+
+        update_fields = self.update_fields(update_fields)
+        with transaction.atomic():
+            self.model.objects.bulk_create(creates)
+            if updates:
+                update_rows(self.model, updates, update_fields)
+            self.after_write(creates, updates)
+            cache.bump_version_on_commit(cache.HOMEPAGE)
+        self.committed(creates, updates)
+        return len(creates), len(updates), sorted(errors)
+
+    def new_instance(self, key):
+        return self.model()
+
+    def clean(self, instance, values):
+        pass
+
+    def update_fields(self, columns):
+        return [column for column in self.columns if column in columns and column != self.key] + ['updated_at']
+
+    def after_write(self, created, updated):
+        """Runs in the chunk's transaction, after its rows are written."""
+
+    def committed(self, created, updated):
+        """Runs once the chunk's transaction has been written."""
+
+
+class ProductImporter(CatalogImporter):
+    model = Product
+    key = 'id'
+    columns = ('id', 'name', 'description', 'price', 'image', 'category', 'in_stock', 'is_featured')
+
+    def __init__(self):
+        super().__init__()
+        # Featured slots nobody holds. Slots given up by a chunk are only
+        # reused by later chunks, so a chunk never moves a slot between rows.
+        used = set(Product.objects.filter(featured_rank__isnull=False).values_list('featured_rank', flat=True))
+        self.free_ranks = [rank for rank in range(1, MAX_FEATURED_PRODUCTS + 1) if rank not in used]
+        self.released_ranks = []
+
+    def new_instance(self, key):
+        if key is not None:
+            raise ValidationError(f'No product with id {key}; leave id empty to create one.')
+        return Product()
+
+    def clean(self, instance, values):
+        if instance.is_featured and not instance.in_stock:
+            raise ValidationError("A product must be in stock to be featured.")
+        if instance.is_featured and instance.featured_rank is None:
+            if not self.free_ranks:
+                raise ValidationError(f"Only a maximum of {MAX_FEATURED_PRODUCTS} products can be featured.")
+            instance.featured_rank = self.free_ranks.pop(0)
+        elif not instance.is_featured and instance.featured_rank is not None:
+            self.released_ranks.append(instance.featured_rank)
+            instance.featured_rank = None
+
+    def update_fields(self, columns):
+        fields = super().update_fields(columns)
+        return fields + ['featured_rank'] if 'is_featured' in columns else fields
+
+    def after_write(self, created, updated):
+        search.index_objects('product', created + updated)
+
+    def committed(self, created, updated):
+        self.free_ranks = sorted(self.free_ranks + self.released_ranks)
+        self.released_ranks = []
+
+
+class ServiceImporter(CatalogImporter):
+    model = Service
+    key = 'slug'
+    columns = (
+        'slug', 'title', 'category', 'description', 'price', 'offer_price', 'duration_minutes', 'image',
+        'is_active', 'additional_info',
+    )
+    # Checked against the category map instead of a query per row
+    unchecked_fields = ('category',)
+
+    def __init__(self):
+        super().__init__()
+        self.categories = dict(ServiceCategory.objects.values_list('slug', 'pk'))
+
+    def convert(self, column, value):
+        if column == 'category':
+            if value not in self.categories:
+                raise ValidationError(f'No service category with slug "{value}".')
+            return self.categories[value]
+        return super().convert(column, value)
+
+    def prepare_key(self, values):
+        # Like Service.save(): the slug defaults to the slugified title
+        if not values.get('slug') and values.get('title'):
+            values['slug'] = slugify(values['title'])
+        return values.get('slug') or None
+
+    def after_write(self, created, updated):
+        assets.release_files(*[name for service in updated for name in service.replaced_files()])
+        search.index_objects('service', [service for service in created + updated if service.is_active])
+        search.remove_objects('service', [service.pk for service in updated if not service.is_active])
+        for service in created + updated:
+            service.remember_files()
+
+
+IMPORTERS = {'products': ProductImporter, 'services': ServiceImporter}
+
+
+def export_rows(kind, chunk_size=2000):
+    """Yield every product or service as a row dict in the import format, streamed from the database."""
+    if kind == 'products':
+        columns = ProductImporter.columns
+        queryset = Product.objects.order_by('pk').values_list(*columns)
+    else:
+        columns = ServiceImporter.columns
+        queryset = Service.objects.order_by('pk').values_list(
+            *[('category__slug' if column == 'category' else column) for column in columns]
+        )
+    for values in queryset.iterator(chunk_size=chunk_size):
+        yield dict(zip(columns, values))
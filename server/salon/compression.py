@@ -0,0 +1,62 @@
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# In order of preference when the client accepts several equally
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Only API payloads: compressing HTML pages that carry a CSRF token would
+# open them up to BREACH.
+COMPRESSIBLE_TYPES = ('application/json',)
+
+
+def negotiate_encoding(accept_encoding):
+    """Return the best of ``ENCODINGS`` allowed by an ``Accept-Encoding`` header, or None."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def cached_compress(content, encoding):
+    """
+    Return ``content`` compressed with ``encoding``, reusing the bytes cached
+    under a digest of ``content``. Hashing is far cheaper than brotli, and
+    keying on the body itself means a stale entry can never be served and
+    URLs that render the same body share one entry.
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    cache_key = f"salon:compressed:{digest}:{encoding}"
+    compressed = cache.get(cache_key)
+    if compressed is None:
+        compressed = compress(content, encoding)
+        cache.set(cache_key, compressed, settings.SALON_CACHE_TIMEOUT)
+    return compressed
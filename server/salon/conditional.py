@@ -0,0 +1,158 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import cache
+
+
+def validator_aggregates(last_modified_fields):
+    """Aggregates for ``aggregate_validators()``: the row count and each ``Max(field)``."""
+    aggregates = {f'last_modified_{i}': Max(field) for i, field in enumerate(last_modified_fields)}
+    return {'count': Count('pk'), **aggregates}
+
+
+def aggregate_validators(values):
+    """
+    Return ``(etag, None)`` from the result of ``validator_aggregates()``.
+
+    No Last-Modified: deleting or hiding the newest row moves
+    ``max(updated_at)`` backwards, and ``If-Modified-Since`` would then keep
+    answering 304 for the stale list. Only the ETag, which includes the
+    count, notices.
+    """
+    values = dict(values)
+    count = values.pop('count')
+    newest = max(filter(None, values.values()), default=None)
+    stamp = int(newest.timestamp() * 1_000_000) if newest else 0
+    return f'{count}-{stamp}', None
+
+
+def version_validators(versions):
+    """Return ``(etag, last_modified)`` for ``salon.cache`` version tokens."""
+    return '-'.join(map(str, versions)), datetime.fromtimestamp(max(versions) / 1_000_000_000, tz=dt_timezone.utc)
+
+
+def conditional_response(request, etag, last_modified):
+    """
+    Return ``(response, etag, last_modified)``: the 304 (or 412) answering the
+    request's preconditions, or None, and the validators in header form.
+    """
+    etag = quote_etag(etag)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=last_modified), etag, last_modified
+
+
+def add_validators(request, response, etag, last_modified):
+    # A 304 must repeat the validators of the response it stands for
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+    if response.status_code == 200:
+        # Lets CompressionMiddleware reuse the compressed bytes of a body it
+        # has seen before
+        response.cache_compressed_body = True
+    return response
+
+
+class PreconditionResponse(Exception):
+    """Raised from ``initial()`` to answer the request with ``response``, a 304 or 412."""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Answer ``If-None-Match`` / ``If-Modified-Since`` with a 304 before the view
+    (and its serializer) runs. Validators are fetched in ``initial()``, after
+    DRF's authentication, permission and throttling checks, so errors go
+    through ``handle_exception()`` like the view's own.
+
+    The default validator is an ETag of ``max(last_modified_fields)`` plus the
+    row count of ``get_queryset()``, fetched in a single aggregate query. The
+    count catches deletes, which do not move any ``updated_at``. There is no
+    Last-Modified, which would not move forward on a delete (see
+    ``aggregate_validators()``).
+    """
+    last_modified_fields = ('updated_at',)
+
+    def get_validators(self, request, *args, **kwargs):
+        """Return ``(etag, last_modified)``; ``last_modified`` is a datetime or None."""
+        values = self.get_queryset().order_by().aggregate(**validator_aggregates(self.last_modified_fields))
+        return aggregate_validators(values)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if request.method in ('GET', 'HEAD'):
+            response, *self.validators = conditional_response(request, *self.get_validators(request, *args, **kwargs))
+            if response is not None:
+                raise PreconditionResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, PreconditionResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'validators', None):
+            add_validators(request, response, *self.validators)
+        return response
+
+
+class CacheVersionConditionalGetMixin(ConditionalGetMixin):
+    """
+    Validate against the version token of a ``salon.cache`` namespace (or of
+    several, with ``cache_namespaces``) instead of the database. Tokens are
+    nanosecond timestamps bumped on every change, so the newest one doubles as
+    Last-Modified and validating costs no query at all.
+    """
+    cache_namespace = None
+    cache_namespaces = ()
+
+    def get_validators(self, request, *args, **kwargs):
+        return version_validators([cache.get_version(namespace) for namespace in self.cache_namespaces or (self.cache_namespace,)])
+
+
+class AsyncConditionalGetMixin:
+    """ConditionalGetMixin for the async views of ``salon.async_views``; validators come from the async ORM."""
+    last_modified_fields = ('updated_at',)
+
+    async def get_validators(self, request, *args, **kwargs):
+        values = await self.get_queryset().order_by().aaggregate(**validator_aggregates(self.last_modified_fields))
+        return aggregate_validators(values)
+
+    async def initial(self, request, *args, **kwargs):
+        await super().initial(request, *args, **kwargs)
+        self.validators = None
+        if request.method in ('GET', 'HEAD'):
+            response, *self.validators = conditional_response(request, *await self.get_validators(request, *args, **kwargs))
+            if response is not None:
+                raise PreconditionResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, PreconditionResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'validators', None):
+            add_validators(request, response, *self.validators)
+        return response
+
+
+class AsyncCacheVersionConditionalGetMixin(AsyncConditionalGetMixin):
+    """CacheVersionConditionalGetMixin for async views."""
+    cache_namespace = None
+    cache_namespaces = ()
+
+    async def get_validators(self, request, *args, **kwargs):
+        return version_validators([
+            await cache.aget_version(namespace) for namespace in self.cache_namespaces or (self.cache_namespace,)
+        ])
@@ -0,0 +1,81 @@
+"""
+Read-replica routing.
+
+When ``REPLICA_DATABASE`` is set, GET and HEAD requests to views marked
+``read_from_replica`` read the salon tables from the replica
+(ReplicaReadMiddleware opens ``replica_reads()`` around them). Every other
+read, and every write, goes to the primary.
+
+Replicas lag behind. A request that writes to a salon table gets the
+``PRIMARY_COOKIE`` cookie for ``REPLICA_STICKY_SECONDS``, and that client's
+reads stay on the primary while it lasts, so it reads its own change. Other
+clients, and writes made outside a request (the workers), pin nothing.
+salon.cache builds entries for a version bumped less than
+``REPLICA_STICKY_SECONDS`` ago from the primary, so rows the replica does not
+have yet are never cached under the new version.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY_COOKIE = 'salon_primary'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_written_models = ContextVar('written_models', default=None)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Read the salon tables from the replica, if one is configured, inside this
+    block; ``enabled=False`` reads them from the primary.
+    """
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def reading_from_replica():
+    return bool(settings.REPLICA_DATABASE) and _replica_reads.get()
+
+
+@contextmanager
+def track_writes():
+    """Yield a set collecting the labels of the salon models written inside this block."""
+    written = set()
+    token = _written_models.set(written)
+    try:
+        yield written
+    finally:
+        _written_models.reset(token)
+
+
+class ReplicaRouter:
+    # Only these apps are routed; the cache, sessions and auth stay with Django's defaults
+    app_labels = {'salon'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.app_labels:
+            return None
+        if reading_from_replica():
+            return settings.REPLICA_DATABASE
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in self.app_labels:
+            return None
+        written = _written_models.get()
+        if written is not None:
+            written.add(model._meta.label)
+        # Explicitly, so instances read from the replica are saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the primary's rows
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}:
+            return True
+        return None
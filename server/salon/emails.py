@@ -0,0 +1,234 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Appointment, OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _format_time(appointment):
+    return appointment.appointment_time.strftime('%I:%M %p') if appointment.appointment_time else ''
+
+
+def customer_confirmation(appointment):
+    """Build the 'we received your request' email for the customer."""
+    context = {
+        'customer_name': appointment.customer_name,
+        'service_type': appointment.service_type,
+        'appointment_date': appointment.appointment_date,
+        'appointment_time': _format_time(appointment),
+    }
+    return OutboxEmail(
+        appointment=appointment,
+        subject='We Have Received Your Appointment Request',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipients=[appointment.customer_email],
+        body_text=render_to_string('salon/appointment_received.txt', context),
+        body_html=render_to_string('salon/appointment_received.html', context),
+    )
+
+
+def admin_notification(appointment):
+    """Build the 'new appointment' email for ``settings.ADMIN_EMAILS``."""
+    formatted_time = _format_time(appointment)
+    context = {
+        'appointment': appointment,
+        'appointment_time': formatted_time,
+    }
+    body_text = f"""
+    A new appointment has been booked.
+
+    Details:
+    Name: {appointment.customer_name}
+    Email: {appointment.customer_email}
+    Phone: {appointment.customer_phone}
+    Service: {appointment.service_type}
+    Date: {appointment.appointment_date}
+    Time: {formatted_time}
+    Notes: {appointment.notes}
+    """
+    return OutboxEmail(
+        appointment=appointment,
+        subject=f'New Appointment Request: {appointment.customer_name}',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipients=list(settings.ADMIN_EMAILS),
+        body_text=body_text,
+        body_html=render_to_string('salon/admin_appointment_notification.html', context),
+    )
+
+
+def admin_notified_at():
+    """
+    ``admin_notified_at`` for a new appointment: now when admins are notified
+    per booking, None while it waits for the next digest. Pass it to the save
+    that creates the appointment.
+    """
+    return None if settings.ADMIN_NOTIFICATION_MODE == 'digest' else timezone.now()
+
+
+def enqueue_appointment_emails(appointment):
+    """
+    Queue the customer confirmation for ``appointment`` and, unless admin
+    notifications are batched into digests, the admin notification.
+
+    Call this inside the transaction that creates the appointment, so either
+    both the booking and its emails are stored or neither is.
+    """
+    emails = [customer_confirmation(appointment)]
+    if settings.ADMIN_NOTIFICATION_MODE != 'digest' and settings.ADMIN_EMAILS:
+        emails.append(admin_notification(appointment))
+    OutboxEmail.objects.bulk_create(emails)
+
+
+def enqueue_admin_digest():
+    """
+    Queue one summary email covering every appointment the admins have not
+    been told about, once the oldest of them is ``ADMIN_DIGEST_WINDOW``
+    minutes old. Returns the number of appointments in the digest.
+    """
+    window = timedelta(minutes=settings.ADMIN_DIGEST_WINDOW)
+    now = timezone.now()
+
+    with transaction.atomic():
+        appointments = list(
+            Appointment.objects.select_for_update(skip_locked=True)
+            .filter(admin_notified_at__isnull=True)
+            .order_by('created_at')
+        )
+        if not appointments or appointments[0].created_at > now - window:
+            return 0
+
+        if settings.ADMIN_EMAILS:
+            context = {
+                'appointments': [
+                    {'appointment': appointment, 'appointment_time': _format_time(appointment)}
+                    for appointment in appointments
+                ],
+                'window_start': appointments[0].created_at,
+                'window_end': appointments[-1].created_at,
+            }
+            count = len(appointments)
+            OutboxEmail.objects.create(
+                subject=f'{count} New Appointment Request{"s" if count != 1 else ""}',
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipients=list(settings.ADMIN_EMAILS),
+                body_text=render_to_string('salon/admin_appointment_digest.txt', context),
+                body_html=render_to_string('salon/admin_appointment_digest.html', context),
+            )
+
+        Appointment.objects.filter(pk__in=[a.pk for a in appointments]).update(admin_notified_at=now)
+
+    logger.info(f"Admin digest queued for {len(appointments)} appointments.")
+    return len(appointments)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base * 2^(attempts - 1), capped."""
+    delay = settings.EMAIL_OUTBOX_RETRY_BACKOFF * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+
+def as_message(email, connection):
+    msg = EmailMultiAlternatives(email.subject, email.body_text, email.from_email, email.recipients, connection=connection)
+    if email.body_html:
+        msg.attach_alternative(email.body_html, "text/html")
+    return msg
+
+
+def pending_count():
+    return OutboxEmail.objects.filter(status='pending').count()
+
+
+def claim_due_emails(batch_size):
+    """
+    Claim up to ``batch_size`` due outbox emails for this worker and commit.
+
+    Rows are locked with ``SKIP LOCKED`` (where supported) only while they are
+    marked ``sending``, so several workers can drain the outbox concurrently
+    and no lock is held while mail goes out. A claim lapses after
+    ``EMAIL_OUTBOX_CLAIM_TIMEOUT`` seconds, after which the rows of a worker
+    that died mid-batch are picked up again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        for email in batch:
+            email.status = 'sending'
+            email.attempts += 1
+            email.next_attempt_at = now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+        OutboxEmail.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at'])
+    return batch
+
+
+def record_result(email, fields):
+    """Save the outcome of a send, unless the claim lapsed and another worker took the row over."""
+    values = {field: getattr(email, field) for field in fields}
+    return OutboxEmail.objects.filter(pk=email.pk, status='sending', attempts=email.attempts).update(**values)
+
+
+def send_due_emails(batch_size):
+    """
+    Send up to ``batch_size`` due outbox emails over a single SMTP connection.
+
+    The batch is claimed and committed first, sent outside any transaction,
+    and each result is recorded as soon as its email has gone out, so a crash
+    or a database error mid-batch never marks delivered emails for sending
+    again. Returns a dict of batch statistics.
+    """
+    stats = {'sent': 0, 'retried': 0, 'failed': 0, 'latencies': []}
+
+    batch = claim_due_emails(batch_size)
+    if not batch:
+        return stats
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # The relay is down: nothing in this batch can go out.
+        logger.error(f"Could not open email connection: {e}", exc_info=True)
+        connection = None
+
+    try:
+        for email in batch:
+            started = time.monotonic()
+            try:
+                if connection is None:
+                    raise ConnectionError("Email connection unavailable.")
+                as_message(email, connection).send()
+            except Exception as e:
+                email.last_error = str(e)
+                if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    email.status = 'failed'
+                    stats['failed'] += 1
+                    logger.error(f"Giving up on outbox email {email.id} after {email.attempts} attempts: {e}")
+                else:
+                    email.status = 'pending'
+                    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                    stats['retried'] += 1
+                    logger.warning(f"Outbox email {email.id} failed (attempt {email.attempts}), retrying at {email.next_attempt_at}: {e}")
+                record_result(email, ['status', 'next_attempt_at', 'last_error'])
+            else:
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                record_result(email, ['status', 'sent_at', 'last_error'])
+                stats['sent'] += 1
+                stats['latencies'].append((email.sent_at - email.created_at).total_seconds())
+                logger.info(f"Outbox email {email.id} sent to {', '.join(email.recipients)} in {time.monotonic() - started:.3f}s")
+    finally:
+        if connection is not None:
+            connection.close()
+
+    return stats
@@ -0,0 +1,91 @@
+"""
+Product catalog filters and facet counts.
+
+Facets are disjunctive: the category counts honour every filter except the
+category one, and the price counts every filter except the price range, so a
+client can show how many products each other choice would give. Both come
+from one ``GROUP BY category, price bucket`` query, summed up here.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import BooleanField, Case, Count, IntegerField, Q, Value, When
+
+
+def price_q(filters):
+    q = Q()
+    if filters.get('min_price') is not None:
+        q &= Q(price__gte=filters['min_price'])
+    if filters.get('max_price') is not None:
+        q &= Q(price__lte=filters['max_price'])
+    return q
+
+
+def flag_q(filters):
+    q = Q()
+    if filters.get('in_stock') is not None:
+        q &= Q(in_stock=filters['in_stock'])
+    if filters.get('featured') is not None:
+        q &= Q(is_featured=filters['featured'])
+    return q
+
+
+def filter_products(queryset, filters):
+    queryset = queryset.filter(flag_q(filters), price_q(filters))
+    if filters.get('category'):
+        queryset = queryset.filter(category__in=filters['category'])
+    return queryset
+
+
+def price_buckets():
+    """Return ``(min, max)`` bounds of each bucket; the last ``max`` is None."""
+    edges = settings.PRODUCT_PRICE_BUCKETS
+    return list(zip([Decimal(0)] + edges, edges + [None]))
+
+
+def product_facets(queryset, filters):
+    return count_facets(facet_rows(queryset, filters), filters)
+
+
+async def aproduct_facets(queryset, filters):
+    return count_facets([row async for row in facet_rows(queryset, filters)], filters)
+
+
+def facet_rows(queryset, filters):
+    """The ``GROUP BY category, price bucket`` counts, not yet evaluated."""
+    edges = settings.PRODUCT_PRICE_BUCKETS
+    bucket = Case(
+        *[When(price__lt=edge, then=Value(i)) for i, edge in enumerate(edges)],
+        default=Value(len(edges)),
+        output_field=IntegerField(),
+    )
+    in_price = price_q(filters)
+    in_price = Case(When(in_price, then=Value(True)), default=Value(False), output_field=BooleanField()) if in_price else Value(True)
+
+    return (
+        queryset.filter(flag_q(filters))
+        .order_by()
+        .annotate(bucket=bucket, in_price=in_price)
+        .values('category', 'bucket', 'in_price')
+        .annotate(count=Count('pk'))
+    )
+
+
+def count_facets(rows, filters):
+    edges = settings.PRODUCT_PRICE_BUCKETS
+    selected = set(filters.get('category') or ())
+    categories = {}
+    buckets = [0] * (len(edges) + 1)
+    for row in rows:
+        if row['in_price']:
+            categories[row['category']] = categories.get(row['category'], 0) + row['count']
+        if not selected or row['category'] in selected:
+            buckets[row['bucket']] += row['count']
+
+    return {
+        'category': [{'value': name, 'count': count} for name, count in sorted(categories.items())],
+        'price': [
+            {'min': str(low), 'max': str(high) if high is not None else None, 'count': count}
+            for (low, high), count in zip(price_buckets(), buckets)
+        ],
+    }
@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from salon.models import DashboardContent
+
+SERVERS = ('wsgi', 'asgi')
+ENDPOINTS = ('healthcheck', 'banner-list', 'service-list', 'product-list', 'dashboard-content-all')
+
+
+def wsgi_environ(path, host):
+    path, _, query = path.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'HTTP_ACCEPT_ENCODING': 'br, gzip',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def wsgi_get(application, path, host):
+    status = []
+    response = application(wsgi_environ(path, host), lambda code, headers, exc_info=None: status.append(code))
+    try:
+        b''.join(response)
+    finally:
+        response.close()  # sends request_finished, as a server would
+    return int(status[0].split()[0])
+
+
+async def asgi_get(application, path, host):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', host.encode()), (b'accept-encoding', b'br, gzip')],
+        'server': (host, 80),
+        'client': ('127.0.0.1', 50000),
+    }
+    status = []
+    finished = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Django listens for a disconnect while the view runs
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif not message.get('more_body'):
+            finished.set()
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the concurrent throughput of the read endpoints under WSGI (DRF views on a fixed pool of '
+        '--wsgi-threads, like gunicorn --threads) and ASGI (the async views of salon.async_views on one event '
+        'loop). Each server runs in its own process and is driven in-process, without a network, with INFO '
+        'logging off. Uses existing rows, see seed_perf_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help='Requests per endpoint and concurrency level.')
+        parser.add_argument('--concurrency', default='1,8,32', help='Comma separated numbers of requests in flight.')
+        parser.add_argument('--wsgi-threads', type=int, default=8, help='Threads serving WSGI requests.')
+        parser.add_argument('--db-latency', type=float, default=0,
+                            help='Milliseconds added to every query, to stand in for a database across a network.')
+        parser.add_argument('--endpoint', action='append', help='Only run these URL names (repeatable).')
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--server', choices=SERVERS, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency takes comma separated integers, e.g. 1,8,32.')
+        if options['server']:
+            return self.run_server(options, levels)
+
+        results = {server: self.spawn(server, options) for server in SERVERS}
+        self.stdout.write(f'{"endpoint":26} {"in flight":>9} {"wsgi req/s":>11} {"asgi req/s":>11}')
+        for name in results['wsgi']:
+            for level in levels:
+                wsgi, asgi = results['wsgi'][name][str(level)], results['asgi'][name][str(level)]
+                style = self.style.SUCCESS if asgi >= wsgi else self.style.WARNING
+                self.stdout.write(f'{name:26} {level:9} {wsgi:11.1f} {asgi:11.1f}  ' + style(f'{asgi / wsgi:.2f}x'))
+
+    def spawn(self, server, options):
+        # ASYNC_READ_VIEWS is read when the URLconf is imported, so each
+        # server needs a fresh process (config/asgi.py defaults it on)
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_asgi', '--server', server,
+            '--requests', str(options['requests']), '--concurrency', options['concurrency'],
+            '--wsgi-threads', str(options['wsgi_threads']), '--db-latency', str(options['db_latency']),
+            '--host', options['host'],
+        ]
+        for name in options['endpoint'] or ():
+            command += ['--endpoint', name]
+        env = {**os.environ, 'ASYNC_READ_VIEWS': str(server == 'asgi')}
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'The {server} run failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_server(self, options, levels):
+        logging.disable(logging.INFO)
+        if options['db_latency']:
+            delay = options['db_latency'] / 1000
+
+            def slow_execute(execute, sql, params, many, context):
+                time.sleep(delay)
+                return execute(sql, params, many, context)
+
+            def add_latency(connection, **kwargs):
+                # Each thread has its own connections, reopened per request.
+                # First in the list, as execute_wrapper() pops the last one
+                if slow_execute not in connection.execute_wrappers:
+                    connection.execute_wrappers.insert(0, slow_execute)
+
+            connection_created.connect(add_latency, weak=False)
+
+        paths = {name: reverse(name) for name in ENDPOINTS}
+        content = DashboardContent.objects.values_list('slug', flat=True).first()
+        if content is not None:
+            paths['dashboard-content-detail'] = reverse('dashboard-content-detail', kwargs={'slug': content})
+        if options['endpoint']:
+            paths = {name: path for name, path in paths.items() if name in options['endpoint']}
+
+        if options['server'] == 'asgi':
+            from config.asgi import application
+            run = self.run_asgi
+        else:
+            from config.wsgi import application
+            pool = ThreadPoolExecutor(options['wsgi_threads'])
+            run = partial(self.run_wsgi, pool)
+
+        results = {}
+        for name, path in paths.items():
+            results[name] = {}
+            run(application, path, options['host'], 10, 1)  # warm up caches and connections
+            for level in levels:
+                started = time.perf_counter()
+                statuses = run(application, path, options['host'], options['requests'], level)
+                elapsed = time.perf_counter() - started
+                if set(statuses) != {200}:
+                    raise CommandError(f'{path} answered {sorted(set(statuses))} under {options["server"]}.')
+                results[name][str(level)] = len(statuses) / elapsed
+        self.stdout.write(json.dumps(results))
+
+    @staticmethod
+    def run_wsgi(pool, application, path, host, requests, concurrency):
+        # ``concurrency`` clients, each sending its next request once the
+        # last one is answered; beyond the pool size they queue for a thread
+        pending = iter(range(requests))
+        statuses = []
+
+        def client():
+            for _ in pending:
+                statuses.append(pool.submit(wsgi_get, application, path, host).result())
+
+        with ThreadPoolExecutor(concurrency) as clients:
+            for future in [clients.submit(client) for _ in range(concurrency)]:
+                future.result()
+        return statuses
+
+    @staticmethod
+    def run_asgi(application, path, host, requests, concurrency):
+        async def run():
+            pending = iter(range(requests))
+            statuses = []
+
+            async def client():
+                for _ in pending:
+                    statuses.append(await asgi_get(application, path, host))
+
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+            return statuses
+        return asyncio.run(run())
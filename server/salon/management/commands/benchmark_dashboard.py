@@ -0,0 +1,58 @@
+import copy
+import timeit
+
+from django.core.management.base import BaseCommand
+from salon.benchmarking import build_blob
+from salon.models import DashboardContent, find_image_paths
+
+
+def legacy_resolve(data, images):
+    """The deepcopy + full walk DashboardContentView used to run per request."""
+    def process_data(data, images):
+        if isinstance(data, dict):
+            if data.get('icon_type') == 'image' and data.get('image_key'):
+                data['image'] = images.get(data['image_key'])
+
+            for key in data:
+                data[key] = process_data(data[key], images)
+        elif isinstance(data, list):
+            for i, item in enumerate(data):
+                data[i] = process_data(item, images)
+        return data
+
+    return process_data(copy.deepcopy(data), images)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks dashboard image-slot resolution: deepcopy + walk vs precomputed image paths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, default=50)
+        parser.add_argument('--cards', type=int, default=100)
+        parser.add_argument('--image-every', type=int, default=10,
+                            help='Make every Nth card an image slot.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        data = build_blob(options['sections'], options['cards'], options['image_every'])
+        content = DashboardContent(slug='benchmark', data=data, image_paths=find_image_paths(data))
+        images = {
+            f'image-{s}-{c}': f'https://example.com/image-{s}-{c}.png'
+            for s in range(options['sections'])
+            for c in range(0, options['cards'], options['image_every'])
+        }
+
+        if legacy_resolve(data, images) != content.resolve_images(images):
+            self.stdout.write(self.style.ERROR('Resolved outputs differ, aborting.'))
+            return
+
+        repeat = options['repeat']
+        legacy = min(timeit.repeat(lambda: legacy_resolve(data, images), number=1, repeat=repeat))
+        indexed = min(timeit.repeat(lambda: content.resolve_images(images), number=1, repeat=repeat))
+
+        self.stdout.write(
+            f'{options["sections"] * options["cards"]} cards, {len(content.image_paths)} image slots'
+        )
+        self.stdout.write(f'deepcopy + walk:   {legacy * 1000:.3f} ms')
+        self.stdout.write(f'image path index:  {indexed * 1000:.3f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {legacy / indexed:.1f}x'))
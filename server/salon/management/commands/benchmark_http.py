@@ -0,0 +1,254 @@
+import json
+import re
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from salon import urls
+from salon.models import Appointment, DashboardContent, Product, Service
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+# Only run with --writes
+WRITE_ENDPOINTS = {'appointment-list', 'product-set-featured'}
+# Need an admin session, which only the test client can log into
+ADMIN_ENDPOINTS = {'product-set-featured'}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks every endpoint in salon/urls.py through the Django test client (default) or a running '
+        'server (--url), reporting p50/p95/p99 latency, throughput and queries per request. '
+        'POST endpoints only run with --writes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server, e.g. http://localhost:8000')
+        parser.add_argument('--host', default='localhost', help='Host header used with the test client.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--endpoint', action='append', help='Only run these URL names (repeatable).')
+        parser.add_argument('--writes', action='store_true', help='Also benchmark the POST endpoints (bookings, featured products).')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against.')
+
+    def samples(self):
+        """
+        Return ``{url name: (method, reverse kwargs, query string / POST data)}``
+        for every route, with None for routes the database has no rows for.
+        POST data of None is replaced by a fresh booking on each request.
+        """
+        product = Product.objects.order_by('pk').values_list('pk', 'name').first()
+        featured = list(Product.objects.filter(is_featured=True).order_by('featured_rank', 'pk').values_list('pk', flat=True))
+        service = Service.objects.filter(is_active=True).values_list('slug', flat=True).first()
+        content = DashboardContent.objects.values_list('slug', flat=True).first()
+        future = date.today() + timedelta(days=7)
+
+        return {
+            'api-root': ('get', {}, {}),
+            'healthcheck': ('get', {}, {}),
+            'bootstrap': ('get', {}, {}),
+            'product-list': ('get', {}, {}),
+            'product-detail': product and ('get', {'pk': product[0]}, {}),
+            'product-in-stock': ('get', {}, {}),
+            'product-featured': ('get', {}, {}),
+            # Re-sets the current featured products, in the same order
+            'product-set-featured': product and ('post', {}, {'ids': featured or [product[0]]}),
+            'banner-list': ('get', {}, {}),
+            'service-list': ('get', {}, {}),
+            'search': product and ('get', {}, {'q': product[1]}),
+            'dashboard-content-all': ('get', {}, {}),
+            'dashboard-content-detail': content and ('get', {'slug': content}, {}),
+            'appointment-availability': service and ('get', {}, {'date': future.isoformat(), 'service': service}),
+            'appointment-list': ('post', {}, None),
+        }
+
+    def endpoints(self, options):
+        """Return ``(name, method, kwargs, data)`` for every route in salon/urls.py the run covers."""
+        samples = self.samples()
+        names = list(dict.fromkeys(urls.url_names(urls.urlpatterns)))
+        missing = [name for name in names if name not in samples]
+        if missing:
+            raise CommandError(f'No sample request for {", ".join(missing)}; add them to benchmark_http.samples().')
+
+        endpoints = []
+        for name in names:
+            if options['endpoint'] and name not in options['endpoint']:
+                continue
+            if name in WRITE_ENDPOINTS and not options['writes']:
+                continue
+            if samples[name] is None:
+                self.stderr.write(self.style.WARNING(f'Skipping {name}: no rows to request it with.'))
+            elif name in ADMIN_ENDPOINTS and options['url']:
+                self.stderr.write(self.style.WARNING(f'Skipping {name}: it needs an admin session (test client only).'))
+            else:
+                endpoints.append((name, *samples[name]))
+
+        if options['writes']:
+            last = (
+                Appointment.objects.filter(customer_email__startswith='perf-benchmark-')
+                .aggregate(last=Max('appointment_date'))['last']
+            )
+            self.first_booking_day = max(
+                last + timedelta(days=1) if last else date.today(), date.today() + timedelta(days=365),
+            )
+        return endpoints
+
+    def booking(self, i):
+        # One booking per hour on days no earlier run has used, so they don't conflict.
+        day = self.first_booking_day + timedelta(days=i // 8)
+        return {
+            'customer_name': f'Benchmark {i}',
+            'customer_email': f'perf-benchmark-{i}@example.com',
+            'customer_phone': '9800000000',
+            'appointment_date': day.isoformat(),
+            'appointment_time': f'{10 + i % 8}:00',
+            'service_type': 'Benchmark',
+        }
+
+    def make_requester(self, options, admin=False):
+        if options['url']:
+            import requests
+
+            base = options['url'].rstrip('/')
+            session = requests.Session()
+
+            def send(method, path, data):
+                response = session.request(method, base + path, params=data if method == 'get' else None,
+                                           data=data if method == 'post' else None)
+                return response.status_code, response.headers.get('Server-Timing', '')
+            return send
+
+        client = Client(HTTP_HOST=options['host'])
+        if admin:
+            user = User.objects.filter(is_superuser=True, is_active=True).first()
+            if user is None:
+                raise CommandError('Benchmarking admin endpoints needs a superuser (python manage.py createsuperuser).')
+            client.force_login(user)
+
+        def send(method, path, data):
+            response = getattr(client, method)(path, data)
+            # Close connections like the request_finished signal would in a server
+            for connection in connections.all(initialized_only=True):
+                connection.close_if_unusable_or_obsolete()
+            return response.status_code, response.headers.get('Server-Timing', '')
+        return send
+
+    def run_endpoint(self, send, name, method, kwargs, data, options):
+        path = reverse(name, kwargs=kwargs)
+        counter = iter(range(10 ** 9))
+
+        def one():
+            body = self.booking(next(counter)) if data is None else data
+            started = time.perf_counter()
+            status_code, server_timing = send(method, path, body)
+            elapsed = time.perf_counter() - started
+            match = SERVER_TIMING_QUERIES.search(server_timing)
+            return elapsed, status_code, int(match.group(1)) if match else None
+
+        for _ in range(options['warmup']):
+            one()
+
+        started = time.perf_counter()
+        if options['concurrency'] > 1:
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                samples = list(pool.map(lambda _: one(), range(options['requests'])))
+        else:
+            samples = [one() for _ in range(options['requests'])]
+        wall = time.perf_counter() - started
+
+        latencies = [elapsed * 1000 for elapsed, _, _ in samples]
+        queries = [count for _, _, count in samples if count is not None]
+        statuses = {}
+        for _, status_code, _ in samples:
+            statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+
+        return {
+            'path': path,
+            'method': method.upper(),
+            'requests': len(samples),
+            'statuses': statuses,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.mean(latencies), 3),
+            'throughput_rps': round(len(samples) / wall, 1),
+            'queries_per_request': round(statistics.mean(queries), 2) if queries else None,
+        }
+
+    def handle(self, *args, **options):
+        if options['concurrency'] > 1 and not options['url']:
+            raise CommandError('--concurrency needs --url; the test client runs requests in-process.')
+
+        endpoints = self.endpoints(options)
+
+        send = self.make_requester(options)
+        admin_send = None
+        results = {}
+        for name, method, kwargs, data in endpoints:
+            if name in ADMIN_ENDPOINTS:
+                admin_send = admin_send or self.make_requester(options, admin=True)
+            results[name] = result = self.run_endpoint(
+                admin_send if name in ADMIN_ENDPOINTS else send, name, method, kwargs, data, options,
+            )
+            self.stdout.write(
+                f'{name:28} p50 {result["p50_ms"]:8.2f}ms  p95 {result["p95_ms"]:8.2f}ms  '
+                f'p99 {result["p99_ms"]:8.2f}ms  {result["throughput_rps"]:8.1f} req/s  '
+                f'queries {result["queries_per_request"]}  {result["statuses"]}'
+            )
+
+        report = {
+            'commit': git_commit(),
+            'timestamp': timezone.now().isoformat(),
+            'database': connections['default'].vendor,
+            'target': options['url'] or 'test-client',
+            'concurrency': options['concurrency'],
+            'results': results,
+        }
+
+        if options['compare']:
+            self.compare(json.loads(Path(options['compare']).read_text()), report)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+    def compare(self, baseline, report):
+        self.stdout.write(f'\nCompared with {baseline.get("commit") or "baseline"}:')
+        for name, result in report['results'].items():
+            before = baseline['results'].get(name)
+            if not before:
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+            self.stdout.write(style(
+                f'{name:28} p50 {before["p50_ms"]:8.2f} -> {result["p50_ms"]:8.2f}ms ({change:+.1f}%)  '
+                f'queries {before["queries_per_request"]} -> {result["queries_per_request"]}'
+            ))
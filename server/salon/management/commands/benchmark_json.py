@@ -0,0 +1,57 @@
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import resolve, reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from config.renderers import FastJSONRenderer, orjson
+from salon.models import Product, Service
+from salon.serializers import ProductValuesSerializer, ServiceValuesSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks JSON encoding of real API payloads: DRF JSONRenderer (stdlib json) vs FastJSONRenderer (orjson). '
+        'Uses existing rows, see seed_perf_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows in the unpaginated product/service lists.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def payloads(self, rows):
+        factory = APIRequestFactory()
+        request = factory.get('/', HTTP_HOST='localhost')
+        context = {'request': request}
+
+        for name in ('dashboard-content-all', 'service-list', 'product-list'):
+            path = reverse(name)
+            response = resolve(path).func(factory.get(path, HTTP_HOST='localhost'))
+            if response.status_code != 200:
+                raise CommandError(f'{path} answered {response.status_code}.')
+            yield name, response.data
+
+        for name, queryset, serializer_class in [
+            ('services (unpaginated)', Service.objects.filter(is_active=True).order_by('title'), ServiceValuesSerializer),
+            ('products (unpaginated)', Product.objects.all(), ProductValuesSerializer),
+        ]:
+            serializer = serializer_class(context=context)
+            yield name, serializer.serialize(serializer.select(queryset[:rows]))
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson is not installed; FastJSONRenderer would use the stdlib encoder.')
+
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        repeat = options['repeat']
+        for name, data in self.payloads(options['rows']):
+            encoded = stdlib.render(data)
+            if fast.render(data) != encoded:
+                raise CommandError(f'{name}: outputs differ, aborting.')
+
+            before = min(timeit.repeat(lambda: stdlib.render(data), number=1, repeat=repeat))
+            after = min(timeit.repeat(lambda: fast.render(data), number=1, repeat=repeat))
+            self.stdout.write(
+                f'{name:26} {len(encoded) / 1024:9.1f} KiB  json {before * 1000:8.3f} ms  '
+                f'orjson {after * 1000:8.3f} ms  ' + self.style.SUCCESS(f'{before / after:.1f}x')
+            )
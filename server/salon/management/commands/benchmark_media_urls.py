@@ -0,0 +1,52 @@
+import timeit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from rest_framework.test import APIRequestFactory
+from salon.models import Banner, Product, Service
+from salon.serializers import BannerValuesSerializer, ProductValuesSerializer, ServiceValuesSerializer
+from salon.views import DashboardContentView
+
+ENDPOINTS = ('/api/products/', '/api/banners/', '/api/services/')
+LISTS = {
+    'products': (Product.objects.all, ProductValuesSerializer),
+    'banners': (Banner.objects.all, BannerValuesSerializer),
+    'services': (lambda: Service.objects.filter(is_active=True).order_by('title'), ServiceValuesSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the list endpoints and serializers with and without the storage URL cache (salon.media). '
+        'Uses existing rows, see seed_perf_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Rows per unpaginated list.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if settings.MEDIA_URL_CACHE_SIZE <= 0:
+            raise CommandError('MEDIA_URL_CACHE_SIZE is 0, the URL cache is disabled.')
+
+        client = Client(HTTP_HOST='localhost')
+        context = {'request': APIRequestFactory().get('/', HTTP_HOST='localhost')}
+        runs = {path: lambda path=path: client.get(path) for path in ENDPOINTS}
+        for name, (queryset, serializer_class) in LISTS.items():
+            serializer = serializer_class(context=context)
+            rows = list(serializer.select(queryset()[:options['rows']]))
+            runs[f'{name} ({len(rows)} rows)'] = lambda serializer=serializer, rows=rows: serializer.serialize(rows)
+        runs['dashboard content'] = DashboardContentView().build_response_data
+
+        for label, run in runs.items():
+            number = options['requests'] if label in ENDPOINTS else 1
+            with override_settings(MEDIA_URL_CACHE_SIZE=0):
+                uncached = min(timeit.repeat(run, number=number, repeat=options['repeat'])) / number
+            run()  # warm the cache
+            cached = min(timeit.repeat(run, number=number, repeat=options['repeat'])) / number
+            self.stdout.write(
+                f'{label:26} uncached {uncached * 1000:8.3f} ms  cached {cached * 1000:8.3f} ms  '
+                + self.style.SUCCESS(f'{uncached / cached:.1f}x')
+            )
@@ -0,0 +1,72 @@
+import timeit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from salon.models import Banner, Product, Service
+from salon.serializers import (
+    BannerSerializer, BannerValuesSerializer, ProductSerializer, ProductValuesSerializer, ServiceSerializer,
+    ServiceValuesSerializer,
+)
+
+LISTS = {
+    'products': (lambda: Product.objects.all(), ProductSerializer, ProductValuesSerializer),
+    'banners': (lambda: Banner.objects.all(), BannerSerializer, BannerValuesSerializer),
+    'services': (lambda: Service.objects.select_related('category'), ServiceSerializer, ServiceValuesSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the list serializers: ModelSerializer on model instances vs ValuesSerializer on .values() rows. '
+        'Uses existing rows, see seed_perf_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--list', choices=list(LISTS), action='append', help='Only run these lists (repeatable).')
+        parser.add_argument('--local-storage', action='store_true',
+                            help='Build image URLs with FileSystemStorage, leaving out Cloudinary URL generation.')
+
+    def handle(self, *args, **options):
+        if not options['local_storage']:
+            return self.run(options)
+        with override_settings(STORAGES={**settings.STORAGES, 'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'}}):
+            return self.run(options)
+
+    def run(self, options):
+        context = {'request': APIRequestFactory().get('/', HTTP_HOST='localhost')}
+        renderer = JSONRenderer()
+        repeat = options['repeat']
+
+        for name in options['list'] or LISTS:
+            build, serializer_class, values_serializer_class = LISTS[name]
+            queryset = build()[:options['rows']]
+            values_serializer = values_serializer_class(context=context)
+            instances = list(queryset)
+            rows = list(values_serializer.select(queryset))
+            if not rows:
+                raise CommandError(f'No {name} to serialize, run seed_perf_data first.')
+
+            model_output = renderer.render(serializer_class(instances, many=True, context=context).data)
+            if renderer.render(values_serializer.serialize(rows)) != model_output:
+                raise CommandError(f'{name}: outputs differ, aborting.')
+
+            timings = {
+                'model serializer': lambda: serializer_class(instances, many=True, context=context).data,
+                'values serializer': lambda: values_serializer.serialize(rows),
+                'model fetch + serialize': lambda: serializer_class(list(queryset), many=True, context=context).data,
+                'values fetch + serialize': lambda: values_serializer.serialize(values_serializer.select(queryset)),
+            }
+            best = {label: min(timeit.repeat(run, number=1, repeat=repeat)) for label, run in timings.items()}
+
+            self.stdout.write(f'{name}: {len(rows)} rows')
+            for label, seconds in best.items():
+                self.stdout.write(f'  {label:26} {seconds * 1000:9.2f} ms  {seconds / len(rows) * 1_000_000:7.2f} us/row')
+            self.stdout.write(self.style.SUCCESS(
+                f'  Speedup: {best["model serializer"] / best["values serializer"]:.1f}x serializing, '
+                f'{best["model fetch + serialize"] / best["values fetch + serialize"]:.1f}x with the query'
+            ))
@@ -0,0 +1,44 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from salon.catalog import FORMATS, IMPORTERS, RowWriter, export_rows, format_for
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams every product or service to a CSV or JSON Lines file in the format import_catalog reads, '
+        'without loading the table into memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='File to write, or - for stdout.')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows fetched from the database at a time.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            format = format_for(path, options['format'] or ('csv' if path == '-' else None))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.monotonic()
+        count = 0
+        file = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            writer = RowWriter(file, format, IMPORTERS[options['kind']].columns)
+            for row in export_rows(options['kind'], options['batch_size']):
+                writer.write(row)
+                count += 1
+                if count % 10000 == 0:
+                    self.stderr.write(f'{count} rows exported')
+        finally:
+            if file is not sys.stdout:
+                file.close()
+
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {count} {options["kind"]} in {elapsed:.1f}s, {count / max(elapsed, 1e-9):.0f} rows/s'
+        ))
@@ -0,0 +1,70 @@
+import sys
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from salon.catalog import FORMATS, IMPORTERS, CatalogError, chunked, format_for, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams products or services from a CSV or JSON Lines file into the database. Rows are matched on id '
+        '(products) or slug (services), validated a chunk at a time and written with bulk_create and batched UPDATEs, '
+        'one transaction per chunk. Service categories are given by slug.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='File to read, or - for stdin.')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per chunk and transaction.')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Report and skip invalid rows instead of stopping at the first invalid chunk.')
+        parser.add_argument('--atomic', action='store_true',
+                            help='Import the whole file in one transaction, so a failure leaves nothing behind.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            format = format_for(path, options['format'] or ('csv' if path == '-' else None))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        importer = IMPORTERS[options['kind']]()
+        totals = {'created': 0, 'updated': 0, 'skipped': 0}
+        started = time.monotonic()
+
+        file = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            with file, (transaction.atomic() if options['atomic'] else nullcontext()):
+                # Row numbers are 1-based data rows, so CSV row n is on line n + 1
+                for chunk in chunked(enumerate(read_rows(file, format), start=1), options['batch_size']):
+                    created, updated, errors = importer.import_chunk(chunk, options['skip_invalid'])
+                    totals['created'] += created
+                    totals['updated'] += updated
+                    totals['skipped'] += len(errors)
+                    self.report_errors(errors)
+                    self.report_progress(totals, started)
+        except CatalogError as e:
+            self.report_errors(e.errors)
+            done = 'nothing was imported' if options['atomic'] else f'{totals["created"] + totals["updated"]} rows were imported before it'
+            raise CommandError(f'Stopped at a chunk with {len(e.errors)} invalid rows; {done}.')
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        elapsed = time.monotonic() - started
+        rows = totals['created'] + totals['updated']
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {rows} {options["kind"]} ({totals["created"]} created, {totals["updated"]} updated, '
+            f'{totals["skipped"]} skipped) in {elapsed:.1f}s, {rows / max(elapsed, 1e-9):.0f} rows/s'
+        ))
+
+    def report_errors(self, errors):
+        for number, message in errors:
+            self.stderr.write(f'Row {number}: {message}')
+
+    def report_progress(self, totals, started):
+        rows = totals['created'] + totals['updated'] + totals['skipped']
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'{rows} rows processed, {rows / max(elapsed, 1e-9):.0f} rows/s')
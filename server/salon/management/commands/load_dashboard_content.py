@@ -1,28 +1,190 @@
 import json
+import sys
+import time
 from pathlib import Path
-from django.core.management.base import BaseCommand
-from django.conf import settings
-from salon.models import DashboardContent
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_slug
+from django.db import transaction
+from django.utils import timezone
+from salon import cache
+from salon.catalog import chunked
+from salon.models import DashboardContent, find_image_paths, hash_data
+
+DEFAULT_PATH = Path(__file__).resolve().parent / 'dashboard_data.json'
+
+
+def iter_object_items(file, read_size=64 * 1024):
+    """
+    Yield the ``(key, value)`` members of the top-level JSON object in
+    ``file`` one at a time, so only one member is ever held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def more(size=read_size):
+        nonlocal buffer, pos, eof
+        chunk = file.read(size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return not eof
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or not more():
+                return buffer[pos] if pos < len(buffer) else ''
+
+    def decode():
+        nonlocal pos
+        size = read_size
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # A value that ends the buffer (a number, say) may go on in the next read
+                if end < len(buffer) or eof:
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            # Grow reads with the value, so re-parsing a huge one stays linear
+            more(size)
+            size = max(size, len(buffer))
+
+    if skip_whitespace() != '{':
+        raise ValueError('Expected a JSON object mapping slugs to content.')
+    pos += 1
+    first = True
+    while True:
+        char = skip_whitespace()
+        if char == '}':
+            return
+        if not first:
+            if char != ',':
+                raise ValueError('Expected , or } between JSON object members.')
+            pos += 1
+            skip_whitespace()
+        first = False
+        key = decode()
+        if not isinstance(key, str) or skip_whitespace() != ':':
+            raise ValueError(f'Invalid JSON object member near {key!r}.')
+        pos += 1
+        skip_whitespace()
+        yield key, decode()
+
+
+def iter_lines(file):
+    """Yield ``(slug, data)`` from JSON Lines rows of ``{"slug": ..., "data": ...}``."""
+    for line in file:
+        if line.strip():
+            row = json.loads(line)
+            yield row['slug'], row['data']
+
 
 class Command(BaseCommand):
-    help = 'Loads dashboard content from a JSON file into the DashboardContent model.'
+    help = (
+        'Loads dashboard content from a JSON file ({slug: data, ...}, or JSON Lines of {"slug", "data"}) into the '
+        'DashboardContent model. Unchanged slugs are skipped by comparing content hashes, and all changes are '
+        'written in one transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=str(DEFAULT_PATH),
+                            help='File to load, or - for stdin. Defaults to the bundled dashboard_data.json.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing.')
+        parser.add_argument('--diff', action='store_true', help='List the top-level keys that changed per slug.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Slugs written per bulk statement.')
 
     def handle(self, *args, **options):
-        json_file_path = Path(__file__).resolve().parent / 'dashboard_data.json'
+        path = options['path']
+        if path != '-' and not Path(path).exists():
+            raise CommandError(f'File not found at {path}')
 
-        if not json_file_path.exists():
-            self.stdout.write(self.style.ERROR(f'File not found at {json_file_path}'))
-            return
+        started = time.monotonic()
+        # Only hashes are read up front; stored data is fetched just for --diff
+        existing = {slug: (pk, data_hash) for slug, pk, data_hash in DashboardContent.objects.values_list('slug', 'pk', 'data_hash')}
+        totals = {'created': 0, 'updated': 0, 'unchanged': 0}
+        self.seen = set()
+
+        file = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            with file, transaction.atomic():
+                items = iter_lines(file) if path.endswith('.jsonl') else iter_object_items(file)
+                for chunk in chunked(items, options['batch_size']):
+                    self.apply(chunk, existing, totals, options)
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+                elif totals['created'] or totals['updated']:
+                    # bulk writes send no signals, so invalidate the cached content here
+                    cache.bump_version_on_commit(cache.DASHBOARD_CONTENT)
+        except (ValueError, KeyError, TypeError) as e:
+            raise CommandError(f'Could not load {path}: {e}')
+        except ValidationError as e:
+            raise CommandError(f'Could not load {path}: {" ".join(e.messages)}')
 
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
+        prefix = 'Dry run: would have' if options['dry_run'] else 'Dashboard content'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {totals["created"]} created, {totals["updated"]} updated, {totals["unchanged"]} unchanged '
+            f'in {time.monotonic() - started:.2f}s'
+        ))
 
-        for slug, content_data in data.items():
-            obj, created = DashboardContent.objects.update_or_create(
-                slug=slug,
-                defaults={'data': content_data}
+    def apply(self, chunk, existing, totals, options):
+        now = timezone.now()
+        creates, updates = [], []
+        for slug, data in chunk:
+            validate_slug(slug)
+            if slug in self.seen:
+                raise ValueError(f'Duplicate slug "{slug}".')
+            self.seen.add(slug)
+            content = DashboardContent(
+                slug=slug, data=data, image_paths=find_image_paths(data), data_hash=hash_data(data),
             )
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Successfully created DashboardContent for slug="{slug}"'))
+            if slug not in existing:
+                content.created_at = content.updated_at = now
+                creates.append(content)
+            elif existing[slug][1] != content.data_hash:
+                content.pk = existing[slug][0]
+                content.updated_at = now
+                updates.append(content)
             else:
-                self.stdout.write(self.style.SUCCESS(f'Successfully updated DashboardContent for slug="{slug}"'))
+                totals['unchanged'] += 1
+
+        for content in creates:
+            self.stdout.write(f'  created {content.slug}')
+        if updates:
+            self.report_updates(updates, options['diff'])
+
+        if not options['dry_run']:
+            DashboardContent.objects.bulk_create(creates)
+            DashboardContent.objects.bulk_update(updates, ['data', 'image_paths', 'data_hash', 'updated_at'])
+        totals['created'] += len(creates)
+        totals['updated'] += len(updates)
+
+    def report_updates(self, updates, diff):
+        stored = {}
+        if diff:
+            stored = dict(DashboardContent.objects.filter(pk__in=[c.pk for c in updates]).values_list('slug', 'data'))
+        for content in updates:
+            line = f'  updated {content.slug}'
+            if content.slug in stored:
+                line += f': {describe_changes(stored[content.slug], content.data)}'
+            self.stdout.write(line)
+
+
+def describe_changes(old, new):
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return 'replaced'
+    parts = []
+    for label, keys in [
+        ('added', [key for key in new if key not in old]),
+        ('removed', [key for key in old if key not in new]),
+        ('changed', [key for key in new if key in old and old[key] != new[key]]),
+    ]:
+        if keys:
+            parts.append(f'{label} {", ".join(map(str, keys))}')
+    return '; '.join(parts) or 'no data changes'
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from salon.assets import MAX_BATCH_SIZE, pending_count, purge_due_assets
+
+
+class Command(BaseCommand):
+    help = (
+        'Destroys orphaned Cloudinary assets recorded in the pending-deletion table, '
+        'in batches of up to 100 per API call, retrying failures with backoff.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ASSET_PURGE_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.ASSET_PURGE_POLL_INTERVAL,
+                            help='Seconds to sleep when nothing is due.')
+        parser.add_argument('--once', action='store_true',
+                            help='Purge everything that is currently due, then exit.')
+
+    def handle(self, *args, **options):
+        batch_size = min(options['batch_size'], MAX_BATCH_SIZE)
+        self.stdout.write(f'Asset purge worker started (batch size {batch_size}).')
+
+        try:
+            while True:
+                started = time.monotonic()
+                stats = purge_due_assets(batch_size)
+                processed = stats['deleted'] + stats['retried'] + stats['failed']
+
+                if processed:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Batch: {stats["deleted"]} deleted, {stats["retried"]} to retry, {stats["failed"]} failed '
+                        f'in {time.monotonic() - started:.2f}s; {pending_count()} pending'
+                    ))
+
+                if processed < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Asset purge worker stopped.')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from salon.availability import rebuild_slots
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-claims the slot cells of every upcoming appointment under the current slot settings. Run it after '
+        'changing APPOINTMENT_SLOT_INTERVAL or APPOINTMENT_CAPACITY, or after writing appointments without signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            claimed, unplaced = rebuild_slots(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Slots claimed for {claimed} appointments.'))
+        if unplaced:
+            self.stdout.write(self.style.WARNING(f'{unplaced} overlapping appointments fit no seat and hold no slots.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from salon import search
+from salon.models import Product, Service
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index for products and services.'
+
+    def handle(self, *args, **options):
+        if not search.supports_index():
+            self.stdout.write(self.style.WARNING('This database has no full-text index; search uses icontains.'))
+            return
+
+        with transaction.atomic():
+            search.rebuild_index(Product, Service)
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
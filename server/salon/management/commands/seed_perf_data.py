@@ -0,0 +1,200 @@
+import random
+import time
+from datetime import date, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from salon import cache, search
+from salon.availability import rebuild_slots
+from salon.benchmarking import build_blob
+from salon.models import (
+    MAX_FEATURED_PRODUCTS, Appointment, AppointmentSlot, Banner, DashboardContent, DashboardImage, Product, Service,
+    ServiceCategory, find_image_paths, hash_data,
+)
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+SEED_PREFIX = 'perf-'
+
+
+def parse_size(value):
+    try:
+        return SIZES.get(value.lower()) or int(value)
+    except ValueError:
+        raise CommandError(f'Invalid size "{value}", use one of {", ".join(SIZES)} or a number.')
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds synthetic products, services, categories, banners, appointments and large dashboard JSON '
+        'for benchmarking. Rows are written with bulk_create, so model save() hooks and signals do not run; '
+        'the search index, appointment slots and cache versions they maintain are rebuilt afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='10k',
+                            help='Number of products and of appointments: 10k, 100k, 1m or a number.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible data.')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded rows first.')
+
+    def handle(self, *args, **options):
+        size = parse_size(options['size'])
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+
+        if options['clear']:
+            self.clear()
+
+        started = time.monotonic()
+        with transaction.atomic():
+            self.seed_categories(20)
+            self.seed_services(max(size // 10, 10))
+            self.seed_banners(50)
+            self.seed_products(size)
+            self.seed_appointments(size)
+            self.seed_dashboard(10)
+            self.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(f'Seeded {size} rows per large table in {time.monotonic() - started:.1f}s'))
+
+    def clear(self):
+        with transaction.atomic():
+            AppointmentSlot.objects.filter(appointment__customer_email__startswith=SEED_PREFIX).delete()
+            Appointment.objects.filter(customer_email__startswith=SEED_PREFIX).delete()
+            Product.objects.filter(name__startswith=SEED_PREFIX).delete()
+            Banner.objects.filter(title__startswith=SEED_PREFIX).delete()
+            Service.objects.filter(slug__startswith=SEED_PREFIX).delete()
+            ServiceCategory.objects.filter(slug__startswith=SEED_PREFIX).delete()
+            DashboardContent.objects.filter(slug__startswith=SEED_PREFIX).delete()
+        self.stdout.write('Cleared previously seeded rows.')
+
+    def bulk(self, model, rows):
+        """bulk_create ``rows`` in batches and return how many were written. Only one batch is held at a time."""
+        started = time.monotonic()
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+            count += len(batch)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {count} rows in {elapsed:.1f}s')
+        return count
+
+    def rebuild_derived(self):
+        """What the skipped signals would have maintained."""
+        started = time.monotonic()
+        if search.supports_index():
+            search.rebuild_index(Product, Service)
+        claimed, unplaced = rebuild_slots(self.batch_size)
+        cache.bump_version_on_commit(cache.HOMEPAGE)
+        cache.bump_version_on_commit(cache.DASHBOARD_CONTENT)
+        self.stdout.write(
+            f'search index, slots for {claimed} appointments ({unplaced} overlapping) and cache versions '
+            f'in {time.monotonic() - started:.1f}s'
+        )
+
+    def lorem(self, words):
+        vocabulary = ['glow', 'silk', 'radiant', 'care', 'nourish', 'balm', 'gentle', 'serum', 'hydrate', 'luxe']
+        return ' '.join(self.random.choice(vocabulary) for _ in range(words))
+
+    def seed_categories(self, count):
+        return self.bulk(ServiceCategory, (
+            ServiceCategory(name=f'{SEED_PREFIX}Category {i}', slug=f'{SEED_PREFIX}category-{i}', description=self.lorem(20))
+            for i in range(count)
+        ))
+
+    def seed_services(self, count):
+        categories = list(ServiceCategory.objects.filter(slug__startswith=SEED_PREFIX).values_list('pk', flat=True))
+
+        def rows():
+            for i in range(count):
+                price = Decimal(self.random.randint(500, 10000))
+                yield Service(
+                    category_id=self.random.choice(categories),
+                    title=f'{SEED_PREFIX}Service {i}',
+                    slug=f'{SEED_PREFIX}service-{i}',
+                    description=self.lorem(40),
+                    price=price,
+                    offer_price=price * Decimal('0.8') if i % 3 == 0 else None,
+                    duration_minutes=self.random.choice([30, 45, 60, 90, 120]),
+                    image=f'services/{SEED_PREFIX}{i}.png',
+                    is_active=i % 10 != 0,
+                    additional_info=f'<p>{self.lorem(120)}</p>',
+                )
+        return self.bulk(Service, rows())
+
+    def seed_banners(self, count):
+        return self.bulk(Banner, (
+            Banner(
+                title=f'{SEED_PREFIX}Banner {i}', subtitle=self.lorem(8), description=self.lorem(30),
+                image=f'banners/{SEED_PREFIX}{i}.png', priority=i, is_active=i % 5 != 0,
+            )
+            for i in range(count)
+        ))
+
+    def seed_products(self, count):
+        categories = ['Hair', 'Skin', 'Nails', 'Makeup', 'Body', 'Fragrance']
+        free_ranks = sorted(
+            set(range(1, MAX_FEATURED_PRODUCTS + 1))
+            - set(Product.objects.filter(featured_rank__isnull=False).values_list('featured_rank', flat=True))
+        )
+
+        def rows():
+            for i in range(count):
+                # Feature in-stock products until the free featured slots run out
+                rank = free_ranks.pop(0) if free_ranks and i % 7 != 0 else None
+                yield Product(
+                    name=f'{SEED_PREFIX}Product {i}',
+                    description=f'<p>{self.lorem(60)}</p>',
+                    price=Decimal(self.random.randint(100, 5000)),
+                    image=f'products/{SEED_PREFIX}{i}.png',
+                    category=self.random.choice(categories),
+                    in_stock=i % 7 != 0,
+                    is_featured=rank is not None,
+                    featured_rank=rank,
+                )
+        return self.bulk(Product, rows())
+
+    def seed_appointments(self, count):
+        titles = list(Service.objects.filter(slug__startswith=SEED_PREFIX).values_list('title', flat=True)[:200])
+        statuses = ['pending', 'confirmed', 'completed', 'cancelled']
+        today = date.today()
+        notified = timezone.now()
+        return self.bulk(Appointment, (
+            Appointment(
+                customer_name=f'Customer {i}',
+                customer_email=f'{SEED_PREFIX}{i}@example.com',
+                customer_phone='9800000000',
+                appointment_date=today + timedelta(days=self.random.randint(-180, 180)),
+                appointment_time=dt_time(self.random.randint(10, 18), self.random.choice([0, 30])),
+                service_type=self.random.choice(titles),
+                notes=self.lorem(10) if i % 4 == 0 else '',
+                status=self.random.choice(statuses),
+                admin_notified_at=notified,
+            )
+            for i in range(count)
+        ))
+
+    def seed_dashboard(self, count):
+        contents = []
+        for i in range(count):
+            data = build_blob(sections=20, cards=50, image_every=5)
+            contents.append(DashboardContent(
+                slug=f'{SEED_PREFIX}content-{i}', data=data, image_paths=find_image_paths(data),
+                data_hash=hash_data(data),
+            ))
+        self.bulk(DashboardContent, contents)
+        contents = DashboardContent.objects.filter(slug__startswith=SEED_PREFIX).values_list('pk', flat=True)
+        self.bulk(DashboardImage, (
+            DashboardImage(content_id=content, key=f'image-{s}-{c}', file=f'content/{SEED_PREFIX}{s}-{c}.png')
+            for content in contents.iterator()
+            for s in range(20)
+            for c in range(0, 50, 5)
+        ))
@@ -0,0 +1,55 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from salon.emails import enqueue_admin_digest, pending_count, send_due_emails
+
+
+class Command(BaseCommand):
+    help = (
+        'Drains the email outbox in batches, reusing one SMTP connection per batch. '
+        'In digest mode it also queues the admin appointment digests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.EMAIL_OUTBOX_POLL_INTERVAL,
+                            help='Seconds to sleep when the outbox has nothing due.')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain everything that is currently due, then exit.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(f'Outbox worker started (batch size {batch_size}).')
+
+        try:
+            while True:
+                if settings.ADMIN_NOTIFICATION_MODE == 'digest':
+                    enqueue_admin_digest()
+
+                started = time.monotonic()
+                stats = send_due_emails(batch_size)
+                processed = stats['sent'] + stats['retried'] + stats['failed']
+
+                if processed:
+                    self.report(stats, time.monotonic() - started)
+
+                if processed < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Outbox worker stopped.')
+
+    def report(self, stats, elapsed):
+        latency = ''
+        if stats['latencies']:
+            latency = (
+                f', queue latency avg {statistics.mean(stats["latencies"]):.1f}s'
+                f' max {max(stats["latencies"]):.1f}s'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Batch: {stats["sent"]} sent, {stats["retried"]} to retry, {stats["failed"]} failed '
+            f'in {elapsed:.2f}s{latency}; {pending_count()} pending'
+        ))
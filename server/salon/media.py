@@ -0,0 +1,177 @@
+"""
+Memoized storage URLs.
+
+Building a Cloudinary URL (``storage.url(name)``) parses options and signs or
+derives the URL on every call, and serializers do it for every image of every
+row. URLs are cached here in a bounded, process-wide LRU keyed by file name,
+together with a version token (the owning row's ``updated_at`` where it has
+one): a cached URL is only reused while the version matches. The file-owner
+signals also drop the names of replaced and deleted files.
+
+Images are also offered in the resized ``IMAGE_VARIANTS`` presets: Cloudinary
+builds those with URL transformations, other storages get WebP copies made
+with Pillow the first time a variant is asked for, and deleted again when the
+file-owner signals release their source.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import cloudinary
+from cloudinary_storage.storage import MediaCloudinaryStorage
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe ``{key: (version, value)}`` map holding at most ``maxsize`` entries."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (version, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+url_cache = LRUCache(settings.MEDIA_URL_CACHE_SIZE)
+
+
+def storage_url(storage, name, version=None):
+    """Return ``storage.url(name)``, cached until ``version`` changes."""
+    url = url_cache.get(name, version)
+    if url is None:
+        url = storage.url(name)
+        url_cache.set(name, version, url)
+    return url
+
+
+def file_url(file):
+    """Cached ``file.url`` for a FieldFile, versioned by its instance's ``updated_at``."""
+    if not file:
+        return None
+    return storage_url(file.storage, file.name, getattr(file.instance, 'updated_at', None))
+
+
+def variant_urls(storage, name, version=None):
+    """
+    Return ``{preset: url}`` for the ``IMAGE_VARIANTS`` of a stored image,
+    cached like ``storage_url``. The returned dict is shared: do not modify it.
+    """
+    key = ('variants', name)
+    urls = url_cache.get(key, version)
+    if urls is None:
+        urls = {preset: variant_url(storage, name, options) for preset, options in settings.IMAGE_VARIANTS.items()}
+        url_cache.set(key, version, urls)
+    return urls
+
+
+def file_variants(file):
+    """Cached ``variant_urls`` for a FieldFile, versioned like ``file_url``."""
+    if not file:
+        return None
+    return variant_urls(file.storage, file.name, getattr(file.instance, 'updated_at', None))
+
+
+def variant_url(storage, name, options):
+    if isinstance(storage, MediaCloudinaryStorage):
+        # Same public id and resource type as MediaCloudinaryStorage.url()
+        resource = cloudinary.CloudinaryResource(
+            storage._prepend_prefix(name), default_resource_type=storage._get_resource_type(name),
+        )
+        return resource.build_url(**options)
+    return storage.url(local_variant(storage, name, options['width']))
+
+
+def local_variant(storage, name, width):
+    """
+    Return the name of a copy of ``name`` at most ``width`` pixels wide,
+    creating it with Pillow if needed. Falls back to ``name`` itself when it
+    cannot be read as an image.
+    """
+    variant = variant_name(name, width)
+    if storage.exists(variant):
+        return variant
+
+    try:
+        with storage.open(name) as source, Image.open(source) as image:
+            image.thumbnail((width, image.height))  # keeps the aspect ratio, never upscales
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+            buffer = BytesIO()
+            image.save(buffer, 'WEBP', quality=settings.IMAGE_VARIANT_LOCAL_QUALITY)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not create a {width}px variant of {name}: {e}")
+        return name
+    return storage.save(variant, ContentFile(buffer.getvalue()))
+
+
+def variant_name(name, width):
+    # The full source name, extension included: banners/a.png and banners/a.jpg
+    # must not share a variant
+    return f"variants/{width}/{name}.webp"
+
+
+def delete_variants(storage, *names):
+    """
+    Delete the local copies made by ``local_variant`` for ``names``, so a
+    later upload reusing a name does not get the old image's variants.
+    Cloudinary's derived images go with the asset itself.
+    """
+    if isinstance(storage, MediaCloudinaryStorage):
+        return
+    widths = {options['width'] for options in settings.IMAGE_VARIANTS.values()}
+    for name in names:
+        for width in widths:
+            try:
+                storage.delete(variant_name(name, width))
+            except OSError as e:
+                logger.warning(f"Could not delete the {width}px variant of {name}: {e}")
+
+
+def forget(*names):
+    for name in names:
+        url_cache.discard(name)
+        url_cache.discard(('variants', name))
+
+
+@receiver(setting_changed)
+def storage_settings_changed(setting, value, **kwargs):
+    if setting == 'MEDIA_URL_CACHE_SIZE':
+        url_cache.maxsize = value
+        url_cache.clear()
+    elif setting in ('STORAGES', 'MEDIA_URL', 'CLOUDINARY_STORAGE', 'IMAGE_VARIANTS'):
+        url_cache.clear()
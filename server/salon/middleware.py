@@ -0,0 +1,231 @@
+import logging
+import math
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .compression import COMPRESSIBLE_TYPES, cached_compress, compress, negotiate_encoding
+from .db_routers import PRIMARY_COOKIE, replica_reads, track_writes
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMetrics:
+    """``execute_wrapper`` that counts and times every statement it sees."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = ''
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if elapsed >= self.slowest_duration:
+                self.slowest_duration = elapsed
+                self.slowest_sql = sql
+
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware that runs natively under both WSGI and ASGI: Django
+    hands it a coroutine ``get_response`` under ASGI, and ``__call__`` then
+    returns ``__acall__()``. Sync-only middleware would make Django run the
+    rest of the chain, async views included, on a thread per request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+
+class QueryMetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Record the number of queries, total DB time and slowest statement of each
+    request. They are sent back as ``Server-Timing`` and logged with the
+    numbers as structured fields (``extra``).
+    """
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = QueryMetrics()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            self.watch_connections(stack, metrics)
+            response = self.get_response(request)
+        self.record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        metrics = QueryMetrics()
+        started = time.perf_counter()
+        # The async ORM runs its queries through sync_to_async, on the
+        # request's own thread, whose connections are not this thread's: the
+        # wrappers are installed (and removed) there
+        stack = ExitStack()
+        await sync_to_async(self.watch_connections)(stack, metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def watch_connections(stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def record(self, request, response, metrics, total):
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.duration * 1000:.2f};desc="{metrics.count} queries"',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        logger.info(
+            f"{request.method} {request.path} {response.status_code}: "
+            f"{metrics.count} queries in {metrics.duration * 1000:.2f}ms",
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status_code': response.status_code,
+                'query_count': metrics.count,
+                'db_time_ms': round(metrics.duration * 1000, 2),
+                'slowest_query_ms': round(metrics.slowest_duration * 1000, 2),
+                'slowest_query': metrics.slowest_sql,
+                'total_time_ms': round(total * 1000, 2),
+            },
+        )
+
+
+class ReplicaReadMiddleware(AsyncCapableMiddleware):
+    """
+    Serve GET and HEAD requests to views with ``read_from_replica = True``
+    from the read replica (see salon.db_routers), unless the client carries
+    the cookie set on its recent writes.
+    """
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REPLICA_DATABASE:
+            return self.get_response(request)
+        with track_writes() as written, replica_reads(self.reads_from_replica(request)):
+            response = self.get_response(request)
+        return self.stick_to_primary(response, written)
+
+    async def __acall__(self, request):
+        if not settings.REPLICA_DATABASE:
+            return await self.get_response(request)
+        with track_writes() as written, replica_reads(self.reads_from_replica(request)):
+            response = await self.get_response(request)
+        return self.stick_to_primary(response, written)
+
+    @staticmethod
+    def stick_to_primary(response, written):
+        if written:
+            response.set_cookie(
+                PRIMARY_COOKIE, '1', max_age=math.ceil(settings.REPLICA_STICKY_SECONDS),
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+            )
+        return response
+
+    @staticmethod
+    def reads_from_replica(request):
+        if request.method not in ('GET', 'HEAD') or PRIMARY_COOKIE in request.COOKIES:
+            return False
+        try:
+            match = resolve(request.path_info, getattr(request, 'urlconf', None))
+        except Resolver404:
+            return False
+        # DRF views and viewsets carry their class as ``cls``, Django views as ``view_class``
+        view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+        return getattr(view_class, 'read_from_replica', False)
+
+
+class CompressionMiddleware(AsyncCapableMiddleware):
+    """
+    Compress JSON responses with brotli or gzip, whichever the client prefers
+    in ``Accept-Encoding``.
+
+    Views whose bodies repeat across hits set ``response.cache_compressed_body``
+    (ConditionalGetMixin does); the compressed bytes are then cached under a
+    digest of the body and reused instead of compressing the same payload on
+    every hit.
+    """
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress_response(request, await self.get_response(request))
+
+    def compress_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if response.streaming or response.has_header('Content-Encoding') or content_type not in COMPRESSIBLE_TYPES:
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_LENGTH:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if getattr(response, 'cache_compressed_body', False):
+            content = cached_compress(response.content, encoding)
+        else:
+            content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response.headers['Content-Length'] = str(len(content))
+        response.headers['Content-Encoding'] = encoding
+        # The compressed body is no longer byte-identical to the ETag'd one
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+
+class AsyncWhiteNoiseMiddleware(AsyncCapableMiddleware, WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that is also async capable, so it does not push
+    every ASGI request onto a thread. Static files are looked up in memory
+    (or with a ``stat`` when autorefresh is on, as in DEBUG) and served the
+    same way in both modes.
+    """
+
+    def __init__(self, get_response=None, settings=settings):
+        WhiteNoiseMiddleware.__init__(self, get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self.find_file(request.path_info) if self.autorefresh else self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
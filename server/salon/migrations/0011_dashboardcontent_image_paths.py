@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+# A frozen copy of salon.models.find_image_paths, so later changes to the
+# model code can't change what this migration does.
+def find_image_paths(data, path=()):
+    paths = []
+    if isinstance(data, dict):
+        if data.get('icon_type') == 'image' and data.get('image_key'):
+            paths.append(list(path))
+        for key, value in data.items():
+            paths.extend(find_image_paths(value, path + (key,)))
+    elif isinstance(data, list):
+        for i, item in enumerate(data):
+            paths.extend(find_image_paths(item, path + (i,)))
+    return paths
+
+
+def populate_image_paths(apps, schema_editor):
+    DashboardContent = apps.get_model('salon', 'DashboardContent')
+    for content in DashboardContent.objects.all():
+        content.image_paths = find_image_paths(content.data)
+        content.save(update_fields=['image_paths'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0010_service_offer_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardcontent',
+            name='image_paths',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(populate_image_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:09
+
+from django.db import migrations, models
+
+
+def mark_existing_notified(apps, schema_editor):
+    # Admins were already emailed about every existing booking.
+    Appointment = apps.get_model('salon', 'Appointment')
+    Appointment.objects.update(admin_notified_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0012_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='admin_notified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_existing_notified, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:11
+
+from datetime import time
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# The defaults of the slot settings when this migration was written, frozen
+# so it never depends on the settings it runs under. Sites with other values
+# run rebuild_appointment_slots afterwards.
+SLOT_INTERVAL = 30
+DEFAULT_DURATION = 60
+CAPACITY = 1
+
+
+# A frozen copy of salon.availability.slot_cells
+def slot_cells(start_time, duration):
+    start = start_time.hour * 60 + start_time.minute
+    end = min(start + duration, 24 * 60)
+    return [time(minutes // 60, minutes % 60) for minutes in range(start // SLOT_INTERVAL * SLOT_INTERVAL, end, SLOT_INTERVAL)]
+
+
+def reserve_existing_slots(apps, schema_editor):
+    Appointment = apps.get_model('salon', 'Appointment')
+    AppointmentSlot = apps.get_model('salon', 'AppointmentSlot')
+    Service = apps.get_model('salon', 'Service')
+
+    durations = dict(Service.objects.filter(duration_minutes__isnull=False).values_list('title', 'duration_minutes'))
+    taken = set()
+    slots = []
+    upcoming = (
+        Appointment.objects.filter(appointment_date__gte=timezone.now().date())
+        .exclude(status='cancelled')
+        .order_by('created_at')
+    )
+    for appointment in upcoming:
+        duration = durations.get(appointment.service_type) or DEFAULT_DURATION
+        cells = [(appointment.appointment_date, cell) for cell in slot_cells(appointment.appointment_time, duration)]
+        for seat in range(CAPACITY):
+            if not any((date, cell, seat) in taken for date, cell in cells):
+                taken.update((date, cell, seat) for date, cell in cells)
+                slots.extend(
+                    AppointmentSlot(appointment=appointment, date=date, start_time=cell, seat=seat)
+                    for date, cell in cells
+                )
+                break
+        # Bookings that were already double booked keep no slots.
+    AppointmentSlot.objects.bulk_create(slots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0014_appointment_slot_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('seat', models.PositiveSmallIntegerField(default=0)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='salon.appointment')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'start_time', 'seat'), name='unique_appointment_slot')],
+            },
+        ),
+        migrations.RunPython(reserve_existing_slots, migrations.RunPython.noop),
+    ]
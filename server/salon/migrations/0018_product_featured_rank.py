@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:17
+
+from django.db import migrations, models
+
+
+def rank_featured_products(apps, schema_editor):
+    Product = apps.get_model('salon', 'Product')
+    featured = list(Product.objects.filter(is_featured=True).order_by('-created_at'))
+    for rank, product in enumerate(featured, start=1):
+        if rank <= 6:
+            product.featured_rank = rank
+        else:
+            # Over the limit already (the old check was racy): keep the newest six.
+            product.is_featured = False
+    Product.objects.bulk_update(featured, ['is_featured', 'featured_rank'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0017_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='featured_rank',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(rank_featured_products, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(condition=models.Q(('featured_rank__gte', 1), ('featured_rank__lte', 6)), name='product_featured_rank_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('featured_rank__isnull', True), ('is_featured', False)), models.Q(('featured_rank__isnull', False), ('is_featured', True)), _connector='OR'), name='product_featured_has_rank'),
+        ),
+    ]
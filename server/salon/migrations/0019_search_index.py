@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:20
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# A frozen copy of the salon.search index as this migration created it, so
+# later changes to salon.search can't change what it does. Later migrations
+# (or rebuild_search_index) take it from here.
+TABLE = 'salon_search_index'
+KINDS = {'product': 0, 'service': 1}
+
+
+def create_index(conn):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+                'kind smallint NOT NULL, object_id bigint NOT NULL, document tsvector NOT NULL, '
+                'PRIMARY KEY (kind, object_id))'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_gin ON {TABLE} USING GIN (document)')
+        else:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(title, body, tokenize='porter unicode61')"
+            )
+
+
+def index_object(conn, kind, pk, title, body):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(
+                f'INSERT INTO {TABLE} (kind, object_id, document) VALUES (%s, %s, '
+                "setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B')) "
+                'ON CONFLICT (kind, object_id) DO UPDATE SET document = EXCLUDED.document',
+                [KINDS[kind], pk, title, body],
+            )
+        else:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+                [pk * 10 + KINDS[kind], title, body],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor in ('postgresql', 'sqlite'):
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+def build_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor not in ('postgresql', 'sqlite'):
+        return
+    drop_search_index(apps, schema_editor)
+    create_index(conn)
+
+    Product = apps.get_model('salon', 'Product')
+    Service = apps.get_model('salon', 'Service')
+    for product in Product.objects.only('pk', 'name', 'category', 'description').iterator(chunk_size=2000):
+        body = ' '.join(filter(None, [product.category, strip_tags(product.description or '')]))
+        index_object(conn, 'product', product.pk, product.name, body)
+    for service in Service.objects.filter(is_active=True).only('pk', 'title', 'description').iterator(chunk_size=2000):
+        index_object(conn, 'service', service.pk, service.title, strip_tags(service.description or ''))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0018_product_featured_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
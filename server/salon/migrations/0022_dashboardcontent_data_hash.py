@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:41
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+# A frozen copy of salon.models.hash_data
+def hash_data(data):
+    text = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def populate_data_hash(apps, schema_editor):
+    DashboardContent = apps.get_model('salon', 'DashboardContent')
+    for content in DashboardContent.objects.all():
+        content.data_hash = hash_data(content.data)
+        content.save(update_fields=['data_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0021_pending_asset_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardcontent',
+            name='data_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(populate_data_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0023_outboxemail_sending'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pendingassetdeletion',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('purging', 'Purging'), ('deleted', 'Deleted'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
@@ -1,8 +1,60 @@
+import copy
+import hashlib
+import json
+
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from django.utils.text import slugify
 from django_ckeditor_5.fields import CKEditor5Field
-from django.db.models import JSONField
+from django.db.models import JSONField, Q
+
+
+MAX_FEATURED_PRODUCTS = 6
+
+
+class TrackedFilesMixin:
+    """
+    Remember the stored names of ``tracked_file_fields`` as loaded from the
+    database, so a replaced or cleared file can be found after a save without
+    re-reading the old row.
+    """
+    tracked_file_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_files()
+        return instance
+
+    def remember_files(self):
+        self._loaded_files = {
+            name: getattr(self.__dict__[name], 'name', self.__dict__[name]) or None
+            for name in self.tracked_file_fields
+            if name in self.__dict__  # skip deferred fields
+        }
+
+    def replaced_files(self):
+        """Return the loaded names of tracked files that no longer match the instance."""
+        replaced = []
+        for name, old in getattr(self, '_loaded_files', {}).items():
+            if old and old != (getattr(self, name).name or None):
+                replaced.append(old)
+        return replaced
+
+
+def raise_featured_rank_taken(error):
+    """
+    Re-raise an IntegrityError on ``Product.featured_rank`` (another
+    product took the slot concurrently) as a ValidationError.
+    """
+    from django.core.exceptions import ValidationError
+    if 'featured_rank' not in str(error):
+        raise error
+    raise ValidationError(
+        "Another change to the featured products was saved at the same time. Please try again.",
+        code='featured_rank_taken',
+    ) from error
 
 
 class Product(models.Model):
@@ -14,22 +66,116 @@ class Product(models.Model):
     category = models.CharField(max_length=100, blank=True)
     in_stock = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
+    # One of MAX_FEATURED_PRODUCTS unique slots, held by each featured product.
+    # The constraints below make the database enforce the featured limit.
+    featured_rank = models.PositiveSmallIntegerField(blank=True, null=True, unique=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # is_featured as loaded from the database, see from_db()
+    _loaded_is_featured = False
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['-created_at'], condition=Q(in_stock=True), name='product_in_stock_idx'),
+            models.Index(fields=['-created_at'], condition=Q(is_featured=True), name='product_featured_idx'),
+            models.Index(fields=['category', '-created_at', 'id'], name='product_category_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(featured_rank__gte=1, featured_rank__lte=MAX_FEATURED_PRODUCTS),
+                name='product_featured_rank_range',
+            ),
+            models.CheckConstraint(
+                condition=Q(is_featured=False, featured_rank__isnull=True) | Q(is_featured=True, featured_rank__isnull=False),
+                name='product_featured_has_rank',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_featured = instance.__dict__.get('is_featured', False)
+        return instance
+
+    def free_featured_rank(self):
+        used = set(
+            Product.objects.filter(featured_rank__isnull=False).exclude(pk=self.pk)
+            .values_list('featured_rank', flat=True)
+        )
+        return next((rank for rank in range(1, MAX_FEATURED_PRODUCTS + 1) if rank not in used), None)
 
     def clean(self):
         from django.core.exceptions import ValidationError
-        if self.is_featured and Product.objects.filter(is_featured=True).exclude(pk=self.pk).count() >= 6:
-            raise ValidationError("Only a maximum of 6 products can be featured.")
         if self.is_featured and not self.in_stock:
             raise ValidationError("A product must be in stock to be featured.")
+        # Only look for a free slot when the product becomes featured
+        if self.is_featured and (not self._loaded_is_featured or self.featured_rank is None):
+            self.featured_rank = self.free_featured_rank()
+            if self.featured_rank is None:
+                raise ValidationError(f"Only a maximum of {MAX_FEATURED_PRODUCTS} products can be featured.")
 
     def save(self, *args, **kwargs):
-        self.full_clean() # Call full_clean to run validators
-        super().save(*args, **kwargs)
+        if not self.is_featured:
+            self.featured_rank = None
+        # Unique and check constraints are left to the database; validating
+        # them here would cost a query each on every save.
+        self.full_clean(validate_unique=False, validate_constraints=False)
+        if self.featured_rank is None:
+            super().save(*args, **kwargs)
+        else:
+            from django.db import IntegrityError, transaction
+
+            # A concurrent save can take the same free rank first
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+            except IntegrityError as e:
+                raise_featured_rank_taken(e)
+        self._loaded_is_featured = self.is_featured
+
+    @classmethod
+    def set_featured(cls, ids):
+        """
+        Make exactly the products in ``ids`` the featured ones, in a single
+        transaction. Raises ValidationError without changing anything if the
+        set is too large, has unknown ids or out of stock products.
+        """
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, transaction
+        from . import cache
+
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > MAX_FEATURED_PRODUCTS:
+            raise ValidationError(f"Only a maximum of {MAX_FEATURED_PRODUCTS} products can be featured.")
+
+        with transaction.atomic():
+            products = {product.pk: product for product in cls.objects.select_for_update().filter(pk__in=ids)}
+            missing = [pk for pk in ids if pk not in products]
+            if missing:
+                raise ValidationError(f"Unknown products: {', '.join(map(str, missing))}.")
+            out_of_stock = [product.name for product in products.values() if not product.in_stock]
+            if out_of_stock:
+                raise ValidationError(f"A product must be in stock to be featured: {', '.join(out_of_stock)}.")
+
+            now = timezone.now()
+            cls.objects.filter(featured_rank__isnull=False).update(is_featured=False, featured_rank=None, updated_at=now)
+            featured = [products[pk] for pk in ids]
+            for rank, product in enumerate(featured, start=1):
+                product.is_featured = True
+                product.featured_rank = rank
+                product.updated_at = now
+                product._loaded_is_featured = True
+            try:
+                cls.objects.bulk_update(featured, ['is_featured', 'featured_rank', 'updated_at'])
+            except IntegrityError as e:
+                # Leaves the transaction, which rolls back
+                raise_featured_rank_taken(e)
+            # Bulk writes send no post_save
+            cache.bump_version_on_commit(cache.HOMEPAGE)
+        return featured
 
     def __str__(self):
         return self.name
@@ -52,17 +198,57 @@ class Appointment(models.Model):
     service_type = models.CharField(max_length=200)
     notes = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Set once the admins have been told about the booking (immediately or in a digest)
+    admin_notified_at = models.DateTimeField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['appointment_date', 'appointment_time']
+        indexes = [
+            models.Index(fields=['appointment_date', 'appointment_time'], name='appointment_slot_idx'),
+            models.Index(fields=['status', 'appointment_date', 'appointment_time'], name='appointment_status_date_idx'),
+        ]
+
+    def clean(self):
+        # Lets the admin report a taken slot on the form, before the
+        # post_save signal fails to claim it (salon.availability.sync_slots)
+        from django.core.exceptions import ValidationError
+        from .availability import is_bookable
+
+        if self.status == 'cancelled' or not (self.appointment_date and self.appointment_time):
+            return
+        if self.appointment_date >= timezone.localdate() and not is_bookable(self):
+            raise ValidationError({'appointment_time': "This time slot is no longer available."})
 
     def __str__(self):
         return f"{self.customer_name} - {self.appointment_date} {self.appointment_time}"
 
 
-class Banner(models.Model):
+class AppointmentSlot(models.Model):
+    """
+    One ``APPOINTMENT_SLOT_INTERVAL`` cell of a day held by an appointment.
+
+    The unique constraint is what stops two concurrent bookings from taking the
+    same cell: the second insert fails in the database, whatever the timing.
+    ``seat`` ranges over ``APPOINTMENT_CAPACITY`` so overlapping bookings are
+    allowed up to the salon's capacity.
+    """
+    appointment = models.ForeignKey(Appointment, related_name="slots", on_delete=models.CASCADE)
+    date = models.DateField()
+    start_time = models.TimeField()
+    seat = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'start_time', 'seat'], name='unique_appointment_slot'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.start_time} (seat {self.seat})"
+
+
+class Banner(TrackedFilesMixin, models.Model):
     title = models.CharField(max_length=255)
     subtitle = models.CharField(max_length=500, blank=True, null=True)
     image = models.ImageField(upload_to="banners/")
@@ -72,8 +258,13 @@ class Banner(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tracked_file_fields = ('image',)
+
     class Meta:
         ordering = ['priority', '-created_at']
+        indexes = [
+            models.Index(fields=['priority', '-created_at'], condition=Q(is_active=True), name='banner_active_priority_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -93,7 +284,7 @@ class ServiceCategory(models.Model):
     def __str__(self):
         return self.name
 
-class Service(models.Model):
+class Service(TrackedFilesMixin, models.Model):
     category = models.ForeignKey(ServiceCategory, related_name="services", on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
@@ -107,6 +298,13 @@ class Service(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tracked_file_fields = ('image',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['title', 'id'], condition=Q(is_active=True), name='service_active_title_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
@@ -116,9 +314,37 @@ class Service(models.Model):
         return self.title
 
 
+def find_image_paths(data, path=()):
+    """
+    Return the JSON paths (lists of dict keys / list indices) of every node in
+    ``data`` that is an image slot, i.e. has ``icon_type == 'image'`` and an
+    ``image_key``.
+    """
+    paths = []
+    if isinstance(data, dict):
+        if data.get('icon_type') == 'image' and data.get('image_key'):
+            paths.append(list(path))
+        for key, value in data.items():
+            paths.extend(find_image_paths(value, path + (key,)))
+    elif isinstance(data, list):
+        for i, item in enumerate(data):
+            paths.extend(find_image_paths(item, path + (i,)))
+    return paths
+
+
+def hash_data(data):
+    """SHA-256 of ``data`` serialized canonically, so equal JSON always hashes the same."""
+    text = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
 class DashboardContent(models.Model):
     slug = models.SlugField(max_length=100, unique=True)
     data = JSONField(default=dict, blank=True)
+    # Precomputed by save() so image slots can be resolved without walking data
+    image_paths = JSONField(default=list, blank=True, editable=False)
+    # hash_data(data), set by save(); lets loaders skip unchanged content
+    data_hash = models.CharField(max_length=64, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -126,20 +352,131 @@ class DashboardContent(models.Model):
         verbose_name = "Dashboard Content"
         verbose_name_plural = "Dashboard Contents"
 
+    def save(self, *args, **kwargs):
+        self.image_paths = find_image_paths(self.data)
+        self.data_hash = hash_data(self.data)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'data' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'image_paths', 'data_hash'}
+        super().save(*args, **kwargs)
+
+    def resolve_images(self, images, variants=None):
+        """
+        Return ``data`` with every image slot's ``image`` set from ``images``
+        (a ``{key: url}`` map), and its ``image_variants`` from ``variants``
+        (a ``{key: {preset: url}}`` map) when given.
+
+        Only the containers on the paths to image slots are copied; every other
+        subtree is shared with ``self.data``, so the result must be treated as
+        read-only.
+        """
+        if not self.image_paths:
+            return self.data
+
+        root = copy.copy(self.data)
+        copied = {(): root}
+        for path in self.image_paths:
+            node = root
+            for i, step in enumerate(path):
+                prefix = tuple(path[:i + 1])
+                child = copied.get(prefix)
+                if child is None:
+                    child = copy.copy(node[step])
+                    node[step] = child
+                    copied[prefix] = child
+                node = child
+            node['image'] = images.get(node['image_key'])
+            if variants is not None:
+                node['image_variants'] = variants.get(node['image_key'])
+        return root
+
     def __str__(self):
         return self.slug
 
 
-class DashboardImage(models.Model):
+class DashboardImage(TrackedFilesMixin, models.Model):
     content = models.ForeignKey(DashboardContent, related_name="images", on_delete=models.CASCADE)
     key = models.CharField(max_length=150)
     file = models.ImageField(upload_to="content/")
     alt_text = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    tracked_file_fields = ('file',)
+
     class Meta:
         unique_together = ("content", "key")
         ordering = ["key"]
 
     def __str__(self):
         return f"{self.content.slug}:{self.key}"
+
+
+class OutboxEmail(models.Model):
+    """
+    Email queued in the same transaction as the row it is about and sent later
+    by the ``send_outbox_emails`` worker.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        # Claimed by a worker until next_attempt_at
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    appointment = models.ForeignKey(Appointment, related_name="emails", on_delete=models.SET_NULL, blank=True, null=True)
+    subject = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=255)
+    recipients = JSONField(default=list)
+    body_text = models.TextField()
+    body_html = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+        verbose_name = "Outbox Email"
+        verbose_name_plural = "Outbox Emails"
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)}"
+
+
+class PendingAssetDeletion(models.Model):
+    """
+    Cloudinary asset that is no longer referenced, recorded in the same
+    transaction that orphaned it and destroyed later, in batches, by the
+    ``purge_deleted_assets`` worker.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('purging', 'Purging'),
+        ('deleted', 'Deleted'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=500)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='asset_deletion_due_idx'),
+        ]
+        verbose_name = "Pending Asset Deletion"
+        verbose_name_plural = "Pending Asset Deletions"
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,161 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination with ``apaginate_queryset()`` for async views: the
+    count and the page are fetched through the async ORM.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        self.page.object_list = [row async for row in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class OptInKeysetPagination(AsyncPageNumberPagination):
+    """
+    Page-number pagination, unless the client asks for ``?pagination=cursor``
+    (or follows a ``cursor`` link). Cursor pages are keyed on
+    ``keyset_ordering``: no ``COUNT(*)``, no ``OFFSET``, and a deep page costs
+    the same index seek as the first one, which suits infinite scroll.
+
+    The last field of ``keyset_ordering`` must be unique so every row has a
+    distinct position.
+    """
+    keyset_ordering = None
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_keyset(request):
+            return super().paginate_queryset(queryset, request, view)
+        queryset = self.keyset_page(queryset, request)
+        return None if queryset is None else self.keyset_rows(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if not self.use_keyset(request):
+            return await super().apaginate_queryset(queryset, request, view)
+        queryset = self.keyset_page(queryset, request)
+        return None if queryset is None else self.keyset_rows([row async for row in queryset])
+
+    def use_keyset(self, request):
+        self.keyset = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        return self.keyset
+
+    def keyset_page(self, queryset, request):
+        """The (unevaluated) rows of the requested cursor page, plus one to tell if there is a next page."""
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        if not self.page_size_value:
+            return None
+
+        queryset = queryset.order_by(*self.keyset_ordering)
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            queryset = queryset.filter(self.after(queryset.model, self.decode_cursor(encoded)))
+        return queryset[:self.page_size_value + 1]
+
+    def keyset_rows(self, rows):
+        self.has_next = len(rows) > self.page_size_value
+        self.page_rows = rows[:self.page_size_value]
+        return self.page_rows
+
+    def after(self, model, values):
+        """
+        Filter for the rows after ``values`` in ``keyset_ordering``.
+
+        The leading ``>=``/``<=`` bound on the first field lets the database
+        seek straight into the index; the OR only breaks ties within it.
+        """
+        fields = [(name.lstrip('-'), name.startswith('-')) for name in self.keyset_ordering]
+        try:
+            values = [model._meta.get_field(name).to_python(value) for (name, _), value in zip(fields, values)]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        for k, (name, descending) in enumerate(fields):
+            term = Q(**{f'{name}__{"lt" if descending else "gt"}': values[k]})
+            for j in range(k):
+                term &= Q(**{fields[j][0]: values[j]})
+            condition |= term
+
+        first_name, first_descending = fields[0]
+        return Q(**{f'{first_name}__{"lte" if first_descending else "gte"}': values[0]}) & condition
+
+    def encode_cursor(self, row):
+        # Rows are model instances, or dicts when listed through a values serializer
+        get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+        values = [get(name.lstrip('-')) for name in self.keyset_ordering]
+        raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.keyset_ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # encode_cursor() only writes strings (isoformat) and ints; anything
+        # else would reach the fields' to_python() or the query as is
+        if not all(isinstance(value, (str, int)) and not isinstance(value, bool) for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page_rows[-1]))
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class ProductPagination(OptInKeysetPagination):
+    keyset_ordering = ('-created_at', 'id')
+
+
+class ServicePagination(OptInKeysetPagination):
+    keyset_ordering = ('title', 'id')
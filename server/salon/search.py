@@ -0,0 +1,179 @@
+"""
+Full-text search over products and services.
+
+Each searchable row has a document in the ``salon_search_index`` shadow table,
+kept current by the Product/Service signals:
+
+* Postgres: a ``tsvector`` column with a GIN index, ranked with ``ts_rank``.
+* SQLite: an FTS5 virtual table, ranked with ``bm25``.
+
+Titles are weighted above descriptions on both backends. Other databases fall
+back to unranked ``icontains`` filtering.
+"""
+import re
+
+from django.db import connection, connections, router
+from django.db.models import Q
+from django.utils.html import strip_tags
+
+TABLE = 'salon_search_index'
+
+# Stored in the document key, so one table can hold every kind of row
+KINDS = {'product': 0, 'service': 1}
+KIND_NAMES = {code: name for name, code in KINDS.items()}
+
+
+def supports_index(conn=connection):
+    return conn.vendor in ('postgresql', 'sqlite')
+
+
+def create_index(conn=connection):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+                'kind smallint NOT NULL, object_id bigint NOT NULL, document tsvector NOT NULL, '
+                'PRIMARY KEY (kind, object_id))'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_gin ON {TABLE} USING GIN (document)')
+        elif conn.vendor == 'sqlite':
+            # rowid = object_id * 10 + kind, so updates and deletes are rowid lookups
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(title, body, tokenize='porter unicode61')"
+            )
+
+
+def drop_index(conn=connection):
+    if supports_index(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+def document(kind, instance):
+    """Return the ``(title, body)`` text indexed for ``instance``."""
+    if kind == 'product':
+        return instance.name, ' '.join(filter(None, [instance.category, strip_tags(instance.description or '')]))
+    return instance.title, strip_tags(instance.description or '')
+
+
+def index_object(kind, instance, conn=connection):
+    index_objects(kind, [instance], conn)
+
+
+def index_objects(kind, instances, conn=connection):
+    """Index (or re-index) many objects of one kind with a single executemany."""
+    if not supports_index(conn) or not instances:
+        return
+    documents = [(instance.pk, *document(kind, instance)) for instance in instances]
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (kind, object_id, document) VALUES (%s, %s, '
+                "setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B')) "
+                'ON CONFLICT (kind, object_id) DO UPDATE SET document = EXCLUDED.document',
+                [(KINDS[kind], pk, title, body) for pk, title, body in documents],
+            )
+        else:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+                [(pk * 10 + KINDS[kind], title, body) for pk, title, body in documents],
+            )
+
+
+def remove_object(kind, pk, conn=connection):
+    remove_objects(kind, [pk], conn)
+
+
+def remove_objects(kind, pks, conn=connection):
+    if not supports_index(conn) or not pks:
+        return
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE kind = %s AND object_id = %s', [(KINDS[kind], pk) for pk in pks])
+        else:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(pk * 10 + KINDS[kind],) for pk in pks])
+
+
+def rebuild_index(product_model, service_model, conn=connection, batch_size=2000):
+    """Re-index every product and active service. Takes the models so migrations can pass historical ones."""
+    drop_index(conn)
+    create_index(conn)
+    for product in product_model.objects.only('pk', 'name', 'category', 'description').iterator(chunk_size=batch_size):
+        index_object('product', product, conn)
+    for service in service_model.objects.filter(is_active=True).only('pk', 'title', 'description').iterator(chunk_size=batch_size):
+        index_object('service', service, conn)
+
+
+def fts5_query(q):
+    # Quote every word so user input can't inject FTS5 syntax; prefix-match each.
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', q))
+
+
+class SearchResults:
+    """
+    Lazily ranked ``(kind, object_id, rank)`` matches for ``q``. Supports
+    ``count()`` and slicing, so it can be handed to a Django paginator: only
+    the requested page is ever fetched.
+    """
+
+    def __init__(self, q):
+        from .models import Product
+
+        self.q = q
+        # The read replica, when the request reads from it (salon.db_routers)
+        self.connection = connections[router.db_for_read(Product)]
+
+    def count(self):
+        if self.connection.vendor == 'postgresql':
+            sql = f"SELECT COUNT(*) FROM {TABLE} WHERE document @@ websearch_to_tsquery('english', %s)"
+            params = [self.q]
+        elif self.connection.vendor == 'sqlite':
+            match = fts5_query(self.q)
+            if not match:
+                return 0
+            sql, params = f'SELECT COUNT(*) FROM {TABLE} WHERE {TABLE} MATCH %s', [match]
+        else:
+            return len(self.fallback())
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, page):
+        offset = page.start or 0
+        limit = page.stop - offset
+        if self.connection.vendor == 'postgresql':
+            sql = (
+                f'SELECT kind, object_id, ts_rank(document, query) AS rank '
+                f"FROM {TABLE}, websearch_to_tsquery('english', %s) query "
+                'WHERE document @@ query ORDER BY rank DESC, kind, object_id LIMIT %s OFFSET %s'
+            )
+            params = [self.q, limit, offset]
+        elif self.connection.vendor == 'sqlite':
+            match = fts5_query(self.q)
+            if not match:
+                return []
+            sql = (
+                f'SELECT rowid %% 10, rowid / 10, -bm25({TABLE}, 10.0, 1.0) AS rank '
+                f'FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY rank DESC, rowid LIMIT %s OFFSET %s'
+            )
+            params = [match, limit, offset]
+        else:
+            return self.fallback()[offset:offset + limit]
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [(KIND_NAMES[kind], object_id, rank) for kind, object_id, rank in cursor.fetchall()]
+
+    def fallback(self):
+        from .models import Product, Service
+
+        products = Product.objects.filter(
+            Q(name__icontains=self.q) | Q(description__icontains=self.q) | Q(category__icontains=self.q)
+        ).values_list('pk', flat=True)
+        services = Service.objects.filter(is_active=True).filter(
+            Q(title__icontains=self.q) | Q(description__icontains=self.q)
+        ).values_list('pk', flat=True)
+        return [('product', pk, 0) for pk in products] + [('service', pk, 0) for pk in services]
@@ -1,15 +1,73 @@
+from django.db import models
 from rest_framework import serializers
+from . import media
 from .models import Product, Appointment, Banner, ServiceCategory, Service, DashboardContent, DashboardImage
+from .values_serializers import ValuesSerializer
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class CachedImageField(serializers.ImageField):
+    """ImageField whose URL comes from the shared storage URL cache"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if not getattr(self, 'use_url', True):
+            return value.name
+        url = media.file_url(value)
+        request = self.context.get('request', None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class ImageVariantsField(CachedImageField):
+    """Read-only ``{preset: url}`` map of the IMAGE_VARIANTS of the image at ``source``"""
+    variants = True
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        urls = media.file_variants(value)
+        request = self.context.get('request', None)
+        if request is not None:
+            return {preset: request.build_absolute_uri(url) for preset, url in urls.items()}
+        return dict(urls)
+
+
+class MediaModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer rendering image fields with CachedImageField"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: CachedImageField,
+    }
+
+
+def discount_percentage(price, offer_price):
+    if offer_price and price and offer_price < price:
+        discount = ((price - offer_price) / price) * 100
+        return round(discount)
+    return None
+
+
+class ProductSerializer(MediaModelSerializer):
     """Serializer for Product model"""
+    image_variants = ImageVariantsField(source='image')
+
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'image', 'category', 'in_stock', 'is_featured', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'price', 'image', 'image_variants', 'category', 'in_stock', 'is_featured', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class FeaturedSetSerializer(serializers.Serializer):
+    """The complete list of products to feature"""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=True)
+
+
 class AppointmentSerializer(serializers.ModelSerializer):
     """Serializer for Appointment model"""
     class Meta:
@@ -29,15 +87,50 @@ class AppointmentSerializer(serializers.ModelSerializer):
         return value
 
 
-class BannerSerializer(serializers.ModelSerializer):
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """Query parameters of the appointment availability endpoint"""
+    date = serializers.DateField()
+    service = serializers.CharField(help_text="Service id or slug")
+
+    def validate_date(self, value):
+        from django.utils import timezone
+        if value < timezone.now().date():
+            raise serializers.ValidationError("Date cannot be in the past.")
+        return value
+
+    def validate_service(self, value):
+        lookup = {'pk': value} if value.isdigit() else {'slug': value}
+        try:
+            return Service.objects.get(is_active=True, **lookup)
+        except Service.DoesNotExist:
+            raise serializers.ValidationError("Service not found.")
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    """Query parameters of the product list"""
+    category = serializers.ListField(child=serializers.CharField(), required=False)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    in_stock = serializers.BooleanField(allow_null=True, required=False)
+    featured = serializers.BooleanField(allow_null=True, required=False)
+
+    def validate(self, data):
+        if data.get('min_price') is not None and data.get('max_price') is not None and data['min_price'] > data['max_price']:
+            raise serializers.ValidationError({'max_price': 'Must not be below min_price.'})
+        return data
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Query parameters of the search endpoint"""
+    q = serializers.CharField(max_length=200)
+
+
+class BannerSerializer(MediaModelSerializer):
+    image_variants = ImageVariantsField(source='image')
+
     class Meta:
         model = Banner
-        fields = ["id", "title", "subtitle", "description", "image", "priority", "is_active", "created_at", "updated_at"]
-        
-    def get_image_url(self, obj):
-        if obj.image:
-            return obj.image.url  # Cloudinary-hosted URL
-        return None
+        fields = ["id", "title", "subtitle", "description", "image", "image_variants", "priority", "is_active", "created_at", "updated_at"]
 
 
 class ServiceCategorySerializer(serializers.ModelSerializer):
@@ -46,35 +139,55 @@ class ServiceCategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "slug", "description", "created_at", "updated_at"]
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(MediaModelSerializer):
     category = ServiceCategorySerializer(read_only=True)
     discount_percentage = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source='image')
 
     class Meta:
         model = Service
         fields = [
             "id", "title", "slug", "description", "price", "offer_price", 
-            "discount_percentage", "duration_minutes", "image", "is_active", 
+            "discount_percentage", "duration_minutes", "image", "image_variants", "is_active",
             "category", "created_at", "updated_at", "additional_info"
         ]
 
     def get_discount_percentage(self, obj):
-        if obj.offer_price and obj.price and obj.offer_price < obj.price:
-            discount = ((obj.price - obj.offer_price) / obj.price) * 100
-            return round(discount)
-        return None
+        return discount_percentage(obj.price, obj.offer_price)
+
+
+class ProductValuesSerializer(ValuesSerializer):
+    serializer_class = ProductSerializer
+
+
+class BannerValuesSerializer(ValuesSerializer):
+    serializer_class = BannerSerializer
+
+
+class ServiceValuesSerializer(ValuesSerializer):
+    serializer_class = ServiceSerializer
+
+    def get_discount_percentage(self, row):
+        return discount_percentage(row['price'], row['offer_price'])
 
 
 class DashboardImageSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = DashboardImage
-        fields = ["key", "url", "alt_text"]
+        fields = ["key", "url", "variants", "alt_text"]
 
     def get_url(self, obj):
         try:
-            return obj.file.url
+            return media.file_url(obj.file)
+        except Exception:
+            return None
+
+    def get_variants(self, obj):
+        try:
+            return media.file_variants(obj.file)
         except Exception:
             return None
 
@@ -88,11 +201,12 @@ class DashboardContentSerializer(serializers.ModelSerializer):
         read_only_fields = ["slug", "images", "updated_at", "created_at"]
 
     def get_images(self, obj: DashboardContent):
-        # Return map { key: {url, alt_text} }
+        # Return map { key: {url, variants, alt_text} }
         out = {}
         for img in obj.images.all():
             out[img.key] = {
-                "url": getattr(img.file, 'url', None),
+                "url": media.file_url(img.file),
+                "variants": media.file_variants(img.file),
                 "alt_text": img.alt_text,
             }
         return out
@@ -1,65 +1,78 @@
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-import cloudinary
 
-from .models import Banner, Service, DashboardImage
+from . import assets, availability, cache, search
+from .models import Appointment, Banner, Product, Service, ServiceCategory, DashboardContent, DashboardImage
 
 
-@receiver(pre_save, sender=Banner)
-def banner_pre_save(sender, instance, **kwargs):
-    if not instance.pk:
-        return
-
-    try:
-        old_file = sender.objects.get(pk=instance.pk).image
-    except sender.DoesNotExist:
-        return
-
-    if old_file and old_file != instance.image:
-        cloudinary.uploader.destroy(old_file.name)
+# Replaced and deleted files are only recorded here; purge_deleted_assets
+# destroys them, and their local variants are deleted, once the transaction
+# has committed.
+@receiver(post_save, sender=Banner)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=DashboardImage)
+def file_owner_post_save(sender, instance, **kwargs):
+    assets.release_files(*instance.replaced_files())
+    instance.remember_files()
 
 
 @receiver(post_delete, sender=Banner)
-def banner_post_delete(sender, instance, **kwargs):
+@receiver(post_delete, sender=Service)
+def image_owner_post_delete(sender, instance, **kwargs):
     if instance.image:
-        cloudinary.uploader.destroy(instance.image.name)
+        assets.release_files(instance.image.name)
 
 
-@receiver(pre_save, sender=Service)
-def service_pre_save(sender, instance, **kwargs):
-    if not instance.pk:
-        return
+@receiver(post_delete, sender=DashboardImage)
+def dashboard_image_post_delete(sender, instance, **kwargs):
+    if instance.file:
+        assets.release_files(instance.file.name)
 
-    try:
-        old_file = sender.objects.get(pk=instance.pk).image
-    except sender.DoesNotExist:
-        return
 
-    if old_file and old_file != instance.image:
-        cloudinary.uploader.destroy(old_file.name)
+@receiver(post_save, sender=DashboardContent)
+@receiver(post_delete, sender=DashboardContent)
+@receiver(post_save, sender=DashboardImage)
+@receiver(post_delete, sender=DashboardImage)
+def dashboard_content_changed(sender, instance, **kwargs):
+    cache.bump_version_on_commit(cache.DASHBOARD_CONTENT)
 
 
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Service)
 @receiver(post_delete, sender=Service)
-def service_post_delete(sender, instance, **kwargs):
-    if instance.image:
-        cloudinary.uploader.destroy(instance.image.name)
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+def homepage_changed(sender, instance, **kwargs):
+    cache.bump_version_on_commit(cache.HOMEPAGE)
 
 
-@receiver(pre_save, sender=DashboardImage)
-def dashboard_image_pre_save(sender, instance, **kwargs):
-    if not instance.pk:
-        return
+@receiver(post_save, sender=Appointment)
+def appointment_post_save(sender, instance, created, **kwargs):
+    # Claims or frees the booking's slot cells, which availability is read from
+    availability.sync_slots(instance, created)
 
-    try:
-        old_file = sender.objects.get(pk=instance.pk).file
-    except sender.DoesNotExist:
-        return
 
-    if old_file and old_file != instance.file:
-        cloudinary.uploader.destroy(old_file.name)
+@receiver(post_save, sender=Product)
+def product_search_post_save(sender, instance, **kwargs):
+    search.index_object('product', instance)
 
 
-@receiver(post_delete, sender=DashboardImage)
-def dashboard_image_post_delete(sender, instance, **kwargs):
-    if instance.file:
-        cloudinary.uploader.destroy(instance.file.name)
+@receiver(post_delete, sender=Product)
+def product_search_post_delete(sender, instance, **kwargs):
+    search.remove_object('product', instance.pk)
+
+
+@receiver(post_save, sender=Service)
+def service_search_post_save(sender, instance, **kwargs):
+    if instance.is_active:
+        search.index_object('service', instance)
+    else:
+        search.remove_object('service', instance.pk)
+
+
+@receiver(post_delete, sender=Service)
+def service_search_post_delete(sender, instance, **kwargs):
+    search.remove_object('service', instance.pk)
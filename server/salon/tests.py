@@ -1,3 +1,1557 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import json
+import re
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+import brotli
+import cloudinary
+from cloudinary_storage.storage import MediaCloudinaryStorage
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from config.parsers import FastJSONParser
+from config.renderers import FastJSONRenderer
+
+from . import cache as salon_cache, compression, db_routers, media, urls
+from .assets import claim_due_assets, purge_due_assets
+from .availability import SlotUnavailable
+from .emails import claim_due_emails, enqueue_admin_digest, record_result, send_due_emails
+from .management.commands.load_dashboard_content import iter_object_items
+from .models import (
+    MAX_FEATURED_PRODUCTS, Appointment, AppointmentSlot, Banner, DashboardContent, DashboardImage, OutboxEmail,
+    PendingAssetDeletion, Product, Service, ServiceCategory, hash_data,
+)
+from .serializers import (
+    BannerSerializer, BannerValuesSerializer, ProductSerializer, ProductValuesSerializer, ServiceSerializer,
+    ServiceValuesSerializer,
+)
+from .views import BannerListAPIView, DashboardContentView
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', ADMIN_EMAILS=[])
+class ConcurrentBookingTests(TransactionTestCase):
+    def booking(self, name, time='11:00'):
+        return {
+            'customer_name': name,
+            'customer_email': f'{name}@example.com',
+            'customer_phone': '9800000000',
+            'appointment_date': (date.today() + timedelta(days=3)).isoformat(),
+            'appointment_time': time,
+            'service_type': 'Haircut',
+        }
+
+    def test_parallel_posts_for_one_slot_book_exactly_once(self):
+        threads_count = 8
+        barrier = threading.Barrier(threads_count)
+        statuses = []
+
+        def book(i):
+            try:
+                barrier.wait()
+                response = self.client_class().post('/api/appointments/', self.booking(f'customer{i}'))
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(i,)) for i in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [201] + [409] * (threads_count - 1))
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_other_slots_and_cancelled_bookings_stay_bookable(self):
+        self.assertEqual(self.client.post('/api/appointments/', self.booking('first')).status_code, 201)
+        self.assertEqual(self.client.post('/api/appointments/', self.booking('second', '14:00')).status_code, 201)
+        self.assertEqual(self.client.post('/api/appointments/', self.booking('third')).status_code, 409)
+
+        first = Appointment.objects.get(customer_name='first')
+        first.status = 'cancelled'
+        first.save()
+        self.assertFalse(AppointmentSlot.objects.filter(appointment=first).exists())
+        self.assertEqual(self.client.post('/api/appointments/', self.booking('third')).status_code, 201)
+
+    def test_conflicts_are_logged_without_errors(self):
+        self.assertEqual(self.client.post('/api/appointments/', self.booking('first')).status_code, 201)
+        with self.assertNoLogs('salon', 'ERROR'), self.assertLogs('config.exception_handler', 'WARNING') as logs:
+            self.assertEqual(self.client.post('/api/appointments/', self.booking('second')).status_code, 409)
+        self.assertEqual([record.levelname for record in logs.records], ['WARNING'])
+        self.assertIsNone(logs.records[0].exc_info)
+
+
+class QueryPlanTests(TestCase):
+    """
+    The hot read queries must be answered from an index, never a full table
+    scan or an extra sort. Postgres would pick a sequential scan on tables this
+    small, so sequential scans are disabled there to check the plan that would
+    be used at production sizes.
+    """
+    hot_queries = {
+        'products': lambda: Product.objects.all(),
+        'products in stock': lambda: Product.objects.filter(in_stock=True),
+        'featured products': lambda: Product.objects.filter(is_featured=True)[:6],
+        'products by category': lambda: Product.objects.filter(category='Hair').order_by('-created_at', 'id'),
+        'active banners': lambda: Banner.objects.filter(is_active=True).order_by("priority"),
+        'active services': lambda: Service.objects.filter(is_active=True).select_related("category").order_by("title"),
+        'appointments by date': lambda: Appointment.objects.filter(appointment_date__gte=date.today()),
+        'appointments by status': lambda: Appointment.objects.filter(status='pending'),
+        'appointments by status and date': lambda: Appointment.objects.filter(status='pending', appointment_date=date.today()),
+    }
+
+    def full_scans(self, queryset):
+        if connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            return [
+                line for line in plan.splitlines()
+                if 'USE TEMP B-TREE' in line
+                or ('SCAN ' in line and 'USING' not in line)
+            ]
+        if connection.vendor == 'postgresql':
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                plan = queryset.explain()
+            return [line for line in plan.splitlines() if 'Seq Scan' in line or 'Sort' in line]
+        self.skipTest(f'No plan checks for {connection.vendor}')
+
+    def test_hot_queries_use_indexes(self):
+        for name, build in self.hot_queries.items():
+            with self.subTest(name):
+                self.assertEqual(self.full_scans(build()), [])
+
+
+# Serializers build image URLs; keep them local instead of needing Cloudinary credentials
+LOCAL_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(
+    STORAGES=LOCAL_STORAGES,
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    ADMIN_EMAILS=['admin@example.com'],
+)
+class QueryBudgetTests(TestCase):
+    """
+    Every URL in salon/urls.py has a query budget. Rows are created in bulk
+    (several products, services, categories, images) so an N+1 shows up as a
+    budget overrun rather than hiding behind a single row.
+    """
+    # url name -> (method, reverse kwargs, query string / POST data, budget)
+    budgets = {
+        'api-root': ('get', {}, {}, 0),
+        'healthcheck': ('get', {}, {}, 0),
+        'product-list': ('get', {}, {'category': 'Hair', 'max_price': 12}, 4),
+        'product-detail': ('get', {'pk': 1}, {}, 2),
+        'product-in-stock': ('get', {}, {}, 2),
+        'product-featured': ('get', {}, {}, 2),
+        'banner-list': ('get', {}, {}, 3),
+        'service-list': ('get', {}, {}, 3),
+        'search': ('get', {}, {'q': 'product service'}, 4),
+        'dashboard-content-all': ('get', {}, {}, 2),
+        'dashboard-content-detail': ('get', {'slug': 'home'}, {}, 2),
+        'bootstrap': ('get', {}, {}, 5),
+        'product-set-featured': ('post', {}, {'ids': [1, 2]}, 7),
+        'appointment-availability': ('get', {}, {'date': date.today() + timedelta(days=2), 'service': 'service-0'}, 3),
+        'appointment-list': ('post', {}, {
+            'customer_name': 'Budget',
+            'customer_email': 'budget@example.com',
+            'customer_phone': '9800000000',
+            'appointment_date': date.today() + timedelta(days=2),
+            'appointment_time': '11:00',
+            'service_type': 'Service 0',
+        }, 8),
+    }
+
+    admin_urls = {'product-set-featured'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        categories = [ServiceCategory.objects.create(name=f'Category {i}') for i in range(3)]
+        for i in range(6):
+            Product.objects.create(pk=i + 1, name=f'Product {i}', price=10 + i, category='Hair', is_featured=i < 3)
+            Banner.objects.create(title=f'Banner {i}', image=f'banners/{i}.png', priority=i)
+            Service.objects.create(
+                category=categories[i % 3], title=f'Service {i}', price=100, offer_price=80,
+                duration_minutes=60, image=f'services/{i}.png',
+            )
+        for slug in ('home', 'about'):
+            content = DashboardContent.objects.create(slug=slug, data={
+                'cards': [{'icon_type': 'image', 'image_key': f'card-{i}'} for i in range(4)],
+            })
+            for i in range(4):
+                DashboardImage.objects.create(content=content, key=f'card-{i}', file=f'content/{slug}-{i}.png')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_url_has_a_budget(self):
+        names = set(urls.url_names(urls.urlpatterns))
+        self.assertEqual(names - set(self.budgets), set())
+
+    def test_urls_stay_within_query_budget(self):
+        for name, (method, kwargs, data, budget) in self.budgets.items():
+            with self.subTest(name):
+                if name in self.admin_urls:
+                    self.client.force_login(self.admin)
+                else:
+                    self.client.logout()
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(self.client, method)(reverse(name, kwargs=kwargs), data)
+                self.assertLess(response.status_code, 300, response.content)
+                self.assertLessEqual(
+                    len(queries), budget,
+                    '\n'.join([f'{name} ran {len(queries)} queries (budget {budget}):'] + [q['sql'] for q in queries]),
+                )
+                reported = re.search(r'desc="(\d+) queries"', response.headers['Server-Timing'])
+                self.assertEqual(int(reported.group(1)), len(queries))
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ServiceCategory.objects.create(name='Category')
+        # Duplicate titles exercise the id tie-breaker
+        for i in range(25):
+            Service.objects.create(category=category, title=f'Service {i % 4}', slug=f'service-{i}')
+            Product.objects.create(name=f'Product {i}', price=10)
+
+    def walk(self, path):
+        seen = []
+        url = f'{path}?pagination=cursor'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url).json()
+            self.assertFalse(any('COUNT(*)' in q['sql'] or 'OFFSET' in q['sql'] for q in queries))
+            seen.extend(item['id'] for item in response['results'])
+            url = response['next']
+        return seen
+
+    def test_cursor_pages_cover_every_row_once_in_order(self):
+        self.assertEqual(
+            self.walk('/api/services/'),
+            list(Service.objects.order_by('title', 'id').values_list('id', flat=True)),
+        )
+        self.assertEqual(
+            self.walk('/api/products/'),
+            list(Product.objects.order_by('-created_at', 'id').values_list('id', flat=True)),
+        )
+
+    def test_page_number_mode_is_still_the_default(self):
+        response = self.client.get('/api/products/').json()
+        self.assertEqual(response['count'], 25)
+
+    def test_invalid_cursor_is_a_404(self):
+        self.assertEqual(self.client.get('/api/services/?cursor=bogus').status_code, 404)
+        for values in ([['2026-01-01'], 1], [{'a': 1}, 1], [None, 1], ['2026-01-01T00:00:00+00:00', True], [1.5, 2], ['x', 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            with self.subTest(values):
+                self.assertEqual(self.client.get(f'/api/products/?cursor={cursor}').status_code, 404)
+
+
+class FeaturedProductTests(TestCase):
+    def setUp(self):
+        self.products = [Product.objects.create(name=f'Product {i}', price=10) for i in range(8)]
+
+    def test_featured_limit_is_enforced(self):
+        for product in self.products[:6]:
+            product.is_featured = True
+            product.save()
+        self.products[6].is_featured = True
+        with self.assertRaises(ValidationError):
+            self.products[6].save()
+
+    def test_saving_without_featuring_runs_no_featured_query(self):
+        product = self.products[0]
+        product.is_featured = True
+        product.save()
+        product.refresh_from_db()
+        product.name = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+        # django_ckeditor_5 also loads the old row on every save; that one is fine
+        self.assertFalse([q for q in queries if 'featured_rank" IS NOT NULL' in q['sql'] or 'COUNT(' in q['sql']])
+
+    def test_set_featured_replaces_the_whole_set(self):
+        Product.set_featured([p.pk for p in self.products[:6]])
+        Product.set_featured([p.pk for p in self.products[5:8]])
+        self.assertEqual(
+            set(Product.objects.filter(is_featured=True).values_list('pk', flat=True)),
+            {p.pk for p in self.products[5:8]},
+        )
+
+    def test_set_featured_rejects_out_of_stock_products_without_changes(self):
+        Product.set_featured([self.products[0].pk])
+        Product.objects.filter(pk=self.products[1].pk).update(in_stock=False)
+        with self.assertRaises(ValidationError):
+            Product.set_featured([self.products[1].pk])
+        self.assertEqual(list(Product.objects.filter(is_featured=True)), [self.products[0]])
+
+    def test_concurrently_taken_rank_is_a_validation_error(self):
+        self.products[0].is_featured = True
+        self.products[0].save()
+        # Both saves found rank 1 free; the other one committed first
+        product = self.products[1]
+        product.is_featured = True
+        with mock.patch.object(Product, 'free_featured_rank', return_value=1):
+            with self.assertRaisesMessage(ValidationError, 'saved at the same time'):
+                product.save()
+        self.assertEqual(list(Product.objects.filter(is_featured=True)), [self.products[0]])
+
+    def test_set_featured_conflict_is_a_400(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        conflict = IntegrityError('UNIQUE constraint failed: salon_product.featured_rank')
+        with mock.patch('django.db.models.query.QuerySet.bulk_update', side_effect=conflict):
+            response = self.client.post('/api/products/featured/set/', {'ids': [self.products[0].pk]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('saved at the same time', response.json()['ids'][0])
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class SearchTests(TestCase):
+    def setUp(self):
+        category = ServiceCategory.objects.create(name='Hair')
+        self.titled = Product.objects.create(name='Argan Oil', price=10, description='<p>For dry hair</p>')
+        self.described = Product.objects.create(name='Shampoo', price=10, description='<p>With argan extract</p>')
+        self.service = Service.objects.create(
+            category=category, title='Argan Treatment', price=100, duration_minutes=60, image='services/a.png',
+        )
+
+    def search(self, q):
+        return self.client.get('/api/search/', {'q': q}).json()
+
+    def test_title_matches_rank_above_description_matches(self):
+        results = self.search('argan')['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[-1], {'type': 'product', 'rank': results[-1]['rank'], 'item': results[-1]['item']})
+        self.assertEqual(results[-1]['item']['id'], self.described.pk)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.titled.name = 'Coconut Oil'
+        self.titled.save()
+        self.service.is_active = False
+        self.service.save()
+        self.described.delete()
+        self.assertEqual(self.search('argan')['count'], 0)
+        self.assertEqual([r['item']['id'] for r in self.search('coconut')['results']], [self.titled.pk])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+
+
+class ProductFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name, category, price, in_stock in [
+            ('Shampoo', 'Hair', 300, True), ('Conditioner', 'Hair', 800, True), ('Hair Oil', 'Hair', 1500, False),
+            ('Serum', 'Skin', 2500, True), ('Cream', 'Skin', 900, True), ('Polish', 'Nails', 100, True),
+        ]:
+            Product.objects.create(name=name, category=category, price=price, in_stock=in_stock)
+
+    def test_filters_and_disjunctive_facets(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/products/', {'category': ['Hair', 'Skin'], 'max_price': 1000, 'in_stock': 'true'}).json()
+        self.assertEqual(sorted(p['name'] for p in data['results']), ['Conditioner', 'Cream', 'Shampoo'])
+        # Categories ignore the category filter, prices ignore the price filter
+        self.assertEqual(data['facets']['category'], [
+            {'value': 'Hair', 'count': 2}, {'value': 'Nails', 'count': 1}, {'value': 'Skin', 'count': 1},
+        ])
+        self.assertEqual([b['count'] for b in data['facets']['price']], [1, 2, 0, 1, 0])
+        self.assertEqual(len([q for q in queries if 'GROUP BY' in q['sql']]), 1)
+
+    def test_invalid_price_range_is_rejected(self):
+        self.assertEqual(self.client.get('/api/products/', {'min_price': 10, 'max_price': 5}).status_code, 400)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class ValuesSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ServiceCategory.objects.create(name='Hair & Skin', description=None)
+        Product.objects.create(name='Shampoo', price='12.5', description='<p>Gentle</p>', image='products/a b.png')
+        Product.objects.create(name='Ünïcode', price=0, category='', description=None)
+        Banner.objects.create(title='Summer', subtitle=None, image='banners/summer.png', priority=2)
+        Banner.objects.create(title='Winter', subtitle='Sale', description='Up to 20%', image='banners/winter.png')
+        for title, price, offer_price, image in [
+            ('Cut', '1000.00', '750.00', 'services/cut.png'), ('Color', '0.00', None, ''),
+            ('Wax', None, '10.00', None), ('Facial', '999.99', '333.33', 'services/facial.png'),
+        ]:
+            Service.objects.create(
+                category=category, title=title, price=price, offer_price=offer_price, image=image,
+                duration_minutes=None if title == 'Wax' else 45, additional_info='<b>Info</b>',
+            )
+
+    def test_output_is_byte_identical_to_the_model_serializers(self):
+        context = {'request': APIRequestFactory().get('/', HTTP_HOST='testserver')}
+        renderer = JSONRenderer()
+        for queryset, serializer_class, values_serializer_class in [
+            (Product.objects.all(), ProductSerializer, ProductValuesSerializer),
+            (Banner.objects.all(), BannerSerializer, BannerValuesSerializer),
+            (Service.objects.select_related('category').order_by('title'), ServiceSerializer, ServiceValuesSerializer),
+        ]:
+            with self.subTest(serializer_class.__name__):
+                values_serializer = values_serializer_class(context=context)
+                expected = renderer.render(serializer_class(queryset, many=True, context=context).data)
+                actual = renderer.render(values_serializer.serialize(values_serializer.select(queryset)))
+                self.assertEqual(actual, expected)
+
+    def test_list_endpoints_use_one_query_for_the_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/services/')
+        self.assertEqual(len(response.json()['results']), 4)
+        self.assertEqual(len([q for q in queries if 'salon_servicecategory' in q['sql'] and 'LIMIT' in q['sql']]), 1)
+
+
+class FastJSONTests(TestCase):
+    payload = {
+        'price': Decimal('1234.50'),
+        'created_at': datetime(2025, 5, 1, 9, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'local': datetime(2025, 5, 1, 9, 30, tzinfo=ZoneInfo('Asia/Kathmandu')),
+        'naive': datetime(2025, 5, 1, 9, 30, 15, 999999),
+        'date': date(2025, 5, 1),
+        'time': time(10, 30, 0, 500000),
+        'text': 'Ünïcode \u2028 line \u2029 separators',
+        'label': gettext_lazy('Appointments'),
+        'keys': {1: 'one', None: 'none'},
+        'nested': [{'a': (1, 2.5, True, None)}],
+    }
+
+    def test_renders_the_same_bytes_as_drf(self):
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_floats_decode_the_same_and_nan_becomes_null(self):
+        floats = {'values': [0.1, 1e16, 1.5e-7, 1e22, 123456789012345678.0, -0.0]}
+        self.assertEqual(json.loads(FastJSONRenderer().render(floats)), json.loads(JSONRenderer().render(floats)))
+
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.subTest(value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render({'value': value})
+                self.assertEqual(FastJSONRenderer().render({'value': value}), b'{"value":null}')
+
+    def test_indented_output_uses_drf(self):
+        expected = JSONRenderer().render(self.payload, 'application/json; indent=2')
+        self.assertEqual(FastJSONRenderer().render(self.payload, 'application/json; indent=2'), expected)
+
+    def test_parser_rejects_invalid_json_and_nan(self):
+        self.assertEqual(FastJSONParser().parse(BytesIO('{"name": "Ünï"}'.encode())), {'name': 'Ünï'})
+        for body in (b'{"name": ', b'{"price": NaN}'):
+            with self.subTest(body), self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(body))
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class CompressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ServiceCategory.objects.create(name='Hair')
+        for i in range(10):
+            Service.objects.create(
+                category=category, title=f'Service {i}', price=100, duration_minutes=60,
+                image=f'services/{i}.png', additional_info='<p>Long CKEditor body</p>' * 20,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, accept_encoding):
+        return self.client.get('/api/services/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def test_encoding_is_negotiated(self):
+        plain = self.get('').content
+        for accept_encoding, expected in [
+            ('gzip, deflate, br', 'br'), ('gzip', 'gzip'), ('br;q=0.5, gzip', 'gzip'), ('*', 'br'),
+            ('br;q=0, gzip;q=0', None), ('identity', None),
+        ]:
+            with self.subTest(accept_encoding):
+                response = self.get(accept_encoding)
+                self.assertEqual(response.get('Content-Encoding'), expected)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                decode = {'br': brotli.decompress, 'gzip': gzip.decompress, None: bytes}[expected]
+                self.assertEqual(decode(response.content), plain)
+                if expected:
+                    self.assertTrue(response['ETag'].startswith('W/'))
+
+    def test_compressed_body_is_cached_until_the_content_changes(self):
+        with mock.patch('salon.compression.compress', wraps=compression.compress) as compress:
+            first = self.get('br').content
+            self.assertEqual(self.get('br').content, first)
+            self.assertEqual(compress.call_count, 1)
+
+            Service.objects.filter(title='Service 0').update(title='Renamed', updated_at=timezone.now())
+            self.assertNotEqual(self.get('br').content, first)
+            self.assertEqual(compress.call_count, 2)
+
+    def test_body_change_behind_an_unchanged_etag_is_not_served_stale(self):
+        first = self.get('br')
+        # Neither the count nor max(updated_at) moves, so the ETag stays put
+        Service.objects.filter(title='Service 0').update(title='Renamed')
+        second = self.get('br')
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn(b'Renamed', brotli.decompress(second.content))
+
+    def test_query_strings_with_the_same_body_share_an_entry(self):
+        with mock.patch('salon.compression.compress', wraps=compression.compress) as compress:
+            for i in range(3):
+                self.client.get(f'/api/services/?junk={i}', HTTP_ACCEPT_ENCODING='br')
+            self.assertEqual(compress.call_count, 1)
+
+    def test_small_and_non_json_responses_are_left_alone(self):
+        response = self.client.get('/health/', HTTP_ACCEPT_ENCODING='br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+@override_settings(ASSET_PURGE_MAX_ATTEMPTS=2)
+class AssetDeletionTests(TestCase):
+    def setUp(self):
+        self.banner = Banner.objects.create(title='Summer', image='banners/old.png')
+
+    def pending(self):
+        return list(PendingAssetDeletion.objects.filter(status='pending').values_list('name', flat=True))
+
+    def test_replaced_and_deleted_files_are_recorded_without_reading_the_old_row(self):
+        banner = Banner.objects.get(pk=self.banner.pk)
+        banner.title = 'Renamed'
+        banner.save()
+        self.assertEqual(self.pending(), [])
+
+        banner.image = 'banners/new.png'
+        with CaptureQueriesContext(connection) as queries:
+            banner.save()
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT')])
+        self.assertEqual(self.pending(), ['banners/old.png'])
+
+        banner.delete()
+        self.assertEqual(self.pending(), ['banners/old.png', 'banners/new.png'])
+
+    def test_rolled_back_changes_record_nothing(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Banner.objects.get(pk=self.banner.pk).delete()
+            raise RuntimeError
+        self.assertEqual(self.pending(), [])
+
+    def test_worker_deletes_in_one_call_and_retries_failures(self):
+        for i in range(3):
+            Banner.objects.create(title=f'Banner {i}', image=f'banners/{i}.png')
+        Banner.objects.all().delete()
+
+        deleted = {'banners/old.png': 'deleted', 'banners/0.png': 'not_found', 'banners/1.png': 'deleted'}
+        with mock.patch('cloudinary.api.delete_resources', return_value={'deleted': deleted}) as delete_resources:
+            self.assertEqual(purge_due_assets(100), {'deleted': 3, 'retried': 1, 'failed': 0})
+        self.assertEqual(delete_resources.call_count, 1)
+        self.assertEqual(self.pending(), ['banners/2.png'])
+
+        PendingAssetDeletion.objects.update(next_attempt_at=timezone.now())
+        with mock.patch('cloudinary.api.delete_resources', side_effect=ConnectionError('offline')):
+            self.assertEqual(purge_due_assets(100), {'deleted': 0, 'retried': 0, 'failed': 1})
+        self.assertEqual(PendingAssetDeletion.objects.get(status='failed').last_error, 'offline')
+
+    def test_cloudinary_is_called_outside_the_claiming_transaction(self):
+        self.banner.delete()
+        depth = len(connection.atomic_blocks)
+
+        def delete_resources(names):
+            self.assertEqual(len(connection.atomic_blocks), depth)
+            asset = PendingAssetDeletion.objects.get()
+            self.assertEqual((asset.status, asset.attempts), ('purging', 1))
+            return {'deleted': {name: 'deleted' for name in names}}
+
+        with mock.patch('cloudinary.api.delete_resources', side_effect=delete_resources):
+            self.assertEqual(purge_due_assets(100), {'deleted': 1, 'retried': 0, 'failed': 0})
+        self.assertEqual(PendingAssetDeletion.objects.get().status, 'deleted')
+
+    def test_results_of_a_lapsed_claim_are_not_recorded(self):
+        self.banner.delete()
+
+        def delete_resources(names):
+            # The claim lapsed and another worker took the row over
+            PendingAssetDeletion.objects.update(attempts=2)
+            return {'deleted': {name: 'deleted' for name in names}}
+
+        with mock.patch('cloudinary.api.delete_resources', side_effect=delete_resources):
+            purge_due_assets(100)
+        self.assertEqual(PendingAssetDeletion.objects.get().status, 'purging')
+
+    @override_settings(ASSET_PURGE_CLAIM_TIMEOUT=0)
+    def test_claims_of_a_dead_worker_are_taken_over(self):
+        self.banner.delete()
+        self.assertEqual(len(claim_due_assets(100)), 1)
+        with mock.patch('cloudinary.api.delete_resources', return_value={'deleted': {'banners/old.png': 'deleted'}}):
+            self.assertEqual(purge_due_assets(100)['deleted'], 1)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES, MEDIA_URL_CACHE_SIZE=3)
+class MediaURLCacheTests(TestCase):
+    def setUp(self):
+        media.url_cache.clear()
+        self.storage = mock.Mock()
+        self.storage.url.side_effect = lambda name: f'/media/{name}'
+
+    def test_urls_are_reused_until_the_version_changes(self):
+        self.assertEqual(media.storage_url(self.storage, 'a.png', 1), '/media/a.png')
+        media.storage_url(self.storage, 'a.png', 1)
+        self.assertEqual(self.storage.url.call_count, 1)
+        media.storage_url(self.storage, 'a.png', 2)
+        self.assertEqual(self.storage.url.call_count, 2)
+
+    def test_cache_is_bounded(self):
+        for name in 'abcd':
+            media.storage_url(self.storage, name)
+        media.storage_url(self.storage, 'a')
+        self.assertEqual(self.storage.url.call_count, 5)
+        self.assertEqual(len(media.url_cache.entries), 3)
+
+    def test_replaced_files_are_forgotten(self):
+        banner = Banner.objects.create(title='Summer', image='banners/old.png')
+        media.file_url(banner.image)
+        banner.image = 'banners/new.png'
+        banner.save()
+        self.assertNotIn('banners/old.png', media.url_cache.entries)
+
+    def test_serializers_share_the_cache(self):
+        Banner.objects.create(title='Summer', image='banners/summer.png')
+        self.client.get('/api/banners/')
+        self.assertEqual(list(media.url_cache.entries), ['banners/summer.png', ('variants', 'banners/summer.png')])
+        hits = media.url_cache.hits
+        self.client.get('/api/banners/', HTTP_IF_NONE_MATCH='stale')
+        self.assertEqual(media.url_cache.hits, hits + 2)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES, IMAGE_VARIANTS={
+    'thumb': {'width': 40, 'crop': 'limit', 'fetch_format': 'auto', 'quality': 'auto'},
+    'hero': {'width': 400, 'crop': 'limit', 'fetch_format': 'auto', 'quality': 'auto'},
+})
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media_root = TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        media.url_cache.clear()
+        image = BytesIO()
+        Image.new('RGB', (200, 100), 'red').save(image, 'PNG')
+        self.name = default_storage.save('banners/summer.png', image)
+
+    def test_local_variants_are_resized_webp_copies(self):
+        banner = Banner.objects.create(title='Summer', image=self.name)
+        variants = self.client.get('/api/banners/').json()['results'][0]['image_variants']
+        self.assertEqual(variants, {
+            'thumb': 'http://testserver/media/variants/40/banners/summer.png.webp',
+            'hero': 'http://testserver/media/variants/400/banners/summer.png.webp',
+        })
+        with default_storage.open('variants/40/banners/summer.png.webp') as thumb, Image.open(thumb) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (40, 20)))
+        # Never upscaled
+        with default_storage.open('variants/400/banners/summer.png.webp') as hero, Image.open(hero) as image:
+            self.assertEqual(image.size, (200, 100))
+        self.assertEqual(BannerSerializer(banner).data['image_variants'], {
+            'thumb': '/media/variants/40/banners/summer.png.webp',
+            'hero': '/media/variants/400/banners/summer.png.webp',
+        })
+
+    def test_sources_differing_only_in_extension_get_their_own_variants(self):
+        image = BytesIO()
+        Image.new('RGB', (100, 100), 'blue').save(image, 'JPEG')
+        jpeg = default_storage.save('banners/summer.jpg', image)
+        png_url = media.variant_urls(default_storage, self.name)['thumb']
+        jpeg_url = media.variant_urls(default_storage, jpeg)['thumb']
+        self.assertNotEqual(png_url, jpeg_url)
+        with default_storage.open('variants/40/banners/summer.jpg.webp') as thumb, Image.open(thumb) as image:
+            self.assertEqual(image.size, (40, 40))
+
+    def test_variants_are_deleted_with_their_source(self):
+        banner = Banner.objects.create(title='Summer', image=self.name)
+        media.file_variants(banner.image)
+        self.assertTrue(default_storage.exists('variants/40/banners/summer.png.webp'))
+        with self.captureOnCommitCallbacks(execute=True):
+            banner.image = 'banners/winter.png'
+            banner.save()
+        self.assertFalse(default_storage.exists('variants/40/banners/summer.png.webp'))
+        self.assertFalse(default_storage.exists('variants/400/banners/summer.png.webp'))
+
+        # A new image saved under the old name gets fresh variants
+        default_storage.delete(self.name)
+        image = BytesIO()
+        Image.new('RGB', (100, 100), 'blue').save(image, 'PNG')
+        self.assertEqual(default_storage.save(self.name, image), self.name)
+        with default_storage.open(media.local_variant(default_storage, self.name, 40)) as thumb, Image.open(thumb) as image:
+            self.assertEqual(image.size, (40, 40))
+
+    def test_variants_are_kept_when_the_change_rolls_back(self):
+        banner = Banner.objects.create(title='Summer', image=self.name)
+        media.file_variants(banner.image)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    banner.delete()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self.assertTrue(default_storage.exists('variants/40/banners/summer.png.webp'))
+
+    def test_unreadable_images_fall_back_to_the_original(self):
+        urls = media.variant_urls(default_storage, 'banners/missing.png')
+        self.assertEqual(urls['thumb'], '/media/banners/missing.png')
+
+    def test_cloudinary_variants_are_url_transformations(self):
+        with mock.patch.object(cloudinary.config(), 'cloud_name', 'demo'):
+            urls = media.variant_urls(MediaCloudinaryStorage(), 'media/banners/summer_abc')
+        self.assertRegex(urls['thumb'], r'/image/upload/c_limit,f_auto,q_auto,w_40/.*media/banners/summer_abc$')
+
+    def test_dashboard_content_includes_variants(self):
+        content = DashboardContent.objects.create(slug='home', data={'hero': {'icon_type': 'image', 'image_key': 'hero'}})
+        DashboardImage.objects.create(content=content, key='hero', file=self.name)
+        data = self.client.get('/api/dashboard-content/all/').json()
+        self.assertEqual(data['home']['hero']['image_variants']['thumb'], '/media/variants/40/banners/summer.png.webp')
+        detail = self.client.get('/api/dashboard-content/home/').json()
+        self.assertEqual(detail['images']['hero']['variants']['hero'], '/media/variants/400/banners/summer.png.webp')
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.category = ServiceCategory.objects.create(name='Hair', slug='hair')
+
+    def write(self, name, text):
+        path = self.directory / name
+        path.write_text(text, encoding='utf-8')
+        return str(path)
+
+    def run_command(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command(*args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_export_import_round_trip(self):
+        product = Product.objects.create(name='Shampoo', price='12.50', description='<p>Gentle</p>', image='products/a.png')
+        service = Service.objects.create(category=self.category, title='Cut', price='1000.00', offer_price=None)
+        for kind in ('products', 'services'):
+            for format in ('csv', 'jsonl'):
+                with self.subTest(kind=kind, format=format):
+                    path = str(self.directory / f'{kind}.{format}')
+                    self.run_command('export_catalog', kind, path)
+                    out, _ = self.run_command('import_catalog', kind, path)
+                    self.assertIn('(0 created, 1 updated, 0 skipped)', out)
+        self.assertEqual(Product.objects.get(), product)
+        service.refresh_from_db()
+        self.assertEqual((service.slug, service.offer_price, service.category_id), ('cut', None, self.category.pk))
+
+    def test_imports_with_constant_queries_per_chunk(self):
+        def import_products(count):
+            rows = ''.join(f'Product {i},{i}.50,Hair,true\n' for i in range(count))
+            path = self.write(f'{count}.csv', 'name,price,category,in_stock\n' + rows)
+            with CaptureQueriesContext(connection) as queries:
+                self.run_command('import_catalog', 'products', path, '--batch-size', '500')
+            return len(queries)
+
+        # SQLite caps the parameters per statement, so stay under one INSERT
+        self.assertEqual(import_products(5), import_products(60))
+        self.assertEqual(Product.objects.filter(category='Hair').count(), 65)
+
+    def test_services_resolve_categories_by_slug_and_update_by_slug(self):
+        Service.objects.create(category=self.category, title='Cut', price='10.00')
+        path = self.write('services.jsonl', '\n'.join([
+            '{"title": "Cut", "category": "hair", "price": "12.00", "is_active": false}',
+            '{"slug": "color-treatment", "title": "Color", "category": "hair", "duration_minutes": 90}',
+        ]))
+        out, _ = self.run_command('import_catalog', 'services', path)
+        self.assertIn('(1 created, 1 updated, 0 skipped)', out)
+        self.assertEqual(Service.objects.get(slug='cut').price, Decimal('12.00'))
+        self.assertFalse(Service.objects.get(slug='cut').is_active)
+        self.assertEqual(Service.objects.get(slug='color-treatment').duration_minutes, 90)
+
+    def test_invalid_chunk_is_not_written(self):
+        path = self.write('products.csv', 'name,price,in_stock\nGood,10,yes\nBad,-1,maybe\n')
+        with self.assertRaisesMessage(CommandError, 'Stopped at a chunk with 1 invalid rows'):
+            self.run_command('import_catalog', 'products', path)
+        self.assertFalse(Product.objects.exists())
+
+        out, err = self.run_command('import_catalog', 'products', path, '--skip-invalid')
+        self.assertIn('Row 2: in_stock: "maybe" is not a boolean.', err)
+        self.assertIn('(1 created, 0 updated, 1 skipped)', out)
+
+    def test_unknown_category_and_featured_limit_are_rejected(self):
+        rows = ''.join(f'Product {i},10,true,true\n' for i in range(MAX_FEATURED_PRODUCTS + 1))
+        path = self.write('featured.csv', 'name,price,in_stock,is_featured\n' + rows)
+        _, err = self.run_command('import_catalog', 'products', path, '--skip-invalid')
+        self.assertIn(f'Row {MAX_FEATURED_PRODUCTS + 1}: Only a maximum of {MAX_FEATURED_PRODUCTS} products', err)
+        self.assertEqual(
+            sorted(Product.objects.values_list('featured_rank', flat=True)), list(range(1, MAX_FEATURED_PRODUCTS + 1)),
+        )
+
+        path = self.write('services.csv', 'title,category\nCut,nails\n')
+        _, err = self.run_command('import_catalog', 'services', path, '--skip-invalid')
+        self.assertIn('No service category with slug "nails"', err)
+
+    @override_settings(STORAGES=LOCAL_STORAGES, IMAGE_VARIANTS={'thumb': {'width': 40}})
+    def test_replaced_images_are_released_with_their_variants(self):
+        media_root = TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        image = BytesIO()
+        Image.new('RGB', (200, 100), 'red').save(image, 'PNG')
+        old = default_storage.save('services/cut.png', image)
+        service = Service.objects.create(category=self.category, title='Cut', price='10.00', image=old)
+        media.file_variants(service.image)
+        self.assertTrue(default_storage.exists('variants/40/services/cut.png.webp'))
+
+        path = self.write('services.csv', 'slug,title,category,image\ncut,Cut,hair,services/new.png\n')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_command('import_catalog', 'services', path)
+        self.assertEqual(list(PendingAssetDeletion.objects.values_list('name', flat=True)), [old])
+        self.assertFalse(default_storage.exists('variants/40/services/cut.png.webp'))
+
+
+class LoadDashboardContentTests(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'dashboard.json'
+
+    def load(self, data, *args):
+        self.path.write_text(json.dumps(data), encoding='utf-8')
+        out = StringIO()
+        call_command('load_dashboard_content', str(self.path), *args, stdout=out)
+        return out.getvalue()
+
+    def test_streams_object_members(self):
+        text = '{ "a": {"x": [1, 2.5e3, "}"]}, "b" : 12345678,"c":null ,"d": "\\u00e9"}'
+        for read_size in (1, 3, 7, 1024):
+            with self.subTest(read_size=read_size):
+                self.assertEqual(list(iter_object_items(StringIO(text), read_size)), list(json.loads(text).items()))
+        for invalid in ('[]', '{"a": 1 "b": 2}', '{"a": 1,}', '{"a": 1'):
+            with self.subTest(invalid=invalid), self.assertRaises(ValueError):
+                list(iter_object_items(StringIO(invalid), 2))
+
+    def test_unchanged_content_is_not_rewritten(self):
+        data = {'home': {'hero': {'icon_type': 'image', 'image_key': 'hero'}}, 'about': {'title': 'About'}}
+        self.assertIn('2 created, 0 updated, 0 unchanged', self.load(data))
+        home = DashboardContent.objects.get(slug='home')
+        self.assertEqual(home.image_paths, [['hero']])
+        self.assertEqual(home.data_hash, hash_data(home.data))
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks() as callbacks:
+            self.assertIn('0 created, 0 updated, 2 unchanged', self.load(data))
+        self.assertEqual(len([q for q in queries if 'salon_dashboardcontent' in q['sql']]), 1)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(DashboardContent.objects.get(slug='home').updated_at, home.updated_at)
+
+    def test_dry_run_reports_a_diff_without_writing(self):
+        self.load({'about': {'title': 'About', 'body': 'Old'}})
+        out = self.load({'about': {'title': 'About', 'body': 'New', 'cta': 'Book'}, 'team': {}}, '--dry-run', '--diff')
+        self.assertIn('created team', out)
+        self.assertIn('updated about: added cta; changed body', out)
+        self.assertIn('would have 1 created, 1 updated, 0 unchanged', out)
+        self.assertEqual(DashboardContent.objects.get().data, {'title': 'About', 'body': 'Old'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.load({'about': {'title': 'About', 'body': 'New'}})
+        self.assertEqual(DashboardContent.objects.get().data['body'], 'New')
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class BootstrapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ServiceCategory.objects.create(name='Hair')
+        for i in range(12):
+            Product.objects.create(name=f'Product {i}', price=10 + i, is_featured=i < 2)
+            Banner.objects.create(title=f'Banner {i}', image=f'banners/{i}.png', priority=i, is_active=i != 3)
+            Service.objects.create(category=category, title=f'Service {i:02}', price=100, image=f'services/{i}.png')
+        content = DashboardContent.objects.create(slug='home', data={'hero': {'icon_type': 'image', 'image_key': 'hero'}})
+        DashboardImage.objects.create(content=content, key='hero', file='content/hero.png')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_combines_the_homepage_endpoints(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/bootstrap/').json()
+        self.assertEqual(len(queries), 5)
+        self.assertEqual(data, {
+            'banners': self.client.get('/api/banners/').json()['results'],
+            'featured_products': self.client.get('/api/products/featured/').json(),
+            'services': self.client.get('/api/services/').json()['results'],
+            'dashboard_content': self.client.get('/api/dashboard-content/all/').json(),
+        })
+
+    def test_cached_until_the_homepage_changes(self):
+        response = self.client.get('/api/bootstrap/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/bootstrap/').json(), response.json())
+            self.assertEqual(self.client.get('/api/bootstrap/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Banner.objects.filter(title='Banner 0').get().delete()
+        self.assertNotIn('Banner 0', [b['title'] for b in self.client.get('/api/bootstrap/').json()['banners']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.set_featured([Product.objects.get(name='Product 5').pk])
+        self.assertEqual([p['name'] for p in self.client.get('/api/bootstrap/').json()['featured_products']], ['Product 5'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DashboardContent.objects.get().save()
+        self.assertNotEqual(self.client.get('/api/bootstrap/')['ETag'], response['ETag'])
+
+
+# The salon routes as served under ASGI, for AsyncReadViewTests
+urlpatterns = urls.build_urlpatterns(async_read_views=True)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class AsyncReadViewTests(TestCase):
+    paths = [
+        '/health/',
+        '/api/banners/', '/api/banners/?page=2', '/api/banners/?page=9',
+        '/api/services/', '/api/services/?pagination=cursor',
+        '/api/products/?category=Hair&min_price=12', '/api/products/?pagination=cursor', '/api/products/?min_price=x',
+        '/api/dashboard-content/all/', '/api/dashboard-content/home/', '/api/dashboard-content/missing/',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ServiceCategory.objects.create(name='Hair')
+        for i in range(12):
+            Product.objects.create(name=f'Product {i}', price=10 + i, category='Hair' if i % 2 else 'Skin')
+            Banner.objects.create(title=f'Banner {i}', image=f'banners/{i}.png', priority=i)
+            Service.objects.create(category=category, title=f'Service {i:02}', price=100, image=f'services/{i}.png')
+        content = DashboardContent.objects.create(slug='home', data={'hero': {'icon_type': 'image', 'image_key': 'hero'}})
+        DashboardImage.objects.create(content=content, key='hero', file='content/hero.png')
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_answers_like_the_sync_views(self):
+        expected = {path: await self.async_client.get(path) for path in self.paths}
+        with override_settings(ROOT_URLCONF=__name__):
+            for path in self.paths:
+                with self.subTest(path):
+                    response = await self.async_client.get(path)
+                    self.assertEqual(response.status_code, expected[path].status_code)
+                    self.assertEqual(response.json(), expected[path].json())
+                    self.assertEqual(response.get('ETag'), expected[path].get('ETag'))
+                    self.assertEqual(response['Content-Type'], expected[path]['Content-Type'])
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_conditional_get_and_query_metrics(self):
+        response = await self.async_client.get('/api/banners/')
+        # Validators, count and page, counted through the async middleware
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+        response = await self.async_client.get('/api/banners/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+        response = await self.async_client.get('/api/dashboard-content/all/')
+        response = await self.async_client.get('/api/dashboard-content/all/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('desc="0 queries"', response['Server-Timing'])
+
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_media_urls_are_built_off_the_event_loop(self):
+        media.url_cache.clear()
+        on_loop = []
+
+        def variant_url(storage, name, options):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(name)
+            except RuntimeError:
+                pass
+            return name
+
+        with mock.patch('salon.media.variant_url', variant_url):
+            for path in ['/api/banners/', '/api/services/', '/api/dashboard-content/all/', '/api/dashboard-content/home/']:
+                with self.subTest(path):
+                    self.assertEqual((await self.async_client.get(path)).status_code, 200)
+        self.assertEqual(on_loop, [])
+
+
+@skipUnless(
+    'replica' in settings.DATABASES and not settings.DATABASES['replica'].get('TEST', {}).get('MIRROR'),
+    'Needs a replica database of its own (the SQLite settings provide one)',
+)
+@override_settings(
+    REPLICA_DATABASE='replica',
+    STORAGES=LOCAL_STORAGES,
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    ADMIN_EMAILS=[],
+)
+class ReplicaRoutingTests(TestCase):
+    """The test replica is a separate database, so rows only it has show where a read went."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        Banner.objects.using('replica').create(title='On the replica', image='banners/replica.png')
+        Banner.objects.create(title='On the primary', image='banners/primary.png')
+        cache.clear()
+
+    def banner_titles(self):
+        return [banner['title'] for banner in self.client.get('/api/banners/').json()['results']]
+
+    def booking(self):
+        return {
+            'customer_name': 'Replica',
+            'customer_email': 'replica@example.com',
+            'customer_phone': '9800000000',
+            'appointment_date': (date.today() + timedelta(days=3)).isoformat(),
+            'appointment_time': '11:00',
+            'service_type': 'Haircut',
+        }
+
+    def test_public_gets_read_from_the_replica(self):
+        self.assertEqual(self.banner_titles(), ['On the replica'])
+        # Other methods and unmarked views stay on the primary
+        self.assertFalse(Banner.objects.filter(title='On the replica').exists())
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_everything_reads_from_the_primary_without_a_replica(self):
+        self.assertEqual(self.banner_titles(), ['On the primary'])
+
+    def test_writes_go_to_the_primary_and_pin_the_writer_to_it(self):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.post('/api/appointments/', self.booking())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(replica_queries), 0)
+        self.assertTrue(Appointment.objects.filter(customer_name='Replica').exists())
+
+        self.assertEqual(response.cookies[db_routers.PRIMARY_COOKIE]['max-age'], 5)
+        self.assertEqual(self.banner_titles(), ['On the primary'])
+        # Other clients keep reading from the replica
+        self.assertEqual([banner['title'] for banner in self.client_class().get('/api/banners/').json()['results']], ['On the replica'])
+
+        del self.client.cookies[db_routers.PRIMARY_COOKIE]
+        self.assertEqual(self.banner_titles(), ['On the replica'])
+
+    def test_reads_and_writes_outside_a_request_pin_nothing(self):
+        response = self.client.get('/api/banners/')
+        self.assertNotIn(db_routers.PRIMARY_COOKIE, response.cookies)
+        # Like the outbox and asset workers' writes
+        Banner.objects.create(title='Another', image='banners/another.png')
+        self.assertEqual(self.banner_titles(), ['On the replica'])
+
+    def test_cache_builds_fresh_versions_from_the_primary(self):
+        def titles():
+            return list(Banner.objects.values_list('title', flat=True))
+
+        salon_cache.bump_version(salon_cache.HOMEPAGE)
+        with db_routers.replica_reads():
+            self.assertEqual(salon_cache.get_or_build(salon_cache.HOMEPAGE, titles, 'titles'), ['On the primary'])
+            # Only reads inside the build go to the primary
+            self.assertEqual(titles(), ['On the replica'])
+            with self.settings(REPLICA_STICKY_SECONDS=0):
+                salon_cache.bump_version(salon_cache.HOMEPAGE)
+                self.assertEqual(salon_cache.get_or_build(salon_cache.HOMEPAGE, titles, 'titles'), ['On the replica'])
+
+    def test_instances_read_from_the_replica_are_saved_to_the_primary(self):
+        with db_routers.replica_reads():
+            banner = Banner.objects.get()
+        self.assertEqual(banner._state.db, 'replica')
+        self.assertEqual(db_routers.ReplicaRouter().db_for_write(Banner, instance=banner), 'default')
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class DashboardContentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        content = DashboardContent.objects.create(slug='home', data={'hero': {'icon_type': 'image', 'image_key': 'hero'}})
+        DashboardImage.objects.create(content=content, key='hero', file='content/hero.png')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_bumped_after_commit_only(self):
+        version = salon_cache.get_version(salon_cache.DASHBOARD_CONTENT)
+        with self.captureOnCommitCallbacks(execute=True):
+            DashboardContent.objects.create(slug='about', data={})
+            # Not before the commit, or old rows could be cached under the new version
+            self.assertEqual(salon_cache.get_version(salon_cache.DASHBOARD_CONTENT), version)
+        bumped = salon_cache.get_version(salon_cache.DASHBOARD_CONTENT)
+        self.assertNotEqual(bumped, version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                DashboardContent.objects.create(slug='contact', data={})
+                raise RuntimeError
+        self.assertEqual(salon_cache.get_version(salon_cache.DASHBOARD_CONTENT), bumped)
+
+    def test_cached_payload_matches_a_rebuild(self):
+        response = self.client.get('/api/dashboard-content/all/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/dashboard-content/all/').json(), response.json())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            content = DashboardContent.objects.get()
+            content.data = {**content.data, 'title': 'Welcome'}
+            content.save()
+        rebuilt = self.client.get('/api/dashboard-content/all/').json()
+        self.assertEqual(rebuilt['home']['title'], 'Welcome')
+        self.assertEqual(rebuilt, self.client.get('/api/dashboard-content/all/').json())
+        self.assertEqual(rebuilt, json.loads(json.dumps(
+            DashboardContentView.serialize_contents(DashboardContent.objects.prefetch_related('images')),
+        )))
+
+
+
+class ResolveImagesTests(TestCase):
+    data = {
+        'hero': {'icon_type': 'image', 'image_key': 'hero', 'title': 'Hi'},
+        'features': [
+            {'icon_type': 'icon', 'icon': 'star'},
+            {'icon_type': 'image', 'image_key': 'spa', 'nested': {'icon_type': 'image', 'image_key': 'oil'}},
+        ],
+        'footer': {'links': ['a', 'b']},
+    }
+
+    def test_sets_every_image_slot(self):
+        content = DashboardContent(slug='home', data=self.data)
+        content.save()
+        original = json.loads(json.dumps(self.data))
+
+        resolved = content.resolve_images(
+            {'hero': '/hero.png', 'spa': '/spa.png'}, {'hero': {'thumb': '/hero-t.webp'}},
+        )
+        self.assertEqual(resolved['hero']['image'], '/hero.png')
+        self.assertEqual(resolved['hero']['image_variants'], {'thumb': '/hero-t.webp'})
+        self.assertEqual(resolved['features'][1]['image'], '/spa.png')
+        self.assertIsNone(resolved['features'][1]['image_variants'])
+        # A slot without an uploaded image resolves to None
+        self.assertIsNone(resolved['features'][1]['nested']['image'])
+        self.assertEqual(resolved['features'][0], {'icon_type': 'icon', 'icon': 'star'})
+
+        # The stored data is untouched and subtrees without image slots are shared
+        self.assertEqual(content.data, original)
+        self.assertIs(resolved['footer'], content.data['footer'])
+        self.assertIs(resolved['features'][0], content.data['features'][0])
+
+    def test_without_image_slots_returns_the_data(self):
+        content = DashboardContent(slug='plain', data={'title': 'Plain'})
+        content.save()
+        self.assertEqual(content.image_paths, [])
+        self.assertIs(content.resolve_images({'hero': '/hero.png'}), content.data)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            Banner.objects.create(title=f'Banner {i}', image=f'banners/{i}.png', priority=i)
+
+    def test_not_modified_until_a_row_changes(self):
+        response = self.client.get('/api/banners/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get('/api/banners/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        Banner.objects.filter(title='Banner 1').update(title='Renamed', updated_at=timezone.now())
+        changed = self.client.get('/api/banners/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn('Renamed', [banner['title'] for banner in changed.json()['results']])
+
+    def test_deleting_or_hiding_the_newest_row_invalidates(self):
+        for change in (lambda banner: banner.delete(), lambda banner: Banner.objects.filter(pk=banner.pk).update(is_active=False)):
+            response = self.client.get('/api/banners/')
+            newest = Banner.objects.filter(is_active=True).latest('updated_at')
+            change(newest)
+            # max(updated_at) moves backwards, so a date validator would still say 304
+            self.assertEqual(
+                self.client.get('/api/banners/', HTTP_IF_MODIFIED_SINCE=http_date()).status_code, 200,
+            )
+            changed = self.client.get('/api/banners/', HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotIn(newest.title, [banner['title'] for banner in changed.json()['results']])
+
+    def test_head(self):
+        response = self.client.head('/api/banners/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], self.client.get('/api/banners/')['ETag'])
+        self.assertEqual(self.client.head('/api/banners/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        response = self.client.head('/api/dashboard-content/all/')
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(
+            self.client.head('/api/dashboard-content/all/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304,
+        )
+
+    def test_not_modified_repeats_the_validators(self):
+        for path in ('/api/banners/', '/api/dashboard-content/all/'):
+            with self.subTest(path):
+                response = self.client.get(path)
+                not_modified = self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified['ETag'], response['ETag'])
+                self.assertEqual(not_modified.get('Last-Modified'), response.get('Last-Modified'))
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_async_not_modified_repeats_the_etag(self):
+        response = await self.async_client.get('/api/banners/')
+        not_modified = await self.async_client.get('/api/banners/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_validators_are_checked_after_permissions(self):
+        etag = self.client.get('/api/banners/')['ETag']
+        with mock.patch.object(BannerListAPIView, 'permission_classes', [IsAdminUser]):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/banners/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('ETag', response)
+        self.assertFalse([q for q in queries if 'salon_banner' in q['sql']])
+
+    def test_validator_errors_go_through_the_exception_handler(self):
+        with mock.patch.object(BannerListAPIView, 'get_validators', side_effect=DatabaseError('down')):
+            with self.assertLogs('config.exception_handler', 'ERROR'):
+                response = self.client.get('/api/banners/')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {'detail': 'An unexpected error occurred.'})
+
+
+def queue_email(**kwargs):
+    return OutboxEmail.objects.create(
+        subject='Hello', from_email='salon@example.com', recipients=['customer@example.com'], body_text='Hi', **kwargs,
+    )
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    ADMIN_EMAILS=['admin@example.com'],
+    ADMIN_NOTIFICATION_MODE='immediate',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_BACKOFF=30,
+    EMAIL_OUTBOX_MAX_RETRY_DELAY=60,
+)
+class OutboxTests(TestCase):
+    def booking(self):
+        return {
+            'customer_name': 'Ada',
+            'customer_email': 'ada@example.com',
+            'customer_phone': '9800000000',
+            'appointment_date': (date.today() + timedelta(days=3)).isoformat(),
+            'appointment_time': '11:00',
+            'service_type': 'Haircut',
+        }
+
+    def test_booking_queues_the_customer_and_admin_emails(self):
+        self.assertEqual(self.client.post('/api/appointments/', self.booking()).status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            sorted(email.recipients for email in OutboxEmail.objects.all()), [['ada@example.com'], ['admin@example.com']],
+        )
+
+        self.assertEqual(send_due_emails(10)['sent'], 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+        self.assertEqual(send_due_emails(10)['sent'], 0)
+
+    def test_failures_back_off_until_the_last_attempt(self):
+        email = queue_email()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('relay down')):
+            for attempt, delay in ((1, 30), (2, 60)):
+                started = timezone.now()
+                self.assertEqual(send_due_emails(10)['retried'], 1)
+                email.refresh_from_db()
+                self.assertEqual((email.status, email.attempts, email.last_error), ('pending', attempt, 'relay down'))
+                # Doubled per attempt, capped at EMAIL_OUTBOX_MAX_RETRY_DELAY
+                self.assertAlmostEqual((email.next_attempt_at - started).total_seconds(), delay, delta=5)
+                # Not due yet
+                self.assertEqual(send_due_emails(10)['retried'], 0)
+                OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+            self.assertEqual(send_due_emails(10)['failed'], 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 3))
+        self.assertEqual(send_due_emails(10)['failed'], 0)
+
+    def test_claimed_emails_are_skipped_until_the_claim_lapses(self):
+        claimed = queue_email(status='sending', attempts=1, next_attempt_at=timezone.now() + timedelta(minutes=5))
+        lapsed = queue_email(status='sending', attempts=1, next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(send_due_emails(10)['sent'], 1)
+        claimed.refresh_from_db()
+        lapsed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.attempts), ('sending', 1))
+        self.assertEqual((lapsed.status, lapsed.attempts), ('sent', 2))
+
+    def test_a_lapsed_claim_does_not_overwrite_the_new_owner(self):
+        email = queue_email()
+        [claimed] = claim_due_emails(10)
+        # Another worker takes the row over after the claim lapsed
+        OutboxEmail.objects.filter(pk=email.pk).update(attempts=2)
+        claimed.status = 'sent'
+        self.assertEqual(record_result(claimed, ['status']), 0)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sending', 2))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxWorkerTests(TransactionTestCase):
+    def test_sends_outside_the_claiming_transaction(self):
+        emails = [queue_email(), queue_email()]
+        calls = []
+
+        def send_messages(backend, messages):
+            calls.append(OutboxEmail.objects.get(pk=emails[len(calls)].pk).status)
+            self.assertFalse(connection.in_atomic_block)
+            if len(calls) == 2:
+                raise KeyboardInterrupt  # the worker dies mid-batch
+            return len(messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', send_messages):
+            with self.assertRaises(KeyboardInterrupt):
+                send_due_emails(10)
+
+        # The claim was committed before sending, and the delivered email stays sent
+        self.assertEqual(calls, ['sending', 'sending'])
+        self.assertEqual(
+            list(OutboxEmail.objects.order_by('pk').values_list('status', flat=True)), ['sent', 'sending'],
+        )
+
+    @skipUnless(connection.features.has_select_for_update_skip_locked, 'Needs SELECT ... FOR UPDATE SKIP LOCKED')
+    def test_concurrent_workers_skip_locked_rows(self):
+        for _ in range(4):
+            queue_email()
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    list(OutboxEmail.objects.select_for_update().order_by('pk')[:2])
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait(10)
+        try:
+            self.assertEqual(len(claim_due_emails(10)), 2)
+        finally:
+            release.set()
+            holder.join()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    ADMIN_EMAILS=['admin@example.com'],
+    ADMIN_DIGEST_WINDOW=15,
+)
+class AdminNotificationTests(TestCase):
+    def book(self, name, time):
+        return self.client.post('/api/appointments/', {
+            'customer_name': name,
+            'customer_email': f'{name}@example.com',
+            'customer_phone': '9800000000',
+            'appointment_date': (date.today() + timedelta(days=3)).isoformat(),
+            'appointment_time': time,
+            'service_type': 'Haircut',
+        })
+
+    @override_settings(ADMIN_NOTIFICATION_MODE='immediate')
+    def test_immediate_mode_notifies_in_the_creating_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.book('ada', '11:00').status_code, 201)
+        self.assertFalse([q['sql'] for q in queries if q['sql'].startswith('UPDATE "salon_appointment"')])
+        self.assertIsNotNone(Appointment.objects.get().admin_notified_at)
+        self.assertEqual(OutboxEmail.objects.filter(recipients=['admin@example.com']).count(), 1)
+
+    @override_settings(ADMIN_NOTIFICATION_MODE='digest')
+    def test_digest_mode_batches_admin_notifications(self):
+        self.book('ada', '11:00')
+        self.book('bob', '14:00')
+        self.assertEqual(OutboxEmail.objects.filter(recipients=['admin@example.com']).count(), 0)
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+        self.assertFalse(Appointment.objects.filter(admin_notified_at__isnull=False).exists())
+
+        # Nothing until the oldest booking is ADMIN_DIGEST_WINDOW minutes old
+        self.assertEqual(enqueue_admin_digest(), 0)
+        Appointment.objects.filter(customer_name='ada').update(created_at=timezone.now() - timedelta(minutes=16))
+        self.assertEqual(enqueue_admin_digest(), 2)
+
+        digest = OutboxEmail.objects.get(recipients=['admin@example.com'])
+        self.assertEqual(digest.subject, '2 New Appointment Requests')
+        self.assertIn('ada', digest.body_text)
+        self.assertIn('bob', digest.body_text)
+        self.assertFalse(Appointment.objects.filter(admin_notified_at__isnull=True).exists())
+        self.assertEqual(enqueue_admin_digest(), 0)
+
+    @override_settings(ADMIN_NOTIFICATION_MODE='digest', ADMIN_EMAILS=[])
+    def test_digest_without_admins_only_marks_the_appointments(self):
+        self.book('ada', '11:00')
+        Appointment.objects.update(created_at=timezone.now() - timedelta(minutes=16))
+        self.assertEqual(enqueue_admin_digest(), 1)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        self.assertIsNotNone(Appointment.objects.get().admin_notified_at)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    ADMIN_EMAILS=[],
+    SALON_OPENING_TIME=time(10, 0),
+    SALON_CLOSING_TIME=time(13, 0),
+    APPOINTMENT_SLOT_INTERVAL=30,
+    APPOINTMENT_CAPACITY=1,
+)
+class AvailabilityTests(TestCase):
+    day = date.today() + timedelta(days=3)
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ServiceCategory.objects.create(name='Hair')
+        Service.objects.create(category=category, title='Haircut', price=100, duration_minutes=60)
+
+    def free_starts(self):
+        response = self.client.get('/api/appointments/availability/', {'date': self.day, 'service': 'haircut'})
+        self.assertEqual(response.status_code, 200)
+        return [slot['start'] for slot in response.json()['slots']]
+
+    def book(self, start):
+        return self.client.post('/api/appointments/', {
+            'customer_name': 'Ada',
+            'customer_email': 'ada@example.com',
+            'customer_phone': '9800000000',
+            'appointment_date': self.day.isoformat(),
+            'appointment_time': start,
+            'service_type': 'Haircut',
+        })
+
+    def appointment(self, start, **kwargs):
+        return Appointment.objects.create(
+            customer_name='Admin booked', customer_email='admin@example.com', customer_phone='9800000000',
+            appointment_date=self.day, appointment_time=start, service_type='Haircut', **kwargs,
+        )
+
+    def test_offered_slots_are_exactly_the_bookable_ones(self):
+        self.assertEqual(self.book('11:00').status_code, 201)
+        free = self.free_starts()
+        self.assertEqual(free, ['10:00:00', '12:00:00'])
+        for start in ['10:00', '10:30', '11:00', '11:30', '12:00']:
+            with self.subTest(start), transaction.atomic():
+                expected = 201 if f'{start}:00' in free else 409
+                self.assertEqual(self.book(start).status_code, expected)
+                transaction.set_rollback(True)
+
+    def test_admin_created_and_retimed_appointments_hold_their_slots(self):
+        appointment = self.appointment(time(10, 0))
+        self.assertEqual(self.free_starts(), ['11:00:00', '11:30:00', '12:00:00'])
+        self.assertEqual(self.book('10:30').status_code, 409)
+
+        appointment.appointment_time = time(12, 0)
+        appointment.save()
+        self.assertEqual(self.free_starts(), ['10:00:00', '10:30:00', '11:00:00'])
+        self.assertEqual(
+            sorted(AppointmentSlot.objects.values_list('start_time', flat=True)), [time(12, 0), time(12, 30)],
+        )
+
+    def test_cancelling_and_reopening(self):
+        appointment = self.appointment(time(10, 0))
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertFalse(AppointmentSlot.objects.exists())
+        self.assertIn('10:00:00', self.free_starts())
+
+        appointment.status = 'pending'
+        appointment.save()
+        self.assertEqual(AppointmentSlot.objects.count(), 2)
+        self.assertNotIn('10:00:00', self.free_starts())
+
+        # Re-opening onto a slot someone else took in the meantime
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertEqual(self.book('10:00').status_code, 201)
+        appointment.status = 'pending'
+        with self.assertRaisesMessage(ValidationError, 'This time slot is no longer available.'):
+            appointment.full_clean()
+        with self.assertRaises(SlotUnavailable), transaction.atomic():
+            appointment.save()
+
+    @override_settings(APPOINTMENT_CAPACITY=2)
+    def test_overlapping_bookings_up_to_capacity(self):
+        self.appointment(time(10, 0))
+        self.assertIn('10:30:00', self.free_starts())
+        self.assertEqual(self.book('10:30').status_code, 201)
+        # 10:30 is now taken on both seats; 11:00 still fits on the first
+        self.assertEqual(self.free_starts(), ['11:00:00', '11:30:00', '12:00:00'])
+        self.assertEqual(self.book('10:00').status_code, 409)
+
+    def test_rebuild_claims_slots_for_rows_written_without_signals(self):
+        Appointment.objects.bulk_create([
+            Appointment(
+                customer_name=name, customer_email=f'{name}@example.com', customer_phone='9800000000',
+                appointment_date=self.day, appointment_time=start, service_type='Haircut',
+            )
+            for name, start in [('first', time(10, 0)), ('overlap', time(10, 30)), ('later', time(12, 0))]
+        ])
+        self.assertEqual(self.free_starts(), ['10:00:00', '10:30:00', '11:00:00', '11:30:00', '12:00:00'])
+
+        out = StringIO()
+        call_command('rebuild_appointment_slots', stdout=out)
+        self.assertIn('Slots claimed for 2 appointments.', out.getvalue())
+        self.assertIn('1 overlapping appointments', out.getvalue())
+        self.assertEqual(self.free_starts(), ['11:00:00'])
+
+    def test_past_appointments_claim_nothing(self):
+        Appointment.objects.create(
+            customer_name='Past', customer_email='past@example.com', customer_phone='9800000000',
+            appointment_date=date.today() - timedelta(days=1), appointment_time=time(10, 0), service_type='Haircut',
+        )
+        self.assertFalse(AppointmentSlot.objects.exists())
+
+
+@override_settings(STORAGES=LOCAL_STORAGES, ADMIN_EMAILS=[])
+class BenchmarkHttpTests(TransactionTestCase):
+    """A TransactionTestCase: the command closes the connection after each request."""
+
+    def setUp(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        category = ServiceCategory.objects.create(name='Hair')
+        Product.objects.create(name='Argan oil', price=10, is_featured=True)
+        Service.objects.create(category=category, title='Haircut', price=100)
+        DashboardContent.objects.create(slug='home', data={})
+
+    def test_every_url_is_benchmarked(self):
+        out = StringIO()
+        call_command('benchmark_http', requests=1, warmup=0, writes=True, host='testserver', stdout=out)
+        benchmarked = {line.split()[0] for line in out.getvalue().splitlines()}
+        self.assertEqual(set(urls.url_names(urls.urlpatterns)) - benchmarked, set())
+        self.assertNotIn("'4", out.getvalue())
+
+    def test_urls_without_a_sample_request_fail_loudly(self):
+        with mock.patch('salon.urls.url_names', return_value=iter(['healthcheck', 'new-route'])):
+            with self.assertRaisesMessage(CommandError, 'No sample request for new-route'):
+                call_command('benchmark_http', requests=1, warmup=0, stdout=StringIO())
@@ -1,18 +1,55 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import URLPattern, URLResolver, path, include
 from rest_framework.routers import DefaultRouter
-from .views import BannerListAPIView, DashboardContentView, ProductViewSet, AppointmentViewSet, HealthCheckView, ServiceListAPIView, DashboardContentDetail
+from .views import BannerListAPIView, BootstrapView, DashboardContentView, ProductViewSet, AppointmentViewSet, HealthCheckView, ServiceListAPIView, DashboardContentDetail, SearchAPIView
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'appointments', AppointmentViewSet, basename='appointment')
 
 
-urlpatterns = [
-    path('api/', include(router.urls)),
-    path('health/', HealthCheckView.as_view(), name='healthcheck'),
-    path("api/banners/", BannerListAPIView.as_view(), name="banner-list"),
-    path("api/services/", ServiceListAPIView.as_view(), name="service-list"),
-    path("api/dashboard-content/all/", DashboardContentView.as_view(), name="dashboard-content-detail"),
-    path("api/dashboard-content/<slug:slug>/", DashboardContentDetail.as_view(), name="dashboard-content-detail"),
-]
+def url_names(patterns):
+    """Yield the names of the routes in ``patterns``, descending into includes."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
 
+
+def build_urlpatterns(async_read_views=False):
+    """The salon routes, with the read endpoints served by salon.async_views when ``async_read_views``."""
+    views = {
+        'healthcheck': HealthCheckView,
+        'banner-list': BannerListAPIView,
+        'service-list': ServiceListAPIView,
+        'dashboard-content-all': DashboardContentView,
+        'dashboard-content-detail': DashboardContentDetail,
+    }
+    async_routes = []
+    if async_read_views:
+        from . import async_views
+
+        views = {
+            'healthcheck': async_views.AsyncHealthCheckView,
+            'banner-list': async_views.AsyncBannerListView,
+            'service-list': async_views.AsyncServiceListView,
+            'dashboard-content-all': async_views.AsyncDashboardContentView,
+            'dashboard-content-detail': async_views.AsyncDashboardContentDetail,
+        }
+        # Ahead of the router, which keeps serving the rest of /api/products/
+        async_routes = [path("api/products/", async_views.AsyncProductListView.as_view(), name="product-list")]
+
+    return async_routes + [
+        path('api/', include(router.urls)),
+        path('health/', views['healthcheck'].as_view(), name='healthcheck'),
+        path("api/bootstrap/", BootstrapView.as_view(), name="bootstrap"),
+        path("api/banners/", views['banner-list'].as_view(), name="banner-list"),
+        path("api/services/", views['service-list'].as_view(), name="service-list"),
+        path("api/search/", SearchAPIView.as_view(), name="search"),
+        path("api/dashboard-content/all/", views['dashboard-content-all'].as_view(), name="dashboard-content-all"),
+        path("api/dashboard-content/<slug:slug>/", views['dashboard-content-detail'].as_view(), name="dashboard-content-detail"),
+    ]
+
+
+urlpatterns = build_urlpatterns(settings.ASYNC_READ_VIEWS)
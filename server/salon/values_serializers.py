@@ -0,0 +1,172 @@
+from datetime import datetime
+from decimal import Decimal
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from . import media
+
+
+class ValuesSerializer:
+    """
+    Read-only twin of a ``ModelSerializer`` that renders ``.values()`` rows.
+
+    The field list, nesting and per-field formatting are taken from
+    ``serializer_class``, so the output is identical, but no model instances
+    or per-row field trees are built. Every field is compiled once into a
+    getter on the row dict; plain columns are a bare ``itemgetter``.
+
+    ``SerializerMethodField``s are computed by ``get_<name>(row)`` on the
+    subclass, which may list the extra columns it reads in ``extra_columns``.
+    """
+    serializer_class = None
+    extra_columns = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        serializer = self.serializer_class(context=self.context)
+        self.columns = list(self.extra_columns)
+        self.getters = self.compile(serializer.fields, serializer.Meta.model, '')
+
+    def compile(self, fields, model, prefix):
+        getters = []
+        for name, field in fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                getters.append((name, getattr(self, f'get_{name}')))
+            elif isinstance(field, serializers.ModelSerializer):
+                nested = self.compile(field.fields, field.Meta.model, f'{prefix}{field.source}__')
+                getters.append((name, self.nested_getter(f'{prefix}{field.source}__pk', nested)))
+                self.columns.append(f'{prefix}{field.source}__pk')
+            elif isinstance(field, serializers.ModelField):
+                # Custom model fields (e.g. CKEditor5Field) are read off the
+                # whole instance; text ones render as the stored string
+                if field.model_field.get_internal_type() not in ('CharField', 'TextField'):
+                    raise ImproperlyConfigured(f'{type(self).__name__} cannot render {name}, add get_{name}(row).')
+                column = f'{prefix}{field.model_field.attname}'
+                self.columns.append(column)
+                getters.append((name, itemgetter(column)))
+            elif isinstance(field, serializers.FileField):
+                column = f'{prefix}{field.source}'
+                self.columns.append(column)
+                version_column = None
+                if any(f.name == 'updated_at' for f in model._meta.get_fields()):
+                    version_column = f'{prefix}updated_at'
+                    self.columns.append(version_column)
+                getters.append((name, self.file_getter(column, version_column, field, model._meta.get_field(field.source))))
+            else:
+                column = f'{prefix}{field.source}'
+                self.columns.append(column)
+                getters.append((name, self.field_getter(column, field, model._meta.get_field(field.source))))
+        return getters
+
+    @staticmethod
+    def nested_getter(pk_column, getters):
+        def get(row):
+            if row[pk_column] is None:
+                return None
+            return {name: getter(row) for name, getter in getters}
+        return get
+
+    def field_getter(self, column, field, model_field):
+        if type(field) in (serializers.CharField, serializers.SlugField, serializers.IntegerField,
+                           serializers.BooleanField, serializers.ReadOnlyField):
+            # The database already returns the represented type
+            return itemgetter(column)
+
+        if isinstance(field, serializers.DecimalField):
+            convert = self.decimal_converter(field)
+        elif isinstance(field, serializers.DateTimeField):
+            convert = self.datetime_converter(field)
+        else:
+            convert = field.to_representation
+
+        def get(row):
+            value = row[column]
+            return None if value is None else convert(value)
+        return get
+
+    def file_getter(self, column, version_column, field, model_field):
+        """URLs (or variant URL maps) come from the shared cache in salon.media, versioned like CachedImageField's."""
+        storage = model_field.storage
+        if not getattr(field, 'use_url', True):
+            return lambda row: row[column] or None
+        request = self.context.get('request')
+
+        if getattr(field, 'variants', False):
+            def get_variants(row):
+                name = row[column]
+                if not name:
+                    return None
+                urls = media.variant_urls(storage, name, row[version_column] if version_column else None)
+                if request is not None:
+                    return {preset: request.build_absolute_uri(url) for preset, url in urls.items()}
+                return dict(urls)
+            return get_variants
+
+        def get(row):
+            name = row[column]
+            if not name:
+                return None
+            url = media.storage_url(storage, name, row[version_column] if version_column else None)
+            return request.build_absolute_uri(url) if request is not None else url
+        return get
+
+    @staticmethod
+    def decimal_converter(field):
+        coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if not coerce_to_string or field.localize or field.decimal_places is None:
+            return field.to_representation
+        exponent = -field.decimal_places
+
+        def convert(value):
+            # Columns come back with the field's decimal places already, so
+            # quantizing (as DecimalField does) would be a no-op
+            if isinstance(value, Decimal) and value.as_tuple().exponent == exponent:
+                return f'{value:f}'
+            return field.to_representation(value)
+        return convert
+
+    @staticmethod
+    def datetime_converter(field):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if output_format is None or output_format.lower() != ISO_8601:
+            return field.to_representation
+        # DateTimeField looks the current timezone up for every value
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if isinstance(value, datetime) and value.tzinfo is not None:
+                value = value.astimezone(field_timezone).isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return field.to_representation(value)
+        return convert
+
+    def select(self, queryset):
+        return queryset.values(*dict.fromkeys(self.columns))
+
+    def to_representation(self, row):
+        return {name: getter(row) for name, getter in self.getters}
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class ValuesListMixin:
+    """Answer ``list`` with ``values_serializer_class`` instead of the model serializer."""
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.values_serializer_class(context=self.get_serializer_context())
+        queryset = serializer.select(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
@@ -1,19 +1,51 @@
 import logging
-import copy
-import threading
 from rest_framework import viewsets, status, generics, mixins
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from .models import Product, Appointment, DashboardContent
-from .serializers import ProductSerializer, AppointmentSerializer, DashboardContentSerializer
+from . import cache, media
+from .conditional import CacheVersionConditionalGetMixin, ConditionalGetMixin
+from .filters import filter_products, product_facets
+from .pagination import ProductPagination, ServicePagination
+from .values_serializers import ValuesListMixin
+from .models import MAX_FEATURED_PRODUCTS, Product, Appointment, DashboardContent
+from .serializers import ProductSerializer, AppointmentSerializer, DashboardContentSerializer, FeaturedSetSerializer, ProductFilterSerializer, ProductValuesSerializer
 
 logger = logging.getLogger(__name__)
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(ConditionalGetMixin, ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing and editing Product instances"""
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    values_serializer_class = ProductValuesSerializer
+    pagination_class = ProductPagination
+    # GET requests read from the replica, when there is one (salon.db_routers)
+    read_from_replica = True
+    product_filters = {}
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list':
+            queryset = filter_products(queryset, self.product_filters)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        List products, filtered by ``category`` (repeatable), ``min_price``,
+        ``max_price``, ``in_stock`` and ``featured``, with facet counts
+        """
+        query = ProductFilterSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        self.product_filters = query.validated_data
+
+        response = super().list(request, *args, **kwargs)
+        # Later cursor pages reuse the facets of the first page
+        if self.paginator.cursor_query_param not in request.query_params:
+            response.data['facets'] = product_facets(self.get_queryset(), self.product_filters)
+        return response
 
     @action(detail=False, methods=['get'])
     def in_stock(self, request):
@@ -25,14 +57,28 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get only featured products, limited to 6"""
-        featured_products = self.queryset.filter(is_featured=True)[:6]
+        featured_products = self.queryset.filter(is_featured=True)[:MAX_FEATURED_PRODUCTS]
         serializer = self.get_serializer(featured_products, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='featured/set', permission_classes=[IsAdminUser])
+    def set_featured(self, request):
+        """Replace the whole featured set in one transaction (admins only)"""
+        serializer = FeaturedSetSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            products = Product.set_featured(serializer.validated_data['ids'])
+        except DjangoValidationError as e:
+            raise ValidationError({'ids': e.messages})
+        logger.info(f"Featured products replaced: {[product.id for product in products]}")
+        return Response(self.get_serializer(products, many=True).data)
+
 
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
+from django.db import transaction
+from .availability import SlotUnavailable, free_slots
+from .emails import admin_notified_at, enqueue_appointment_emails
+from .serializers import AvailabilityQuerySerializer
 
 class AppointmentViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     """ViewSet for viewing and creating Appointment instances"""
@@ -44,87 +90,40 @@ class AppointmentViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
         try:
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
-            appointment = serializer.save(status='pending')
+            # The slot reservation (made by the Appointment post_save signal)
+            # and the notification emails (sent later by the send_outbox_emails
+            # worker) commit or roll back together with the appointment. A
+            # taken slot is answered with a 409.
+            with transaction.atomic():
+                appointment = serializer.save(status='pending', admin_notified_at=admin_notified_at())
+                enqueue_appointment_emails(appointment)
             headers = self.get_success_headers(serializer.data)
             logger.info(f"Appointment created successfully: {serializer.data}")
 
-            # --- Send email notifications in a background thread ---
-            email_thread = threading.Thread(target=self.send_appointment_emails, args=(appointment,))
-            email_thread.start()
-
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        except SlotUnavailable:
+            logger.info(f"Appointment slot already taken: {request.data.get('appointment_date')} {request.data.get('appointment_time')}")
+            raise
         except Exception as e:
             logger.error(f"Error creating appointment: {e}", exc_info=True)
             raise
 
-    def send_appointment_emails(self, appointment):
-        """
-        Sends confirmation email to customer and notification to admin.
-        This method is designed to be run in a background thread.
-        """
-        try:
-            # Common context
-            formatted_time = appointment.appointment_time.strftime('%I:%M %p') if appointment.appointment_time else ''
-            
-            # Send email notification to the user
-            try:
-                subject = 'We Have Received Your Appointment Request'
-                from_email = settings.DEFAULT_FROM_EMAIL
-                to_email = [appointment.customer_email]
-
-                customer_context = {
-                    'customer_name': appointment.customer_name,
-                    'service_type': appointment.service_type,
-                    'appointment_date': appointment.appointment_date,
-                    'appointment_time': formatted_time,
-                }
-                
-                html_content = render_to_string('salon/appointment_received.html', customer_context)
-                text_content = render_to_string('salon/appointment_received.txt', customer_context)
-
-                msg = EmailMultiAlternatives(subject, text_content, from_email, to_email)
-                msg.attach_alternative(html_content, "text/html")
-                msg.send()
-                
-                logger.info(f"Appointment request email sent to {appointment.customer_email} for appointment {appointment.id}")
-            except Exception as e:
-                logger.error(f"Failed to send appointment request email to {appointment.customer_email} for appointment {appointment.id}: {e}", exc_info=True)
-
-            # Send email notification to admin
-            try:
-                admin_subject = f'New Appointment Request: {appointment.customer_name}'
-                admin_from_email = settings.DEFAULT_FROM_EMAIL
-                admin_recipient_list = settings.ADMIN_EMAILS
-
-                admin_context = {
-                    'appointment': appointment,
-                    'appointment_time': formatted_time,
-                }
-
-                admin_html_content = render_to_string('salon/admin_appointment_notification.html', admin_context)
-                admin_text_content = f"""
-                A new appointment has been booked.
-
-                Details:
-                Name: {appointment.customer_name}
-                Email: {appointment.customer_email}
-                Phone: {appointment.customer_phone}
-                Service: {appointment.service_type}
-                Date: {appointment.appointment_date}
-                Time: {formatted_time}
-                Notes: {appointment.notes}
-                """
-
-                admin_msg = EmailMultiAlternatives(admin_subject, admin_text_content, admin_from_email, admin_recipient_list)
-                admin_msg.attach_alternative(admin_html_content, "text/html")
-                admin_msg.send()
-
-                logger.info(f"Admin notification email sent for appointment {appointment.id}")
-            except Exception as e:
-                logger.error(f"Failed to send admin notification email for appointment {appointment.id}: {e}", exc_info=True)
-        
-        except Exception as e:
-            logger.error(f"An error occurred in the email sending thread for appointment {appointment.id}: {e}", exc_info=True)
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """Get the free slots for a service on a date"""
+        query = AvailabilityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        date = query.validated_data['date']
+        service = query.validated_data['service']
+        duration = service.duration_minutes or settings.APPOINTMENT_DEFAULT_DURATION
+
+        slots = free_slots(date, duration)
+        return Response({
+            'date': date,
+            'service': service.id,
+            'duration_minutes': duration,
+            'slots': [{'start': start, 'end': end} for start, end in slots],
+        })
 
 
 from rest_framework.views import APIView
@@ -140,12 +139,14 @@ class HealthCheckView(APIView):
         return Response({"status": "ok"}, status=status.HTTP_200_OK)
     
 from .models import Banner, Service
-from .serializers import BannerSerializer, ServiceSerializer
+from .serializers import BannerSerializer, BannerValuesSerializer, ServiceSerializer, ServiceValuesSerializer
 
 
-class BannerListAPIView(generics.ListAPIView):
+class BannerListAPIView(ConditionalGetMixin, ValuesListMixin, generics.ListAPIView):
     queryset = Banner.objects.filter(is_active=True).order_by("priority")
     serializer_class = BannerSerializer
+    values_serializer_class = BannerValuesSerializer
+    read_from_replica = True
 
     def get(self, request, *args, **kwargs):
         try:
@@ -157,9 +158,13 @@ class BannerListAPIView(generics.ListAPIView):
             raise
 
 
-class ServiceListAPIView(generics.ListAPIView):
+class ServiceListAPIView(ConditionalGetMixin, ValuesListMixin, generics.ListAPIView):
     queryset = Service.objects.filter(is_active=True).select_related("category").order_by("title")
     serializer_class = ServiceSerializer
+    values_serializer_class = ServiceValuesSerializer
+    pagination_class = ServicePagination
+    last_modified_fields = ("updated_at", "category__updated_at")
+    read_from_replica = True
 
     def get(self, request, *args, **kwargs):
         try:
@@ -171,10 +176,12 @@ class ServiceListAPIView(generics.ListAPIView):
             raise
 
 
-class DashboardContentDetail(generics.RetrieveAPIView):
+class DashboardContentDetail(CacheVersionConditionalGetMixin, generics.RetrieveAPIView):
     lookup_field = 'slug'
+    cache_namespace = cache.DASHBOARD_CONTENT
     queryset = DashboardContent.objects.prefetch_related('images').all()
     serializer_class = DashboardContentSerializer
+    read_from_replica = True
 
     def get(self, request, *args, **kwargs):
         try:
@@ -186,38 +193,110 @@ class DashboardContentDetail(generics.RetrieveAPIView):
             raise
 
 
-class DashboardContentView(generics.GenericAPIView):
+class DashboardContentView(CacheVersionConditionalGetMixin, generics.GenericAPIView):
     queryset = DashboardContent.objects.prefetch_related('images').all()
     serializer_class = DashboardContentSerializer
+    cache_namespace = cache.DASHBOARD_CONTENT
+    read_from_replica = True
 
     def get(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
-            
-            response_data = {}
-            for content in queryset:
-                images = {img.key: img.file.url for img in content.images.all() if hasattr(img.file, 'url')}
-                
-                processed_data = copy.deepcopy(content.data)
-
-                def process_data(data, images):
-                    if isinstance(data, dict):
-                        if data.get('icon_type') == 'image' and data.get('image_key'):
-                            data['image'] = images.get(data['image_key'])
-
-                        for key in data:
-                            data[key] = process_data(data[key], images)
-                    elif isinstance(data, list):
-                        for i, item in enumerate(data):
-                            data[i] = process_data(item, images)
-                    return data
-                
-                final_data = process_data(processed_data, images)
-                response_data[content.slug] = final_data
+            # Cached under a version token bumped by the DashboardContent and
+            # DashboardImage signals, so hot requests never touch the DB.
+            response_data = cache.get_or_build(cache.DASHBOARD_CONTENT, self.build_response_data, "all")
             logger.info("Dashboard content retrieved successfully.")
             return Response(response_data)
         except Exception as e:
             logger.error(f"Error retrieving dashboard content: {e}", exc_info=True)
             raise
 
+    def build_response_data(self):
+        return self.serialize_contents(self.get_queryset())
+
+    @staticmethod
+    def serialize_contents(contents):
+        """``{slug: data}`` for DashboardContent rows with their images prefetched."""
+        response_data = {}
+        for content in contents:
+            files = [img for img in content.images.all() if img.file]
+            images = {img.key: media.file_url(img.file) for img in files}
+            variants = {img.key: media.file_variants(img.file) for img in files}
+            response_data[content.slug] = content.resolve_images(images, variants)
+        return response_data
+
+
+class BootstrapView(CacheVersionConditionalGetMixin, generics.GenericAPIView):
+    """
+    Everything the homepage needs for its first paint in one response: the
+    first pages of banners and services, the featured products and all
+    dashboard content, each rendered exactly like its own endpoint.
+    """
+    cache_namespaces = (cache.HOMEPAGE, cache.DASHBOARD_CONTENT)
+    read_from_replica = True
+
+    def get(self, request, *args, **kwargs):
+        try:
+            # Catalog image URLs are absolute, so the host is part of the key;
+            # so is the dashboard version, which the dashboard signals bump
+            response_data = cache.get_or_build(
+                cache.HOMEPAGE, self.build_response_data,
+                "bootstrap", request.build_absolute_uri('/'), cache.get_version(cache.DASHBOARD_CONTENT),
+            )
+            logger.info("Homepage bootstrap retrieved successfully.")
+            return Response(response_data)
+        except Exception as e:
+            logger.error(f"Error retrieving homepage bootstrap: {e}", exc_info=True)
+            raise
+
+    def build_response_data(self):
+        context = self.get_serializer_context()
+        banners = BannerValuesSerializer(context=context)
+        products = ProductValuesSerializer(context=context)
+        services = ServiceValuesSerializer(context=context)
+        return {
+            "banners": banners.serialize(
+                banners.select(BannerListAPIView.queryset)[:BannerListAPIView.pagination_class.page_size]
+            ),
+            "featured_products": products.serialize(
+                products.select(Product.objects.filter(is_featured=True))[:MAX_FEATURED_PRODUCTS]
+            ),
+            "services": services.serialize(
+                services.select(ServiceListAPIView.queryset)[:ServiceListAPIView.pagination_class.page_size]
+            ),
+            # Shares the cached payload of /api/dashboard-content/all/
+            "dashboard_content": cache.get_or_build(
+                cache.DASHBOARD_CONTENT, DashboardContentView().build_response_data, "all",
+            ),
+        }
+
+
+from .search import SearchResults
+from .serializers import SearchQuerySerializer
+
+
+class SearchAPIView(generics.GenericAPIView):
+    """Ranked full-text search over products and active services"""
+    read_from_replica = True
 
+    def get(self, request, *args, **kwargs):
+        query = SearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        q = query.validated_data['q']
+
+        page = self.paginate_queryset(SearchResults(q))
+        products = Product.objects.in_bulk([pk for kind, pk, _ in page if kind == 'product'])
+        services = Service.objects.select_related("category").in_bulk([pk for kind, pk, _ in page if kind == 'service'])
+
+        context = self.get_serializer_context()
+        results = []
+        for kind, pk, rank in page:
+            if kind == 'product' and pk in products:
+                item = ProductSerializer(products[pk], context=context).data
+            elif kind == 'service' and pk in services:
+                item = ServiceSerializer(services[pk], context=context).data
+            else:
+                continue
+            results.append({'type': kind, 'rank': rank, 'item': item})
+
+        logger.info(f"Search for '{q}' returned {len(results)} results.")
+        return self.get_paginated_response(results)
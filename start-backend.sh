@@ -33,6 +33,7 @@ fi
 # Run migrations (if needed)
 echo "🔄 Running migrations..."
 python manage.py migrate --noinput
+python manage.py createcachetable
 
 echo ""
 echo "✅ Backend server starting..."